@@ -0,0 +1,29 @@
+"""
+Административная панель для уведомлений
+"""
+from django.contrib import admin
+from django.utils import timezone
+
+from apps.tickets.pagination import EstimatedCountPaginator
+from .models import Notification
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    """
+    Очередь уведомлений: просмотр и повторная отправка недоставленных
+    """
+    list_display = ('id', 'channel', 'recipient', 'event', 'ticket_id', 'status',
+                    'attempts', 'available_at', 'sent_at')
+    list_filter = ('status', 'channel', 'event')
+    search_fields = ('recipient', '=ticket_id')
+    readonly_fields = ('created_at', 'sent_at', 'last_error', 'attempts')
+    actions = ('retry',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    @admin.action(description='Отправить повторно')
+    def retry(self, request, queryset):
+        queryset.exclude(status=Notification.Status.SENT).update(
+            status=Notification.Status.PENDING, attempts=0, available_at=timezone.now()
+        )
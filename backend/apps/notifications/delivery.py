@@ -0,0 +1,145 @@
+"""
+Доставка уведомлений из outbox: выборка пачек с SKIP LOCKED, отправка вне транзакции,
+сводки, повторные попытки с экспоненциальной задержкой
+"""
+import json
+import logging
+import random
+import urllib.request
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def compose_email(notifications):
+    """
+    Тема и текст письма; несколько уведомлений одному получателю — одна сводка
+    """
+    if len(notifications) == 1:
+        return notifications[0].subject, notifications[0].body
+    subject = f'Сводка по заявкам ({len(notifications)})'
+    body = '\n\n'.join(f'{item.subject}\n{item.body}' for item in notifications)
+    return subject, body
+
+
+def retry_delay(attempts):
+    """
+    Экспоненциальная задержка перед следующей попыткой со случайным разбросом
+    """
+    delay = min(settings.NOTIFICATION_RETRY_MAX_DELAY,
+                settings.NOTIFICATION_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+class Delivery:
+    """
+    Каналы доставки. SMTP-соединение открывается один раз и переиспользуется
+    между пачками; после ошибки оно переоткрывается при следующей отправке.
+    """
+
+    def __init__(self):
+        self.connection = None
+
+    def send(self, channel, recipient, notifications):
+        if channel == Notification.Channel.EMAIL:
+            self.send_email(recipient, notifications)
+        else:
+            self.send_webhook(recipient, notifications)
+
+    def send_email(self, recipient, notifications):
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+            self.connection.open()
+        subject, body = compose_email(notifications)
+        message = EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient],
+                               connection=self.connection)
+        try:
+            message.send()
+        except Exception:
+            self.close()
+            raise
+
+    def send_webhook(self, url, notifications):
+        data = json.dumps(
+            {'events': [item.payload for item in notifications]}, ensure_ascii=False
+        ).encode()
+        request = urllib.request.Request(
+            url, data=data, method='POST', headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request, timeout=settings.NOTIFICATION_WEBHOOK_TIMEOUT):
+            pass
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            finally:
+                self.connection = None
+
+
+def claim_batch(batch_size):
+    """
+    Забирает пачку готовых уведомлений короткой транзакцией: строки выбираются
+    с SKIP LOCKED, и их available_at сдвигается на NOTIFICATION_CLAIM_SECONDS.
+    Параллельные воркеры эту пачку не видят, а если процесс упадет при отправке,
+    она снова станет готовой по истечении этого срока.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(status=Notification.Status.PENDING, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if batch:
+            Notification.objects.filter(pk__in=[item.pk for item in batch]).update(
+                available_at=now + timedelta(seconds=settings.NOTIFICATION_CLAIM_SECONDS)
+            )
+    return batch
+
+
+def process_batch(delivery, batch_size):
+    """
+    Забирает пачку готовых уведомлений и отправляет ее. Возвращает размер пачки.
+    Отправка идет вне транзакции и без блокировок строк, результаты сохраняются
+    второй короткой транзакцией.
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0
+
+    groups = defaultdict(list)
+    for notification in batch:
+        groups[(notification.channel, notification.recipient)].append(notification)
+
+    for (channel, recipient), notifications in groups.items():
+        try:
+            delivery.send(channel, recipient, notifications)
+        except Exception as exc:
+            logger.warning('Не удалось отправить %s на %s: %s', channel, recipient, exc)
+            for notification in notifications:
+                notification.attempts += 1
+                notification.last_error = f'{type(exc).__name__}: {exc}'
+                if notification.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+                    notification.status = Notification.Status.FAILED
+                else:
+                    notification.available_at = timezone.now() + retry_delay(notification.attempts)
+        else:
+            for notification in notifications:
+                notification.attempts += 1
+                notification.status = Notification.Status.SENT
+                notification.sent_at = timezone.now()
+
+    with transaction.atomic():
+        Notification.objects.bulk_update(
+            batch, ['status', 'attempts', 'available_at', 'last_error', 'sent_at']
+        )
+    return len(batch)
@@ -0,0 +1,55 @@
+"""
+Фоновая доставка уведомлений из outbox
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.notifications.delivery import Delivery, process_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет уведомления из outbox: письма через одно SMTP-соединение и webhooks. '
+        'Можно запускать несколько процессов — пачки разбираются через SKIP LOCKED.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Уведомлений в одной пачке, по умолчанию 100')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Пауза, когда очередь пуста, сек')
+        parser.add_argument('--once', action='store_true',
+                            help='Отправить все готовые уведомления и завершиться')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        delivery = Delivery()
+        sent = 0
+        try:
+            while not self.stopping:
+                close_old_connections()
+                processed = process_batch(delivery, options['batch_size'])
+                sent += processed
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                self.sleep(options['interval'])
+        finally:
+            delivery.close()
+        self.stdout.write(self.style.SUCCESS(f'Обработано уведомлений: {sent}'))
+
+    def stop(self, signum, frame):
+        # Текущая пачка дорабатывается, новая не берется
+        self.stopping = True
+
+    def sleep(self, seconds):
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            time.sleep(min(0.5, deadline - time.monotonic()))
@@ -0,0 +1,98 @@
+"""
+Исходящие уведомления (transactional outbox)
+"""
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Notification(models.Model):
+    """
+    Уведомление, записанное в одной транзакции с изменением заявки.
+    Доставляет его отдельный процесс: manage.py run_outbox_worker.
+    """
+
+    class Channel(models.TextChoices):
+        EMAIL = 'EMAIL', 'Email'
+        WEBHOOK = 'WEBHOOK', 'Webhook'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Ожидает отправки'
+        SENT = 'SENT', 'Отправлено'
+        FAILED = 'FAILED', 'Не доставлено'
+
+    channel = models.CharField(
+        max_length=10,
+        choices=Channel.choices,
+        verbose_name='Канал'
+    )
+    recipient = models.CharField(
+        max_length=500,
+        verbose_name='Получатель',
+        help_text='Email или URL webhook'
+    )
+    event = models.CharField(
+        max_length=50,
+        verbose_name='Событие'
+    )
+    ticket_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='ID заявки'
+    )
+    subject = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Тема'
+    )
+    body = models.TextField(
+        blank=True,
+        verbose_name='Текст'
+    )
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Данные события'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Отправить не раньше'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата отправки'
+    )
+
+    class Meta:
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        ordering = ['-created_at']
+        indexes = [
+            # Очередь воркера: только неотправленные, по времени готовности
+            models.Index(
+                fields=['available_at'],
+                condition=Q(status='PENDING'),
+                name='notifications_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_channel_display()} {self.recipient}: {self.event}'
@@ -0,0 +1,104 @@
+"""
+Постановка уведомлений о заявках в outbox.
+Функции вызываются внутри транзакции, которая меняет заявку: уведомление
+сохраняется тогда и только тогда, когда сохраняется изменение.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Notification
+
+TICKET_CREATED = 'ticket_created'
+TICKET_ASSIGNED = 'ticket_assigned'
+TICKET_COMPLETED = 'ticket_completed'
+TICKET_SLA_BREACHED = 'ticket_sla_breached'
+
+
+def enqueue(event, ticket, emails, subject, body, **extra):
+    """
+    Письма получателям emails и по одному уведомлению на каждый NOTIFICATION_WEBHOOK_URLS.
+    Отправка откладывается на NOTIFICATION_DIGEST_WINDOW, чтобы серия изменений
+    ушла одному получателю одной сводкой.
+    """
+    notifications = build(event, ticket, emails, subject, body, **extra)
+    Notification.objects.bulk_create(notifications)
+    return notifications
+
+
+def build(event, ticket, emails, subject, body, **extra):
+    """
+    Уведомления enqueue без сохранения — для записи нескольких заявок одним INSERT
+    """
+    available_at = timezone.now() + timedelta(seconds=settings.NOTIFICATION_DIGEST_WINDOW)
+    payload = {
+        'event': event,
+        'ticket_id': ticket.pk,
+        'title': ticket.title,
+        'status': ticket.status,
+        'priority': ticket.priority,
+        'requester_id': ticket.requester_id,
+        'executor_id': ticket.executor_id,
+        **extra,
+    }
+    common = dict(event=event, ticket_id=ticket.pk, subject=subject, body=body,
+                  payload=payload, available_at=available_at)
+    notifications = [
+        Notification(channel=Notification.Channel.EMAIL, recipient=email, **common)
+        for email in dict.fromkeys(email for email in emails if email)
+    ]
+    notifications += [
+        Notification(channel=Notification.Channel.WEBHOOK, recipient=url, **common)
+        for url in settings.NOTIFICATION_WEBHOOK_URLS
+    ]
+    return notifications
+
+
+def ticket_created(ticket):
+    return enqueue(
+        TICKET_CREATED, ticket, [ticket.requester.email],
+        f'Заявка #{ticket.pk} создана',
+        f'Ваша заявка «{ticket.title}» зарегистрирована. '
+        f'Приоритет: {ticket.get_priority_display()}.',
+    )
+
+
+def ticket_assigned(ticket):
+    executor = ticket.executor
+    return enqueue(
+        TICKET_ASSIGNED, ticket, [executor.email, ticket.requester.email],
+        f'Заявка #{ticket.pk} назначена',
+        f'Заявка «{ticket.title}» назначена исполнителю '
+        f'{executor.get_full_name() or executor.username}.',
+    )
+
+
+def ticket_completed(ticket, comment=''):
+    body = f'Заявка «{ticket.title}» выполнена.'
+    if comment:
+        body += f'\nКомментарий исполнителя: {comment}'
+    return enqueue(
+        TICKET_COMPLETED, ticket, [ticket.requester.email],
+        f'Заявка #{ticket.pk} выполнена', body, comment=comment,
+    )
+
+
+def tickets_breached(tickets, operator_emails):
+    """
+    Нарушения SLA пачки заявок одним INSERT: исполнителю, а заявке без
+    исполнителя — операторам (operator_emails)
+    """
+    notifications = []
+    for ticket in tickets:
+        emails = [ticket.executor.email] if ticket.executor_id else operator_emails
+        notifications += build(
+            TICKET_SLA_BREACHED, ticket, emails,
+            f'Заявка #{ticket.pk}: нарушен срок SLA',
+            f'Заявка «{ticket.title}» ({ticket.get_priority_display()}, '
+            f'{ticket.get_status_display()}) должна была быть выполнена '
+            f'до {timezone.localtime(ticket.due_at):%d.%m.%Y %H:%M}.',
+            due_at=ticket.due_at.isoformat(),
+        )
+    Notification.objects.bulk_create(notifications)
+    return notifications
@@ -0,0 +1,166 @@
+"""
+Тесты outbox уведомлений и их доставки
+"""
+import smtplib
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.tickets import events
+from apps.tickets.models import Ticket
+
+from . import delivery, outbox
+from .models import Notification
+
+User = get_user_model()
+
+EMAIL_SETTINGS = dict(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    NOTIFICATION_DIGEST_WINDOW=0,
+    NOTIFICATION_WEBHOOK_URLS=[],
+)
+
+
+def create_ticket(requester, title='Заявка'):
+    return Ticket.objects.create(title=title, description='Описание', requester=requester)
+
+
+@override_settings(**EMAIL_SETTINGS)
+class OutboxTransactionTests(TransactionTestCase):
+    """
+    Уведомление сохраняется в транзакции изменения заявки: до фиксации его не
+    видят воркеры доставки, при откате его нет вовсе
+    """
+
+    def setUp(self):
+        self.requester = User.objects.create_user(
+            username='requester', password='password', email='requester@example.com'
+        )
+
+    def count_from_other_connection(self):
+        # Воркер доставки читает outbox своим соединением
+        result = []
+
+        def run():
+            try:
+                result.append(Notification.objects.count())
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(10)
+        return result[0]
+
+    def test_written_on_commit(self):
+        with events.atomic():
+            ticket = create_ticket(self.requester)
+            outbox.ticket_created(ticket)
+            self.assertEqual(self.count_from_other_connection(), 0)
+
+        self.assertEqual(self.count_from_other_connection(), 1)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.ticket_id, ticket.pk)
+        self.assertEqual(notification.recipient, 'requester@example.com')
+
+    def test_discarded_on_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with events.atomic():
+                ticket = create_ticket(self.requester)
+                outbox.ticket_created(ticket)
+                raise RuntimeError('отмена изменения')
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(Ticket.objects.filter(pk=ticket.pk).exists())
+
+
+@override_settings(**EMAIL_SETTINGS, NOTIFICATION_CLAIM_SECONDS=600,
+                   NOTIFICATION_MAX_ATTEMPTS=3)
+class DeliveryTests(TestCase):
+
+    def setUp(self):
+        self.requester = User.objects.create_user(
+            username='requester', password='password', email='requester@example.com'
+        )
+        self.other = User.objects.create_user(
+            username='other', password='password', email='other@example.com'
+        )
+
+    def test_claimed_batch_is_leased(self):
+        ticket = create_ticket(self.requester)
+        outbox.ticket_created(ticket)
+        started = timezone.now()
+
+        claimed = delivery.claim_batch(10)
+        self.assertEqual(len(claimed), 1)
+        # Пока аренда не истекла, ни этот, ни параллельный воркер строку не получат
+        self.assertEqual(delivery.claim_batch(10), [])
+        notification = Notification.objects.get()
+        self.assertEqual(notification.status, Notification.Status.PENDING)
+        self.assertGreaterEqual(notification.available_at, started + timedelta(seconds=600))
+
+        # Воркер упал, не записав результат: по истечении аренды строка снова готова
+        Notification.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([item.pk for item in delivery.claim_batch(10)], [notification.pk])
+
+    def test_digest_per_recipient(self):
+        first = create_ticket(self.requester, 'Первая')
+        second = create_ticket(self.requester, 'Вторая')
+        third = create_ticket(self.other, 'Третья')
+        for ticket in (first, second, third):
+            outbox.ticket_created(ticket)
+
+        processed = delivery.process_batch(delivery.Delivery(), 10)
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(len(mail.outbox), 2)
+        messages = {message.to[0]: message for message in mail.outbox}
+        digest = messages['requester@example.com']
+        self.assertEqual(digest.subject, 'Сводка по заявкам (2)')
+        self.assertIn('«Первая»', digest.body)
+        self.assertIn('«Вторая»', digest.body)
+        self.assertNotIn('«Третья»', digest.body)
+        single = messages['other@example.com']
+        self.assertEqual(single.subject, f'Заявка #{third.pk} создана')
+        self.assertFalse(
+            Notification.objects.exclude(status=Notification.Status.SENT).exists()
+        )
+
+    def test_retry_with_backoff_until_failed(self):
+        outbox.ticket_created(create_ticket(self.requester))
+        error = smtplib.SMTPServerDisconnected('соединение закрыто')
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=error), \
+                self.assertLogs('apps.notifications.delivery', 'WARNING') as logs:
+            delays = []
+            for attempt in range(1, 4):
+                started = timezone.now()
+                self.assertEqual(delivery.process_batch(delivery.Delivery(), 10), 1)
+                notification = Notification.objects.get()
+                self.assertEqual(notification.attempts, attempt)
+                self.assertIn('SMTPServerDisconnected', notification.last_error)
+                if attempt < 3:
+                    self.assertEqual(notification.status, Notification.Status.PENDING)
+                    delays.append(notification.available_at - started)
+                    # Следующая попытка — не раньше задержки
+                    self.assertEqual(delivery.claim_batch(10), [])
+                    Notification.objects.update(available_at=timezone.now())
+
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual(notification.status, Notification.Status.FAILED)
+        self.assertIsNone(notification.sent_at)
+        self.assertEqual(mail.outbox, [])
+        # Задержка растет экспоненциально: 15–30 с после первой попытки, 30–60 с после второй
+        self.assertGreaterEqual(delays[0], timedelta(seconds=15))
+        self.assertGreaterEqual(delays[1], timedelta(seconds=30))
+        self.assertLessEqual(delays[1], timedelta(seconds=61))
+        # FAILED больше не выбирается
+        Notification.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(delivery.claim_batch(10), [])
@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class PerfConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.perf'
+    verbose_name = 'Производительность'
@@ -0,0 +1,481 @@
+"""
+Микробенчмарки сериализаторов, прав доступа, рендеринга, логирования и полного цикла запроса
+"""
+import logging
+import random
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+from django.utils import timezone
+from django.utils.log import AdminEmailHandler
+from rest_framework.renderers import JSONRenderer
+
+from apps.tickets import fragments
+from apps.tickets.models import Ticket
+from apps.tickets.serializers import TicketDetailSerializer, TicketListSerializer
+from apps.users.permissions import IsExecutor, IsOperator, IsRequester, IsRequesterOrOperator
+from apps.users.serializers import UserSerializer
+from config import compression
+from config import logging as log_context
+from config.renderers import FragmentJSONRenderer, JSONFragments
+
+User = get_user_model()
+
+# Размеры полезной нагрузки: одна заявка, страница списка, крупная выгрузка
+PAYLOAD_SIZES = (1, 20, 1000)
+
+# Слова для описаний: разнообразный текст сжимается реалистичнее повторяющегося
+WORDS = ('принтер', 'не', 'работает', 'после', 'обновления', 'в', 'кабинете', 'срочно',
+         'отдел', 'просьба', 'проверить', 'ошибка', 'при', 'входе', 'VPN', 'почта',
+         'ноутбук', 'доступ', 'нужна', 'замена', 'монитор', 'снова', 'утра', 'пропуск')
+
+# Зарегистрированные бенчмарки: имя -> (фабрика, нужна ли БД).
+# Фабрика выполняет подготовку и возвращает функцию без аргументов, время которой меряется;
+# словарь в атрибуте info этой функции (или функция, возвращающая его после замера)
+# добавляется к результату.
+BENCHMARKS = {}
+
+
+def benchmark(name, needs_db=False):
+    """
+    Регистрирует фабрику бенчмарка под именем name
+    """
+    def decorator(factory):
+        BENCHMARKS[name] = (factory, needs_db)
+        return factory
+    return decorator
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """
+    Время одного вызова func в микросекундах: min и медиана по repeat сериям.
+    Число вызовов в серии подбирается так, чтобы серия длилась не меньше min_time.
+    """
+    func()  # прогрев: ленивые импорты, кэши полей сериализаторов
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / repeat or number >= 1 << 20:
+            break
+        number *= 2 if elapsed <= 0 else max(2, int(min_time / repeat / elapsed) + 1)
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        'min_us': round(min(samples) * 1e6, 2),
+        'median_us': round(statistics.median(samples) * 1e6, 2),
+        'loops': number * repeat,
+    }
+
+
+def make_users():
+    """
+    Несохраненные пользователи всех ролей с заполненными полями
+    """
+    now = timezone.now()
+    return {
+        role: User(
+            id=index + 1, username=f'bench_{role.lower()}', email=f'{role.lower()}@example.com',
+            first_name='Имя', last_name='Фамилия', role=role, phone='+79990000000',
+            department='ИТ', date_joined=now,
+        )
+        for index, role in enumerate(User.Role.values)
+    }
+
+
+def make_tickets(count):
+    """
+    Заявки в памяти со связанными пользователями — без обращений к БД
+    """
+    users = make_users()
+    now = timezone.now()
+    rng = random.Random(count)
+    statuses = Ticket.Status.values
+    priorities = Ticket.Priority.values
+    tickets = []
+    for index in range(count):
+        status = statuses[index % len(statuses)]
+        ticket = Ticket(
+            id=index + 1,
+            title=f'Заявка {index}',
+            description=' '.join(rng.choices(WORDS, k=rng.randint(10, 60))),
+            status=status,
+            priority=priorities[index % len(priorities)],
+            requester=users[User.Role.REQUESTER],
+            executor=users[User.Role.EXECUTOR] if status != Ticket.Status.NEW else None,
+            created_at=now - timedelta(hours=index),
+            updated_at=now,
+        )
+        tickets.append(ticket)
+    return tickets
+
+
+def serializer_case(serializer_class, size):
+    def factory():
+        tickets = make_tickets(size)
+        if size == 1:
+            return lambda: serializer_class(tickets[0]).data
+        return lambda: serializer_class(tickets, many=True).data
+    return factory
+
+
+def render_case(size):
+    def factory():
+        data = TicketListSerializer(make_tickets(size), many=True).data
+        renderer = JSONRenderer()
+        return lambda: renderer.render(data)
+    return factory
+
+
+def fragment_case(size):
+    """
+    Сериализация и рендеринг списка из кэша фрагментов (прогретого) —
+    для сравнения с serializer.ticket_list.* + render.json.*
+    """
+    def factory():
+        tickets = make_tickets(size)
+        serializer = TicketListSerializer(tickets, many=True).child
+        renderer = FragmentJSONRenderer()
+        fragments.render(serializer, tickets)
+        return lambda: renderer.render(JSONFragments(fragments.render(serializer, tickets)))
+    return factory
+
+
+def compress_case(encoder, size):
+    """
+    Сжатие JSON списка заявок: время и размер до/после
+    """
+    def factory():
+        body = JSONRenderer().render(TicketListSerializer(make_tickets(size), many=True).data)
+
+        def run():
+            return encoder.compress(body)
+        run.info = {'bytes': len(body), 'compressed_bytes': len(run())}
+        return run
+    return factory
+
+
+for _size in PAYLOAD_SIZES:
+    benchmark(f'serializer.ticket_list.{_size}')(serializer_case(TicketListSerializer, _size))
+    benchmark(f'serializer.ticket_detail.{_size}')(serializer_case(TicketDetailSerializer, _size))
+    benchmark(f'render.json.{_size}')(render_case(_size))
+
+# 1000 фрагментов не помещаются в LocMemCache по умолчанию (MAX_ENTRIES=300)
+for _size in PAYLOAD_SIZES[:2]:
+    benchmark(f'fragments.ticket_list.{_size}')(fragment_case(_size))
+
+for _encoder in compression.available_encoders(('br', 'zstd', 'gzip')):
+    for _size in PAYLOAD_SIZES[1:]:
+        benchmark(f'compress.{_encoder.name}.{_size}')(compress_case(_encoder, _size))
+
+
+@benchmark('serializer.user')
+def user_serializer():
+    user = make_users()[User.Role.OPERATOR]
+    return lambda: UserSerializer(user).data
+
+
+@benchmark('permissions.roles')
+def role_permissions():
+    """
+    Все ролевые классы прав для пользователей всех ролей (12 проверок за вызов)
+    """
+    requests = [SimpleNamespace(user=user) for user in make_users().values()]
+    permissions = [IsRequester(), IsOperator(), IsExecutor(), IsRequesterOrOperator()]
+
+    def run():
+        for request in requests:
+            for permission in permissions:
+                permission.has_permission(request, None)
+    return run
+
+
+def error_storm_case(queued):
+    """
+    Цена logger.exception для потока запроса при лавине одинаковых ошибок:
+    файл и письмо администраторам синхронно (как было) или через очередь.
+    Письма уходят в locmem-бэкенд, так что задержка SMTP в синхронный вариант
+    не входит — он показывает нижнюю границу.
+    """
+    def factory():
+        log_file = tempfile.NamedTemporaryFile(suffix='.log', delete=False).name
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(log_context.JsonFormatter())
+        email_backend = 'django.core.mail.backends.locmem.EmailBackend'
+        if queued:
+            handlers = [file_handler, log_context.ThrottledAdminEmailHandler(email_backend=email_backend)]
+            handlers = [log_context.queue_handler(handlers)]
+        else:
+            handlers = [file_handler, AdminEmailHandler(email_backend=email_backend)]
+
+        logger = logging.getLogger(f'perf.error_storm.{"queued" if queued else "sync"}')
+        logger.handlers = handlers
+        logger.setLevel(logging.ERROR)
+        logger.propagate = False
+        request = RequestFactory().get('/api/tickets/')
+
+        def run():
+            log_context.bind_request('bench', request)
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                logger.exception('Internal Server Error: %s', request.path, extra={
+                    'status_code': 500, 'request': request,
+                })
+            log_context.clear_request()
+        return run
+    return factory
+
+
+benchmark('logging.error_storm.sync')(error_storm_case(queued=False))
+benchmark('logging.error_storm.queued')(error_storm_case(queued=True))
+
+
+class RequestCycle:
+    """
+    Данные для запросов через тестовый клиент: пользователи ролей и заявки в тестовой БД
+    """
+    tickets = 50
+
+    def __init__(self):
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        users = {}
+        for role in User.Role.values:
+            users[role] = User.objects.create_user(
+                username=f'bench_{role.lower()}', password='password', role=role
+            )
+        Ticket.objects.bulk_create(
+            Ticket(
+                title=f'Заявка {index}', description='Описание ' * 10,
+                requester=users[User.Role.REQUESTER],
+                executor=users[User.Role.EXECUTOR] if index % 2 else None,
+                status=Ticket.Status.ASSIGNED if index % 2 else Ticket.Status.NEW,
+            )
+            for index in range(self.tickets)
+        )
+        self.ticket_id = Ticket.objects.order_by('id').values_list('id', flat=True).first()
+        self.clients = {}
+        self.jwt_clients = {}
+        for role, user in users.items():
+            client = APIClient()
+            client.force_authenticate(user)
+            self.clients[role] = client
+            # С настоящим токеном: в замер входит аутентификация JWT
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+            self.jwt_clients[role] = client
+
+    def get(self, role, path):
+        client = self.clients[role]
+
+        def run():
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+        return run
+
+
+_cycle = None
+
+
+def request_cycle():
+    global _cycle
+    if _cycle is None:
+        _cycle = RequestCycle()
+    return _cycle
+
+
+def reset_request_cycle():
+    global _cycle
+    _cycle = None
+
+
+@benchmark('request.tickets.list', needs_db=True)
+def request_list():
+    return request_cycle().get(User.Role.OPERATOR, '/api/tickets/')
+
+
+@benchmark('request.tickets.all_tickets', needs_db=True)
+def request_all_tickets():
+    return request_cycle().get(User.Role.OPERATOR, '/api/tickets/all-tickets/')
+
+
+@benchmark('request.tickets.all_tickets.normalized', needs_db=True)
+def request_all_tickets_normalized():
+    return request_cycle().get(User.Role.OPERATOR, '/api/tickets/all-tickets/?normalized=true')
+
+
+@benchmark('request.tickets.my_tickets', needs_db=True)
+def request_my_tickets():
+    return request_cycle().get(User.Role.REQUESTER, '/api/tickets/my-tickets/')
+
+
+@benchmark('request.tickets.retrieve', needs_db=True)
+def request_retrieve():
+    cycle = request_cycle()
+    return cycle.get(User.Role.OPERATOR, f'/api/tickets/{cycle.ticket_id}/')
+
+
+def instrumentation_case(sample_rate):
+    """
+    Карточка заявки с замером запроса (Server-Timing, гистограммы /metrics) и без него:
+    разница медиан — накладные расходы PerformanceMiddleware на запрос
+    """
+    def factory():
+        from django.test import override_settings
+
+        cycle = request_cycle()
+        client = cycle.clients[User.Role.OPERATOR]
+        path = f'/api/tickets/{cycle.ticket_id}/'
+
+        def run():
+            with override_settings(METRICS_SAMPLE_RATE=sample_rate):
+                response = client.get(path)
+            assert response.status_code == 200, response.status_code
+            assert ('Server-Timing' in response) == bool(sample_rate)
+        return run
+    return factory
+
+
+benchmark('instrumentation.request.sampled', needs_db=True)(instrumentation_case(1.0))
+benchmark('instrumentation.request.unsampled', needs_db=True)(instrumentation_case(0.0))
+
+
+@benchmark('instrumentation.middleware')
+def instrumentation_middleware():
+    """
+    PerformanceMiddleware вокруг пустого представления: собственная цена замера
+    запроса без шума БД и сериализации (при METRICS_SAMPLE_RATE из настроек)
+    """
+    from django.conf import settings
+    from django.http import HttpResponse
+    from django.urls import resolve
+
+    from config.middleware import PerformanceMiddleware
+
+    request = RequestFactory().get('/api/tickets/1/')
+    request.resolver_match = resolve('/api/tickets/1/')
+    middleware = PerformanceMiddleware(lambda request: HttpResponse())
+
+    def run():
+        middleware(request)
+    run.info = {'sample_rate': settings.METRICS_SAMPLE_RATE}
+    return run
+
+
+@benchmark('instrumentation.overhead', needs_db=True)
+def instrumentation_overhead():
+    """
+    Цена PerformanceMiddleware относительно медианы запроса карточки заявки.
+    Запрос с замером и запрос через цепочку middleware без него идут парами
+    в случайном порядке; накладные расходы — медиана разностей в парах, поэтому
+    дрейф нагрузки машины в результат не попадает. Для устойчивого числа нужны
+    тысячи пар: --min-time 60 и больше.
+    """
+    from django.conf import settings
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    cycle = request_cycle()
+    path = f'/api/tickets/{cycle.ticket_id}/'
+    measured = cycle.clients[User.Role.OPERATOR]
+    bare = APIClient()
+    bare.force_authenticate(User.objects.get(username='bench_operator'))
+    middleware = [name for name in settings.MIDDLEWARE
+                  if name != 'config.middleware.PerformanceMiddleware']
+    # Цепочка middleware клиента собирается при первом запросе и дальше не меняется
+    with override_settings(MIDDLEWARE=middleware):
+        bare.get(path)
+    durations = {measured: [], bare: []}
+
+    def run():
+        order = [measured, bare]
+        random.shuffle(order)
+        with override_settings(METRICS_SAMPLE_RATE=1.0):
+            for client in order:
+                started = time.perf_counter()
+                response = client.get(path)
+                durations[client].append(time.perf_counter() - started)
+                assert response.status_code == 200, response.status_code
+
+    def info():
+        base = statistics.median(durations[bare])
+        overhead = statistics.median(
+            with_middleware - without
+            for with_middleware, without in zip(durations[measured], durations[bare])
+        )
+        return {
+            'request_us': round(base * 1e6, 1),
+            'overhead_us': round(overhead * 1e6, 1),
+            'overhead_pct': round(overhead / base * 100, 2),
+            'pairs': len(durations[bare]),
+        }
+    run.info = info
+    return run
+
+
+# Стартовая страница исполнителя: профиль, назначенные заявки и общий список
+LANDING_PATHS = ('/api/auth/profile/', '/api/tickets/assigned-to-me/', '/api/tickets/?page_size=5')
+
+
+@benchmark('request.landing.separate', needs_db=True)
+def request_landing_separate():
+    """
+    Стартовая страница отдельными запросами, каждый со своей проверкой JWT
+    """
+    client = request_cycle().jwt_clients[User.Role.EXECUTOR]
+
+    def run():
+        for path in LANDING_PATHS:
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+    return run
+
+
+def landing_batch_case(parallel):
+    """
+    Та же страница одним пакетным запросом /api/batch/
+    """
+    def factory():
+        client = request_cycle().jwt_clients[User.Role.EXECUTOR]
+        payload = {'parallel': parallel, 'requests': [{'path': path} for path in LANDING_PATHS]}
+
+        def run():
+            response = client.post('/api/batch/', payload, format='json')
+            assert response.status_code == 200, response.status_code
+        return run
+    return factory
+
+
+benchmark('request.landing.batch', needs_db=True)(landing_batch_case(parallel=False))
+benchmark('request.landing.batch.parallel', needs_db=True)(landing_batch_case(parallel=True))
+
+
+def compare(baseline, results, threshold):
+    """
+    Регрессии относительно базовой линии: [(имя, было, стало, изменение в %)],
+    если медиана выросла больше чем на threshold процентов
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get('median_us'):
+            continue
+        change = (result['median_us'] - previous['median_us']) / previous['median_us'] * 100
+        result['change_pct'] = round(change, 1)
+        if change > threshold:
+            regressions.append((name, previous['median_us'], result['median_us'], change))
+    return regressions
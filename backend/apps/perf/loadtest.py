@@ -0,0 +1,435 @@
+"""
+Нагрузочное тестирование ролевых сценариев на asyncio.
+
+Виртуальные пользователи входят через /api/auth/login/ и выполняют сценарий
+своей роли: заявители создают заявки и опрашивают my-tickets, операторы
+листают all-tickets и назначают исполнителей, исполнители опрашивают
+assigned-to-me и выполняют заявки. Запросы идут либо по HTTP в запущенный
+сервис, либо напрямую в ASGI/WSGI-приложение внутри процесса.
+"""
+import asyncio
+import io
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+
+PERCENTILES = (50, 95, 99)
+
+
+class Response:
+    __slots__ = ('status', 'body')
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+
+def _encode_body(data):
+    if data is None:
+        return b''
+    return json.dumps(data).encode()
+
+
+def _headers(token, body):
+    headers = [('Content-Type', 'application/json'), ('Accept', 'application/json')]
+    if token:
+        headers.append(('Authorization', f'Bearer {token}'))
+    if body:
+        headers.append(('Content-Length', str(len(body))))
+    return headers
+
+
+class HttpTransport:
+    """
+    Минимальный HTTP/1.1-клиент с keep-alive: одно соединение на виртуального пользователя
+    """
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = parts.scheme == 'https'
+        self.prefix = parts.path.rstrip('/')
+
+    def session(self):
+        return _HttpSession(self)
+
+
+class _HttpSession:
+    def __init__(self, transport):
+        self.transport = transport
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, data=None, token=None):
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(
+                    self.transport.host, self.transport.port, ssl=self.transport.ssl or None
+                )
+            try:
+                return await self._send(method, path, data, token)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Сервер закрыл keep-alive соединение: переподключаемся один раз
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _send(self, method, path, data, token):
+        body = _encode_body(data)
+        lines = [f'{method} {self.transport.prefix}{path} HTTP/1.1',
+                 f'Host: {self.transport.host}']
+        lines += [f'{name}: {value}' for name, value in _headers(token, body)]
+        if not body and method not in ('GET', 'HEAD'):
+            lines.append('Content-Length: 0')
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding') == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            payload = b''.join(chunks)
+        else:
+            payload = await self.reader.readexactly(int(headers.get('content-length', 0)))
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return Response(status, payload)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        self.reader = self.writer = None
+
+
+class AsgiTransport:
+    """
+    Вызов ASGI-приложения Django внутри процесса, без сети
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def session(self):
+        return self
+
+    async def request(self, method, path, data=None, token=None):
+        body = _encode_body(data)
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'headers': [(name.lower().encode(), value.encode())
+                        for name, value in _headers(token, body)],
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 0),
+        }
+        finished = asyncio.Event()
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        status = 500
+        chunks = []
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    finished.set()
+
+        await self.application(scope, receive, send)
+        finished.set()
+        return Response(status, b''.join(chunks))
+
+    async def close(self):
+        pass
+
+
+class WsgiTransport:
+    """
+    Вызов WSGI-приложения внутри процесса в пуле потоков
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def session(self):
+        return self
+
+    async def request(self, method, path, data=None, token=None):
+        return await asyncio.to_thread(self._call, method, path, data, token)
+
+    def _call(self, method, path, data, token):
+        body = _encode_body(data)
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            'CONTENT_LENGTH': str(len(body)),
+        }
+        for name, value in _headers(token, body):
+            key = name.upper().replace('-', '_')
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = f'HTTP_{key}'
+            environ[key] = value
+
+        result = {}
+
+        def start_response(status, headers, exc_info=None):
+            result['status'] = int(status.split()[0])
+
+        chunks = self.application(environ, start_response)
+        try:
+            payload = b''.join(chunks)
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        return Response(result['status'], payload)
+
+    async def close(self):
+        pass
+
+
+class Stats:
+    """
+    Задержки и коды ответов по эндпоинтам
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def add(self, endpoint, seconds, status):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        codes = self.statuses.setdefault(endpoint, {})
+        codes[status] = codes.get(status, 0) + 1
+        if status >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'errors': self.errors.get(endpoint, 0),
+                'throughput_rps': round(len(values) / elapsed, 2),
+                'mean_ms': round(sum(values) / len(values) * 1000, 2),
+                **{f'p{p}_ms': round(percentile(values, p) * 1000, 2) for p in PERCENTILES},
+                'max_ms': round(values[-1] * 1000, 2),
+                'statuses': {str(code): count for code, count in sorted(self.statuses[endpoint].items())},
+            }
+        total = sum(item['requests'] for item in endpoints.values())
+        return {
+            'requests': total,
+            'errors': sum(item['errors'] for item in endpoints.values()),
+            'throughput_rps': round(total / elapsed, 2),
+            'endpoints': endpoints,
+        }
+
+
+def percentile(sorted_values, p):
+    """
+    Перцентиль методом ближайшего ранга
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class VirtualUser:
+    """
+    Виртуальный пользователь: вход и цикл сценария своей роли
+    """
+
+    def __init__(self, runner, role, username):
+        self.runner = runner
+        self.role = role
+        self.username = username
+        self.session = runner.transport.session()
+        self.rng = random.Random(f'{runner.seed}:{username}')
+        self.token = None
+        self.user_id = None
+
+    async def call(self, method, path, endpoint=None, data=None):
+        started = time.perf_counter()
+        try:
+            response = await self.session.request(method, path, data=data, token=self.token)
+        except (OSError, asyncio.IncompleteReadError):
+            self.runner.stats.add(endpoint or f'{method} {path}', time.perf_counter() - started, 599)
+            return None
+        self.runner.stats.add(endpoint or f'{method} {path}', time.perf_counter() - started, response.status)
+        return response
+
+    async def login(self):
+        response = await self.call('POST', '/api/auth/login/', data={
+            'username': self.username, 'password': self.runner.password,
+        })
+        if response is None or response.status != 200:
+            return False
+        payload = response.json()
+        self.token = payload['tokens']['access']
+        self.user_id = payload['user']['id']
+        return True
+
+    async def run(self, deadline):
+        while time.monotonic() < deadline:
+            await getattr(self, f'step_{self.role.lower()}')()
+            # Поток Пуассона: экспоненциальные паузы со средним 1 / rate
+            await asyncio.sleep(self.rng.expovariate(self.runner.rates[self.role]))
+        await self.session.close()
+
+    async def step_requester(self):
+        if self.rng.random() < 0.3:
+            await self.call('POST', '/api/tickets/', data={
+                'title': f'Нагрузочный тест {self.rng.randint(1, 10 ** 6)}',
+                'description': 'Создано нагрузочным тестом',
+                'priority': self.rng.choice(['LOW', 'MEDIUM', 'HIGH', 'URGENT']),
+            })
+        else:
+            await self.call('GET', '/api/tickets/my-tickets/')
+
+    async def step_operator(self):
+        page = self.rng.randint(1, self.runner.max_page)
+        response = await self.call(
+            'GET', f'/api/tickets/all-tickets/?page={page}', 'GET /api/tickets/all-tickets/'
+        )
+        if response is None or response.status != 200 or not self.runner.executor_ids:
+            return
+        new_tickets = [item['id'] for item in response.json()['results'] if item['status'] == 'NEW']
+        if new_tickets:
+            await self.call(
+                'POST', f'/api/tickets/{self.rng.choice(new_tickets)}/assign/',
+                'POST /api/tickets/{id}/assign/',
+                data={'executor_id': self.rng.choice(self.runner.executor_ids)},
+            )
+
+    async def step_executor(self):
+        response = await self.call('GET', '/api/tickets/assigned-to-me/')
+        if response is None or response.status != 200:
+            return
+        payload = response.json()
+        items = payload['results'] if isinstance(payload, dict) else payload
+        assigned = [item['id'] for item in items if item['status'] == 'ASSIGNED']
+        if assigned and self.rng.random() < 0.5:
+            await self.call(
+                'POST', f'/api/tickets/{self.rng.choice(assigned)}/execute/',
+                'POST /api/tickets/{id}/execute/',
+                data={'comment': 'Выполнено нагрузочным тестом'},
+            )
+
+
+class LoadTest:
+    """
+    Запуск смешанной нагрузки: concurrency — число виртуальных пользователей по ролям,
+    rates — средняя частота шагов сценария одного пользователя в секунду
+    """
+
+    def __init__(self, transport, concurrency, rates, duration, prefix='seed',
+                 password='password', seed=42, max_page=5):
+        self.transport = transport
+        self.concurrency = concurrency
+        self.rates = rates
+        self.duration = duration
+        self.prefix = prefix
+        self.password = password
+        self.seed = seed
+        self.max_page = max_page
+        self.stats = Stats()
+        self.executor_ids = []
+
+    async def run(self):
+        users = [
+            VirtualUser(self, role, f'{self.prefix}_{role.lower()}_{index}')
+            for role, count in self.concurrency.items()
+            for index in range(count)
+        ]
+        logged_in = await asyncio.gather(*(user.login() for user in users))
+        active = [user for user, ok in zip(users, logged_in) if ok]
+        self.executor_ids = [user.user_id for user in active if user.role == 'EXECUTOR']
+
+        started = time.monotonic()
+        await asyncio.gather(*(user.run(started + self.duration) for user in active))
+        elapsed = time.monotonic() - started
+
+        return {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'duration_s': round(elapsed, 2),
+            'concurrency': self.concurrency,
+            'rates': self.rates,
+            'logged_in': len(active),
+            'login_failures': len(users) - len(active),
+            **self.stats.report(elapsed),
+        }
+
+
+def compare(previous, current):
+    """
+    Изменение p95 и пропускной способности относительно прошлого отчета, в процентах
+    """
+    changes = {}
+    for endpoint, item in current['endpoints'].items():
+        before = previous.get('endpoints', {}).get(endpoint)
+        if not before:
+            continue
+        changes[endpoint] = {
+            metric: round((item[metric] - before[metric]) / before[metric] * 100, 1)
+            for metric in ('p95_ms', 'throughput_rps') if before[metric]
+        }
+    return changes
@@ -0,0 +1,114 @@
+"""
+Микробенчмарки с сохранением базовой линии и проверкой регрессий
+"""
+import fnmatch
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from apps.perf.benchmarks import BENCHMARKS, compare, measure, reset_request_cycle
+from apps.perf.throttling import unthrottled
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет сериализаторы, ролевые права, JSON-рендеринг и сжатие (1/20/1000 заявок), '
+        'цену логирования при лавине ошибок '
+        'и полный цикл запросов к TicketViewSet через тестовый клиент. '
+        'Запросы выполняются к отдельной тестовой БД (SQLite или PostgreSQL из настроек).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filter', action='append', default=[],
+                            help='Шаблон имен (fnmatch), например "serializer.*"; можно повторять')
+        parser.add_argument('--list', action='store_true', help='Только вывести имена')
+        parser.add_argument('--repeat', type=int, default=5, help='Число серий замера')
+        parser.add_argument('--min-time', type=float, default=0.2,
+                            help='Минимальная суммарная длительность замера одного бенчмарка, сек')
+        parser.add_argument('--baseline', help='JSON базовой линии для сравнения')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Допустимый рост медианы относительно базовой линии, %%')
+        parser.add_argument('--save', help='Сохранить результаты в JSON (новая базовая линия)')
+
+    def handle(self, *args, **options):
+        names = [
+            name for name in BENCHMARKS
+            if not options['filter']
+            or any(fnmatch.fnmatchcase(name, pattern) for pattern in options['filter'])
+        ]
+        if not names:
+            raise CommandError('Ни один бенчмарк не подходит под --filter')
+        if options['list']:
+            for name in names:
+                self.stdout.write(name)
+            return
+
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)['results']
+
+        results = {}
+        for name in names:
+            factory, needs_db = BENCHMARKS[name]
+            if not needs_db:
+                results[name] = self.run(name, factory, options)
+        db_names = [name for name in names if BENCHMARKS[name][1]]
+        if db_names:
+            results.update(self.run_with_test_db(db_names, options))
+
+        regressions = compare(baseline, results, options['threshold'])
+        self.print_results(results)
+
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump({'vendor': connection.vendor, 'results': results}, file,
+                          ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Результаты сохранены в {options["save"]}'))
+
+        if regressions:
+            lines = [
+                f'  {name}: {before} -> {after} мкс ({change:+.1f}%)'
+                for name, before, after, change in regressions
+            ]
+            raise CommandError(
+                f'Регрессия больше {options["threshold"]}%:\n' + '\n'.join(lines)
+            )
+
+    def run(self, name, factory, options):
+        func = factory()
+        result = measure(func, repeat=options['repeat'], min_time=options['min_time'])
+        info = getattr(func, 'info', {})
+        result.update(info() if callable(info) else info)
+        self.stdout.write(f'  {name}: {result["median_us"]} мкс')
+        return result
+
+    def run_with_test_db(self, names, options):
+        """
+        Бенчмарки полного цикла запроса: тестовая БД создается и удаляется здесь
+        """
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with unthrottled():
+                return {name: self.run(name, BENCHMARKS[name][0], options) for name in names}
+        finally:
+            reset_request_cycle()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def print_results(self, results):
+        self.stdout.write(f'\n{"benchmark":36} {"median, мкс":>14} {"min, мкс":>12} {"изм.":>8}')
+        for name, result in results.items():
+            change = result.get('change_pct')
+            change = f'{change:+.1f}%' if change is not None else ''
+            line = f'{name:36} {result["median_us"]:>14} {result["min_us"]:>12} {change:>8}'
+            if 'compressed_bytes' in result:
+                line += f'  {result["bytes"]} -> {result["compressed_bytes"]} байт'
+            if 'overhead_pct' in result:
+                line += (f'  +{result["overhead_us"]} мкс ({result["overhead_pct"]:+.2f}%) '
+                         f'к запросу {result["request_us"]} мкс, пар: {result["pairs"]}')
+            self.stdout.write(line)
@@ -0,0 +1,106 @@
+"""
+Сравнение профилей процесса: время запуска, память и накладные расходы на запрос
+"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PROFILES = (
+    'production=config.settings.production',
+    'api=config.settings.api',
+    'admin=config.settings.admin',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает каждый профиль настроек в отдельных интерпретаторах и сравнивает '
+        'время холодного старта, первый запрос, резидентную память и медиану времени запроса '
+        '(лучшие значения по --runs запускам) '
+        'без обращения к БД (по умолчанию GET /api/tickets/ без токена -> 401, через все '
+        'middleware и аутентификацию DRF). Нужны переменные окружения production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', default=[],
+                            help='имя=модуль настроек; можно повторять. Первый — базовый для сравнения')
+        parser.add_argument('--runs', type=int, default=10, help='Запусков интерпретатора на профиль')
+        parser.add_argument('--requests', type=int, default=500, help='Запросов в каждом запуске')
+        parser.add_argument('--path', default='/api/tickets/', help='Путь запроса')
+        parser.add_argument('--save', help='Сохранить результаты в JSON')
+
+    def handle(self, *args, **options):
+        profiles = []
+        for item in options['profile'] or DEFAULT_PROFILES:
+            name, _, module = item.partition('=')
+            if not module:
+                raise CommandError(f'--profile: ожидается имя=модуль, получено {item!r}')
+            profiles.append((name, module))
+
+        # Профили запускаются поочередно, чтобы дрейф нагрузки машины
+        # сказывался на всех одинаково
+        runs = {name: [] for name, _ in profiles}
+        for run in range(options['runs']):
+            for name, module in profiles:
+                runs[name].append(self.run_once(module, options))
+            self.stdout.write(f'  запуск {run + 1}/{options["runs"]}')
+        results = {name: self.summarize(profile_runs) for name, profile_runs in runs.items()}
+
+        self.print_results(results)
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Результаты сохранены в {options["save"]}'))
+
+    def run_once(self, module, options):
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-m', 'apps.perf.startup', module,
+             str(options['requests']), options['path']],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        elapsed = time.perf_counter() - started
+        if process.returncode != 0:
+            raise CommandError(f'{module}:\n{process.stderr[-2000:]}')
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        # Полное время процесса, включая запуск интерпретатора и выход
+        result['process_ms'] = round(elapsed * 1000, 1)
+        return result
+
+    @staticmethod
+    def summarize(runs):
+        """
+        Времена — лучшие по запускам (шум машины только увеличивает их), память —
+        медиана; счетчики (приложения, модули, код ответа) — из первого запуска
+        """
+        summary = dict(runs[0])
+        for key in runs[0]:
+            if key.endswith(('_ms', '_us')):
+                summary[key] = min(run[key] for run in runs)
+            elif key.endswith('_mb'):
+                summary[key] = round(statistics.median(run[key] for run in runs), 1)
+        return summary
+
+    def print_results(self, results):
+        columns = (
+            ('startup_ms', 'запуск, мс'), ('first_request_ms', '1-й запрос, мс'),
+            ('rss_mb', 'RSS, МБ'), ('request_us', 'запрос, мкс'), ('modules', 'модулей'),
+        )
+        self.stdout.write('\n' + f'{"profile":12}' + ''.join(f'{title:>18}' for _, title in columns))
+        base = next(iter(results.values()))
+        for name, result in results.items():
+            cells = []
+            for key, _ in columns:
+                cell = str(result[key])
+                if result is not base and base[key]:
+                    cell += f' ({(result[key] - base[key]) / base[key] * 100:+.0f}%)'
+                cells.append(f'{cell:>18}')
+            self.stdout.write(f'{name:12}' + ''.join(cells))
+        statuses = {name: result['status'] for name, result in results.items()}
+        if len(set(statuses.values())) > 1:
+            self.stdout.write(self.style.WARNING(f'Разные коды ответа: {statuses}'))
@@ -0,0 +1,106 @@
+"""
+Нагрузочный тест ролевых сценариев
+"""
+import asyncio
+import contextlib
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.perf.loadtest import AsgiTransport, HttpTransport, LoadTest, WsgiTransport, compare
+from apps.perf.throttling import unthrottled
+
+
+ROLES = ('REQUESTER', 'OPERATOR', 'EXECUTOR')
+
+
+class Command(BaseCommand):
+    help = (
+        'Смешанная нагрузка от заявителей, операторов и исполнителей. '
+        'Пользователи берутся из команды seed (логины <prefix>_<роль>_<N>). '
+        'Результат — JSON с пропускной способностью и p50/p95/p99 по эндпоинтам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', default='asgi',
+            help='URL запущенного сервиса (http://host:port) либо asgi/wsgi для вызова '
+                 'приложения внутри процесса. По умолчанию asgi.'
+        )
+        parser.add_argument('--duration', type=float, default=30, help='Длительность, сек')
+        for role in ROLES:
+            parser.add_argument(
+                f'--{role.lower()}s', type=int, default=5,
+                help=f'Число виртуальных пользователей с ролью {role}'
+            )
+            parser.add_argument(
+                f'--{role.lower()}-rate', type=float, default=1.0,
+                help=f'Шагов сценария в секунду на одного {role}'
+            )
+        parser.add_argument('--prefix', default='seed', help='Префикс логинов из seed')
+        parser.add_argument('--password', default='password', help='Пароль пользователей')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--max-page', type=int, default=5,
+                            help='Операторы листают all-tickets в пределах этих страниц')
+        parser.add_argument('--output', default='loadtest.json', help='Файл отчета')
+        parser.add_argument('--compare', help='Прошлый отчет для сравнения')
+
+    def handle(self, *args, **options):
+        transport = self.get_transport(options['target'])
+        test = LoadTest(
+            transport,
+            concurrency={role: options[f'{role.lower()}s'] for role in ROLES},
+            rates={role: options[f'{role.lower()}_rate'] for role in ROLES},
+            duration=options['duration'],
+            prefix=options['prefix'],
+            password=options['password'],
+            seed=options['seed'],
+            max_page=options['max_page'],
+        )
+        # Внутри процесса все пользователи входят с одного адреса — лимиты снимаются
+        in_process = not isinstance(transport, HttpTransport)
+        with unthrottled() if in_process else contextlib.nullcontext():
+            report = asyncio.run(test.run())
+        report['target'] = options['target']
+
+        if options['compare']:
+            with open(options['compare']) as previous:
+                report['compared_to'] = options['compare']
+                report['changes_pct'] = compare(json.load(previous), report)
+
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+
+        self.print_report(report)
+        self.stdout.write(self.style.SUCCESS(f'Отчет сохранен в {options["output"]}'))
+
+    def get_transport(self, target):
+        if target == 'asgi':
+            from config.asgi import application
+            return AsgiTransport(application)
+        if target == 'wsgi':
+            from config.wsgi import application
+            return WsgiTransport(application)
+        if target.startswith(('http://', 'https://')):
+            return HttpTransport(target)
+        raise CommandError('--target: ожидается http(s)://..., asgi или wsgi')
+
+    def print_report(self, report):
+        if report['login_failures']:
+            self.stdout.write(self.style.WARNING(
+                f'Не удалось войти: {report["login_failures"]} пользователей'
+            ))
+        self.stdout.write(
+            f'Запросов: {report["requests"]}, ошибок: {report["errors"]}, '
+            f'{report["throughput_rps"]} req/s'
+        )
+        header = f'{"endpoint":45} {"req":>7} {"err":>5} {"rps":>8} {"p50":>8} {"p95":>8} {"p99":>8}'
+        self.stdout.write(header)
+        changes = report.get('changes_pct', {})
+        for endpoint, item in report['endpoints'].items():
+            line = (f'{endpoint:45} {item["requests"]:>7} {item["errors"]:>5} '
+                    f'{item["throughput_rps"]:>8} {item["p50_ms"]:>8} {item["p95_ms"]:>8} '
+                    f'{item["p99_ms"]:>8}')
+            if endpoint in changes and 'p95_ms' in changes[endpoint]:
+                line += f'  p95 {changes[endpoint]["p95_ms"]:+.1f}%'
+            self.stdout.write(line)
@@ -0,0 +1,107 @@
+"""
+Замер профиля процесса в отдельном интерпретаторе:
+
+    python -m apps.perf.startup <модуль настроек> <число запросов> <путь>
+
+Печатает JSON: время запуска приложения, время первого запроса (в нем
+загружаются маршруты), резидентную память процесса и время последующих запросов.
+Запросы идут прямо в WSGI-приложение, без сети.
+"""
+import time
+
+STARTED = time.perf_counter()
+
+import io  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import resource  # noqa: E402
+import statistics  # noqa: E402
+import sys  # noqa: E402
+
+
+def make_environ(path, host):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '443',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host,
+        'HTTP_ACCEPT': 'application/json',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        # https, чтобы SECURE_SSL_REDIRECT не превращал запрос в редирект
+        'wsgi.url_scheme': 'https',
+        'wsgi.input': io.BytesIO(b''),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def call(application, path, host):
+    """
+    Время одного запроса (сек) и код ответа
+    """
+    result = {}
+
+    def start_response(status, headers, exc_info=None):
+        result['status'] = int(status.split()[0])
+
+    started = time.perf_counter()
+    chunks = application(make_environ(path, host), start_response)
+    try:
+        b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return time.perf_counter() - started, result['status']
+
+
+def rss_mb():
+    """
+    Резидентная память процесса. ru_maxrss не подходит: в Linux он наследуется
+    от родителя через exec и показал бы память manage.py
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def main():
+    settings_module, requests, path = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    startup = time.perf_counter() - STARTED
+    host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+
+    first_request, status = call(application, path, host)
+    rss_after_first = rss_mb()
+    samples = [call(application, path, host)[0] for _ in range(requests)]
+    print(json.dumps({
+        'settings': settings_module,
+        'status': status,
+        'apps': len(settings.INSTALLED_APPS),
+        'middleware': len(settings.MIDDLEWARE),
+        'modules': len(sys.modules),
+        'startup_ms': round(startup * 1000, 1),
+        'first_request_ms': round(first_request * 1000, 1),
+        'rss_mb': rss_after_first,
+        'request_us': round(statistics.median(samples) * 1e6, 1),
+        'request_min_us': round(min(samples) * 1e6, 1),
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+"""
+Отключение лимитов частоты запросов для замеров внутри процесса
+"""
+import sys
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+
+def unthrottled():
+    """
+    Лимиты без практических ограничений (счетчики при этом ведутся) — для бенчмарков
+    и нагрузочных тестов внутри процесса, где все клиенты приходят с одного адреса
+    """
+    return override_settings(
+        THROTTLE_ROLE_LIMITS=dict.fromkeys(settings.THROTTLE_ROLE_LIMITS, sys.maxsize),
+        THROTTLE_ANON_LIMIT=sys.maxsize,
+    )
@@ -1,20 +1,86 @@
 """
 Административная панель для заявок
 """
+from datetime import datetime
+
 from django.contrib import admin
-from .models import Ticket
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from .models import ArchivedTicket, Ticket
+from .pagination import EstimatedCountPaginator
+from .partitioning import add_months, month_start
+
+User = get_user_model()
+
+
+class DateRangeQuerySet(models.QuerySet):
+    """
+    Годы и месяцы для date_hierarchy из MIN/MAX по индексу,
+    а не SELECT DISTINCT date_trunc(...) по всей таблице.
+    Дни в пределах месяца считаются обычным способом — это одна секция.
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month'):
+            return super().datetimes(field_name, kind, order, tzinfo)
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds['first'] is None:
+            return []
+        tz = tzinfo or timezone.get_current_timezone()
+        first, last = (month_start(timezone.localtime(value, tz)) for value in bounds.values())
+        if kind == 'year':
+            first, last = first.replace(month=1), last.replace(month=1)
+        step = 12 if kind == 'year' else 1
+        values = []
+        while first <= last:
+            values.append(datetime(first.year, first.month, 1, tzinfo=tz))
+            first = add_months(first, step)
+        return values[::-1] if order == 'DESC' else values
+
+
+class TicketSearchMixin:
+    """
+    Поиск в списке заявок без ILIKE по присоединенным пользователям:
+    число ищется по id, логин пользователя — через уникальный индекс username,
+    а затем по индексам requester/executor; остальное — подстрокой заголовка
+    по триграммному индексу (миграция tickets.0008). Описание не ищется.
+    """
+    search_fields = ('title',)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        user_ids = list(User.objects.filter(username=term).values_list('id', flat=True))
+        if user_ids:
+            return queryset.filter(Q(requester_id__in=user_ids) | Q(executor_id__in=user_ids)), False
+        return queryset.filter(title__icontains=term), False
 
 
 @admin.register(Ticket)
-class TicketAdmin(admin.ModelAdmin):
+class TicketAdmin(TicketSearchMixin, admin.ModelAdmin):
     """
     Административная панель для модели Ticket
     """
     list_display = ('id', 'title', 'status', 'priority', 'requester', 
-                    'executor', 'created_at', 'completed_at')
-    list_filter = ('status', 'priority', 'created_at')
-    search_fields = ('title', 'description', 'requester__username', 'executor__username')
-    readonly_fields = ('created_at', 'updated_at')
+                    'executor', 'created_at', 'due_at', 'completed_at')
+    list_filter = ('status', 'priority')
+    list_select_related = ('requester', 'executor')
+    # Фильтр по дате — диапазоном created_at: индекс и отсечение секций
+    date_hierarchy = 'created_at'
+    autocomplete_fields = ('requester', 'executor')
+    readonly_fields = ('created_at', 'updated_at', 'due_at', 'version')
+    # Без COUNT(*) по всей таблице на каждой загрузке списка
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return DateRangeQuerySet(self.model, query=queryset.query)
     
     fieldsets = (
         ('Основная информация', {
@@ -24,6 +90,25 @@ class TicketAdmin(admin.ModelAdmin):
             'fields': ('requester', 'executor')
         }),
         ('Временные метки', {
-            'fields': ('created_at', 'updated_at', 'completed_at')
+            'fields': ('created_at', 'updated_at', 'due_at', 'completed_at', 'version')
         }),
     )
+
+
+@admin.register(ArchivedTicket)
+class ArchivedTicketAdmin(TicketSearchMixin, admin.ModelAdmin):
+    """
+    Административная панель для архива заявок (только просмотр)
+    """
+    list_display = ('id', 'title', 'status', 'priority', 'requester',
+                    'executor', 'created_at', 'archived_at')
+    list_filter = ('status', 'priority')
+    list_select_related = ('requester', 'executor')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
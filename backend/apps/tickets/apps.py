@@ -5,3 +5,14 @@ class TicketsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.tickets'
     verbose_name = 'Заявки'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.models.signals import post_delete, post_save
+
+        from . import checks  # noqa: F401 — регистрация системных проверок
+        from . import fragments
+
+        # Пользователи вложены во фрагменты списков заявок
+        post_save.connect(fragments.bump_user_version, sender=settings.AUTH_USER_MODEL)
+        post_delete.connect(fragments.bump_user_version, sender=settings.AUTH_USER_MODEL)
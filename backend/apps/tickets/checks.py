@@ -0,0 +1,27 @@
+"""
+Системные проверки заявок
+"""
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.models)
+def check_ordering_indexes(app_configs, **kwargs):
+    """
+    Каждая разрешенная сортировка списков должна опираться на индекс с тем же первым столбцом
+    """
+    from .models import Ticket
+    from .serializers import TicketFilterSerializer
+
+    indexes = {index.name: index for index in Ticket._meta.indexes}
+    errors = []
+    for ordering, index_name in TicketFilterSerializer.ORDERING_INDEXES.items():
+        index = indexes.get(index_name)
+        if index is None or index.fields[0].lstrip('-') != ordering.lstrip('-'):
+            errors.append(Error(
+                f'Сортировка "{ordering}" не опирается на индекс {index_name}',
+                hint='Добавьте индекс в Ticket.Meta.indexes или уберите сортировку '
+                     'из TicketFilterSerializer.ORDERING_INDEXES',
+                obj=TicketFilterSerializer,
+                id='tickets.E001',
+            ))
+    return errors
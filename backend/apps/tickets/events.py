@@ -0,0 +1,104 @@
+"""
+Запись истории заявок с буферизацией в пределах транзакции изменения
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from .models import TicketEvent
+
+
+_buffer = ContextVar('ticket_event_buffer', default=None)
+
+
+def snapshot(ticket):
+    """
+    Состояние заявки до изменения, с которым сравнивается record_changes
+    """
+    return ticket.status, ticket.executor_id
+
+
+def record(ticket, kind, actor=None, **fields):
+    """
+    Добавляет событие в буфер atomic() или сразу пишет его в БД,
+    если буфер не открыт (management-команды, фоновые задачи)
+    """
+    event = TicketEvent(
+        ticket_id=ticket.pk,
+        actor_id=getattr(actor, 'pk', None),
+        kind=kind,
+        **fields
+    )
+    events = _buffer.get()
+    if events is None:
+        event.save()
+    else:
+        events.append(event)
+    return event
+
+
+def record_created(ticket, actor=None):
+    return record(
+        ticket, TicketEvent.Kind.CREATED, actor,
+        to_status=ticket.status,
+        to_executor_id=ticket.executor_id,
+    )
+
+
+def record_changes(ticket, before, actor=None, comment=''):
+    """
+    Записывает смену статуса и исполнителя относительно snapshot(), а также комментарий
+    """
+    status, executor_id = before
+    if ticket.status != status:
+        record(
+            ticket, TicketEvent.Kind.STATUS_CHANGED, actor,
+            from_status=status,
+            to_status=ticket.status,
+        )
+    if ticket.executor_id != executor_id:
+        record(
+            ticket, TicketEvent.Kind.EXECUTOR_CHANGED, actor,
+            from_executor_id=executor_id,
+            to_executor_id=ticket.executor_id,
+        )
+    if comment:
+        record(ticket, TicketEvent.Kind.COMMENTED, actor, comment=comment)
+
+
+def open_buffer():
+    """
+    Открывает буфер событий. Возвращает (список событий, токен для close_buffer)
+    """
+    events = []
+    return events, _buffer.set(events)
+
+
+def close_buffer(token):
+    _buffer.reset(token)
+
+
+def flush(events):
+    """
+    Сохраняет накопленные события одной многострочной вставкой
+    """
+    if events:
+        TicketEvent.objects.bulk_create(events)
+        events.clear()
+
+
+@contextmanager
+def atomic():
+    """
+    Транзакция изменения заявки. События, записанные внутри, сохраняются одной
+    вставкой в этой же транзакции перед фиксацией: изменение заявки и его история
+    фиксируются или откатываются вместе
+    """
+    with transaction.atomic():
+        buffered, token = open_buffer()
+        try:
+            yield
+        finally:
+            close_buffer(token)
+        flush(buffered)
@@ -0,0 +1,116 @@
+"""
+Кэш отрендеренного JSON отдельных заявок для сборки списков.
+
+Ключ фрагмента — id заявки, updated_at, вариант сериализатора (набор полей,
+раскрытые связи, язык) и версии пользователей, вложенных во фрагмент. Изменение
+заявки меняет updated_at, изменение или удаление пользователя — его версию,
+так что устаревшие фрагменты просто перестают читаться и истекают по TTL.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import get_language
+
+from config.renderers import FragmentJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+FRAGMENT_PREFIX = 'ticket:fragment'
+USER_VERSION_PREFIX = 'user:version'
+
+# Поля пользователя, которые не выводятся в заявках: их сохранение
+# (например, last_login при входе) не сбрасывает фрагменты
+IGNORED_USER_FIELDS = {'last_login', 'password'}
+
+renderer = FragmentJSONRenderer()
+
+
+def variant(serializer):
+    """
+    Короткий хэш формы вывода сериализатора (SparseFieldsMixin)
+    """
+    expanded = sorted(
+        (relation, sorted(nested) if nested is not None else None)
+        for relation, nested in serializer.expanded.items()
+    )
+    shape = repr((type(serializer).__name__, list(serializer.fields), expanded,
+                  serializer.normalized, get_language()))
+    return hashlib.blake2b(shape.encode(), digest_size=8).hexdigest()
+
+
+def user_versions(user_ids):
+    """
+    {id пользователя: версия}. Отсутствующая версия создается новой, а не
+    считается нулевой: иначе после вытеснения ключа из кэша снова читались бы
+    фрагменты, созданные до изменения пользователя.
+    """
+    keys = {f'{USER_VERSION_PREFIX}:{pk}': pk for pk in user_ids}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, pk in keys.items():
+        if key not in found:
+            version = time.time_ns()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+            versions[pk] = version
+    return versions
+
+
+def bump_user_version(sender, instance, update_fields=None, **kwargs):
+    """
+    Обработчик post_save/post_delete пользователя: новая версия после коммита,
+    чтобы параллельный запрос не сохранил под ней фрагмент со старыми данными
+    """
+    if update_fields and set(update_fields) <= IGNORED_USER_FIELDS:
+        return
+    key = f'{USER_VERSION_PREFIX}:{instance.pk}'
+    transaction.on_commit(lambda: set_user_version(key))
+
+
+def set_user_version(key):
+    # Вызывается после коммита: ошибка кэша не должна превращать сохраненное изменение в 500
+    try:
+        cache.set(key, time.time_ns(), None)
+    except Exception:
+        logger.warning('Кэш недоступен, версия пользователя %s не обновлена', key, exc_info=True)
+
+
+def render(serializer, tickets):
+    """
+    JSON каждой заявки из tickets (bytes): из кэша одним get_many, промахи
+    сериализуются и сохраняются одним set_many. Если кэш недоступен, все заявки
+    сериализуются без него.
+    """
+    try:
+        return render_cached(serializer, tickets)
+    except Exception:
+        logger.warning('Кэш фрагментов недоступен, список сериализуется без него', exc_info=True)
+        return [renderer.render_fragment(serializer.to_representation(ticket)) for ticket in tickets]
+
+
+def render_cached(serializer, tickets):
+    relations = list(serializer.expanded)
+    versions = user_versions({
+        getattr(ticket, f'{relation}_id') for ticket in tickets for relation in relations
+    } - {None}) if relations else {}
+    prefix = f'{FRAGMENT_PREFIX}:{variant(serializer)}'
+    keys = [
+        f'{prefix}:{ticket.pk}:{ticket.updated_at.timestamp()}' + ''.join(
+            f':{versions.get(getattr(ticket, f"{relation}_id"), 0)}' for relation in relations
+        )
+        for ticket in tickets
+    ]
+
+    fragments = cache.get_many(keys)
+    missing = {
+        key: renderer.render_fragment(serializer.to_representation(ticket))
+        for key, ticket in zip(keys, tickets) if key not in fragments
+    }
+    if missing:
+        cache.set_many(missing, settings.TICKET_FRAGMENT_TTL)
+        fragments.update(missing)
+    return [fragments[key] for key in keys]
@@ -0,0 +1,169 @@
+"""
+Заголовок Idempotency-Key для создающих и меняющих состояние POST-запросов
+"""
+import functools
+import hashlib
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Пока запрос выполняется, ключ заблокирован; блокировка снимается сама,
+# если процесс упал, не дождавшись ответа
+LOCK_TIMEOUT = 60
+POLL_INTERVAL = 0.05
+
+# Конфликт версий (409) и устаревший If-Match (412) не сохраняются: клиент перечитывает
+# заявку и повторяет запрос с тем же ключом и новым If-Match, и он выполняется заново
+NOT_STORED_STATUSES = (status.HTTP_409_CONFLICT, status.HTTP_412_PRECONDITION_FAILED)
+
+# Блокировки, которые снимет held_until_transaction_end(), если транзакция откатится
+_held_locks = ContextVar('idempotency_held_locks', default=None)
+
+PARAMETER = OpenApiParameter(
+    HEADER, str, location=OpenApiParameter.HEADER,
+    description='Уникальный ключ операции. Повтор запроса с тем же ключом и телом '
+                'возвращает сохраненный ответ (заголовок `Idempotent-Replayed: true`) '
+                'без повторного изменения заявки; тот же ключ с другим телом — 422, '
+                'пока первый запрос с ключом выполняется — 409.',
+)
+
+
+def fingerprint(request):
+    """
+    Хэш метода, пути и тела запроса
+    """
+    body = json.dumps(request.data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def replay(stored):
+    response = Response(stored['data'], status=stored['status'])
+    for name, value in stored.get('headers', {}).items():
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def wait_for_result(cache_key, timeout):
+    """
+    Ждет, пока параллельный запрос с тем же ключом сохранит ответ
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return stored
+    return None
+
+
+@contextmanager
+def held_until_transaction_end():
+    """
+    Блок вокруг transaction.atomic(), внутри которой выполняются идемпотентные действия.
+    Блокировка ключа держится до фиксации транзакции, когда сохраняется ответ. Если
+    транзакция откатилась, блокировки снимаются на выходе из блока, и повтор с тем же
+    ключом выполнится заново сразу, а не через LOCK_TIMEOUT.
+    """
+    locks = []
+    token = _held_locks.set(locks)
+    try:
+        yield
+    finally:
+        _held_locks.reset(token)
+        if locks:
+            cache.delete_many(locks)
+
+
+def idempotent(func):
+    """
+    Декоратор действия ViewSet: ответ на запрос с Idempotency-Key сохраняется в кэше
+    на IDEMPOTENCY_TTL секунд, повтор с тем же ключом и телом получает его без
+    выполнения действия. Ключи разных пользователей не пересекаются.
+
+    Ответы 5xx, 409 и 412 не сохраняются — такой запрос можно повторить с тем же ключом.
+    """
+    @functools.wraps(func)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return func(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'detail': f'{HEADER} длиннее {MAX_KEY_LENGTH} символов'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        cache_key = f'idempotency:{request.user.pk}:{digest}'
+        lock_key = f'{cache_key}:lock'
+        request_hash = fingerprint(request)
+
+        stored = cache.get(cache_key)
+        if stored is None:
+            if cache.add(lock_key, request_hash, LOCK_TIMEOUT):
+                # Первый запрос мог сохранить ответ и снять блокировку между get и add
+                stored = cache.get(cache_key)
+                if stored is None:
+                    return execute(func, self, request, args, kwargs,
+                                   cache_key, lock_key, request_hash)
+                cache.delete(lock_key)
+            else:
+                # Такой же запрос уже выполняется: ждем его ответа
+                stored = wait_for_result(cache_key, settings.IDEMPOTENCY_LOCK_WAIT)
+                if stored is None:
+                    return Response(
+                        {'detail': f'Запрос с этим {HEADER} еще выполняется, повторите позже'},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+        if stored['fingerprint'] != request_hash:
+            return Response(
+                {'detail': f'{HEADER} уже использован с другим запросом'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return replay(stored)
+    return wrapper
+
+
+def execute(func, view, request, args, kwargs, cache_key, lock_key, request_hash):
+    """
+    Выполняет действие под блокировкой ключа и сохраняет ответ. Внутри транзакции
+    (пакет с atomic) ответ сохраняется и блокировка снимается только после фиксации:
+    до нее повтор ждет, а после отката выполнится заново.
+    """
+    release = True
+    try:
+        response = func(view, request, *args, **kwargs)
+        if response.status_code < 500 and response.status_code not in NOT_STORED_STATUSES:
+            stored = {
+                'fingerprint': request_hash,
+                'status': response.status_code,
+                'headers': dict(response.items()),
+                'data': response.data,
+            }
+
+            def store():
+                cache.set(cache_key, stored, settings.IDEMPOTENCY_TTL)
+                cache.delete(lock_key)
+
+            if transaction.get_connection().in_atomic_block:
+                release = False
+                held = _held_locks.get()
+                if held is not None:
+                    held.append(lock_key)
+            transaction.on_commit(store)
+    finally:
+        if release:
+            cache.delete(lock_key)
+    return response
@@ -0,0 +1,86 @@
+"""
+Перенос старых завершенных заявок в архив небольшими транзакциями
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.tickets.models import ArchivedTicket, Ticket
+
+
+FINISHED_STATUSES = (Ticket.Status.COMPLETED, Ticket.Status.CLOSED)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит закрытые и выполненные заявки без изменений дольше N дней в архив. '
+        'Каждая пачка переносится в отдельной транзакции, поэтому команду можно '
+        'прервать и запустить снова.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=90,
+            help='Возраст заявки (по дате последнего изменения) в днях, по умолчанию 90'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Размер пачки, по умолчанию 500'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0.1,
+            help='Пауза между пачками в секундах, по умолчанию 0.1'
+        )
+        parser.add_argument(
+            '--limit', type=int,
+            help='Максимальное число заявок за запуск'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+        limit = options['limit']
+        last_id = 0
+        moved = 0
+
+        while limit is None or moved < limit:
+            size = batch_size if limit is None else min(batch_size, limit - moved)
+            last_id, count = self.move_batch(cutoff, last_id, size)
+            if not count:
+                break
+            moved += count
+            self.stdout.write(f'Перенесено {moved} (последний id {last_id})')
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Готово, перенесено заявок: {moved}'))
+
+    @transaction.atomic
+    def move_batch(self, cutoff, last_id, size):
+        """
+        Переносит одну пачку по возрастанию id. Строки, заблокированные другими
+        транзакциями, пропускаются и попадут в следующий запуск.
+        """
+        tickets = list(
+            Ticket.objects
+            .filter(status__in=FINISHED_STATUSES, updated_at__lt=cutoff, id__gt=last_id)
+            .order_by('id')
+            .select_for_update(skip_locked=True)[:size]
+        )
+        if not tickets:
+            return last_id, 0
+
+        # Строка с тем же id могла остаться в архиве (например, после прерванного запуска
+        # и восстановления заявки): архив получает текущие данные заявки, а не старые
+        ArchivedTicket.objects.bulk_create(
+            [ArchivedTicket.from_ticket(ticket) for ticket in tickets],
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=[name for name in ArchivedTicket.COPIED_FIELDS if name != 'id']
+            + ['archived_at'],
+        )
+        ids = [ticket.id for ticket in tickets]
+        Ticket.objects.filter(id__in=ids).delete()
+        return ids[-1], len(ids)
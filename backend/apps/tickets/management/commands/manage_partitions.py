@@ -0,0 +1,78 @@
+"""
+Обслуживание месячных секций: создание будущих и отсоединение старых
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.tickets import partitioning
+
+
+class Command(BaseCommand):
+    help = 'Создает секции на будущие месяцы и отсоединяет (или удаляет) устаревшие'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table', action='append', choices=partitioning.PARTITIONED_TABLES,
+            help='Таблица для обслуживания (по умолчанию все секционированные)'
+        )
+        parser.add_argument(
+            '--ahead', type=int, default=3,
+            help='На сколько месяцев вперед создать секции (по умолчанию 3)'
+        )
+        parser.add_argument(
+            '--detach-older-than', type=int, metavar='MONTHS',
+            help='Отсоединить секции старше указанного числа месяцев'
+        )
+        parser.add_argument(
+            '--drop', action='store_true',
+            help='Удалить отсоединенные секции вместо сохранения их как отдельных таблиц'
+        )
+        parser.add_argument(
+            '--from-default', action='store_true',
+            help='Создать секции для месяцев, строки которых попали в секцию по умолчанию, '
+                 'и перенести строки в них'
+        )
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not partitioning.is_supported(using):
+            raise CommandError('Секционирование поддерживается только для PostgreSQL')
+
+        current = partitioning.month_start(timezone.now())
+        for table in options['table'] or partitioning.PARTITIONED_TABLES:
+            created = partitioning.ensure_partitions(
+                table, current, options['ahead'] + 1, using=using
+            )
+            if options['from_default']:
+                for month, _ in partitioning.default_rows(table, using=using):
+                    created += partitioning.ensure_partitions(table, month, 1, using=using)
+            for name, moved in created:
+                if moved:
+                    self.stdout.write(
+                        f'Создана секция {name}, из секции по умолчанию перенесено строк: {moved}'
+                    )
+                else:
+                    self.stdout.write(f'Создана секция {name}')
+            # Строки вне созданных секций остаются в секции по умолчанию: ее стоит разобрать
+            for month, count in partitioning.default_rows(table, using=using):
+                self.stdout.write(self.style.WARNING(
+                    f'{table}: в секции по умолчанию {count} строк за {month:%Y-%m} — '
+                    f'создайте секцию месяца (--ahead или --from-default)'
+                ))
+
+            if options['detach_older_than'] is None:
+                continue
+
+            boundary = partitioning.add_months(current, -options['detach_older_than'])
+            for name, month in partitioning.list_partitions(table, using=using):
+                if month is None or month >= boundary:
+                    continue
+                partitioning.detach_partition(table, name, using=using)
+                if options['drop']:
+                    partitioning.drop_table(name, using=using)
+                    self.stdout.write(f'Секция {name} отсоединена и удалена')
+                else:
+                    self.stdout.write(f'Секция {name} отсоединена')
+
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,62 @@
+"""
+Удаление или обезличивание данных по срокам хранения
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.tickets.retention import ANONYMIZE, DELETE, BatchRunner, RetentionPurge
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет или обезличивает завершенные заявки (в основной таблице и архиве) старше '
+        'RETENTION_TICKET_DAYS и отключенных пользователей без входа дольше '
+        'RETENTION_USER_DAYS. Данные обрабатываются пачками по возрастанию id в коротких '
+        'транзакциях с паузами; позиция сохраняется, и прерванный запуск продолжается с нее. '
+        'Перед удалением пользователя его заявки удаляются отдельными пачками, а не каскадом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=(ANONYMIZE, DELETE), default=ANONYMIZE,
+                            help='Обезличить (по умолчанию) или удалить')
+        parser.add_argument('--only', choices=('tickets', 'users'),
+                            help='Только заявки или только пользователи')
+        parser.add_argument('--ticket-days', type=int, default=settings.RETENTION_TICKET_DAYS,
+                            help='Срок хранения завершенных заявок, дней')
+        parser.add_argument('--user-days', type=int, default=settings.RETENTION_USER_DAYS,
+                            help='Срок хранения отключенных пользователей, дней')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Наибольший размер пачки, по умолчанию 500')
+        parser.add_argument('--sleep', type=float, default=0.1,
+                            help='Пауза между пачками в секундах, по умолчанию 0.1')
+        parser.add_argument('--target-seconds', type=float, default=0.5,
+                            help='Пачка дольше этого уменьшается вдвое, по умолчанию 0.5')
+        parser.add_argument('--lock-timeout', type=float, default=2.0,
+                            help='Сколько пачка ждет чужую блокировку, сек, по умолчанию 2')
+        parser.add_argument('--restart', action='store_true',
+                            help='Начать сначала, не продолжая с сохраненной позиции')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Выполнить пачки и откатить их: показывает, что будет затронуто')
+
+    def handle(self, *args, **options):
+        runner = BatchRunner(
+            self.stdout.write,
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            target_seconds=options['target_seconds'],
+            lock_timeout=options['lock_timeout'],
+            dry_run=options['dry_run'],
+        )
+        purge = RetentionPurge(runner, options['mode'], options['ticket_days'], options['user_days'])
+        if options['restart']:
+            purge.reset()
+
+        results = {}
+        if options['only'] in (None, 'tickets'):
+            results.update(purge.tickets())
+        if options['only'] in (None, 'users'):
+            results['user'] = purge.users()
+
+        summary = ', '.join(f'{name}: {count}' for name, count in results.items())
+        suffix = ' (dry run, изменения откачены)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f'Готово — {summary}{suffix}'))
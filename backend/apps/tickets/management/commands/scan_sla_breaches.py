@@ -0,0 +1,58 @@
+"""
+Поиск заявок с нарушенным сроком SLA
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from apps.tickets import sla
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит открытые заявки, срок SLA (due_at) которых истек после прошлого запуска, '
+        'и пачками записывает событие SLA_BREACHED в историю и уведомления в outbox. '
+        'Позиция хранится в Checkpoint, поэтому работа пропорциональна числу новых нарушений.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Заявок в одной пачке, по умолчанию 500')
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help='Пауза, когда новых нарушений нет, сек')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать накопившиеся нарушения и завершиться')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        total = 0
+        while not self.stopping:
+            close_old_connections()
+            tickets = sla.scan_batch(options['batch_size'])
+            total += len(tickets)
+            if tickets:
+                lag = (timezone.now() - tickets[0].due_at).total_seconds()
+                self.stdout.write(
+                    f'Нарушений: {len(tickets)}, старейшее просрочено на {lag:.0f} с'
+                )
+            if len(tickets) == options['batch_size']:
+                continue
+            if options['once']:
+                break
+            self.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Найдено нарушений: {total}'))
+
+    def stop(self, signum, frame):
+        # Текущая пачка дорабатывается, новая не берется
+        self.stopping = True
+
+    def sleep(self, seconds):
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            time.sleep(min(0.5, deadline - time.monotonic()))
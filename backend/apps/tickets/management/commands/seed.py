@@ -0,0 +1,298 @@
+"""
+Генерация синтетических пользователей и заявок для нагрузочных проверок
+"""
+import multiprocessing
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from apps.tickets import partitioning
+from apps.tickets.models import Ticket
+
+User = get_user_model()
+
+# Распределения, близкие к рабочим данным: большинство заявок уже закрыто
+STATUS_WEIGHTS = {
+    Ticket.Status.NEW: 12,
+    Ticket.Status.ASSIGNED: 10,
+    Ticket.Status.IN_PROGRESS: 8,
+    Ticket.Status.COMPLETED: 40,
+    Ticket.Status.CLOSED: 30,
+}
+PRIORITY_WEIGHTS = {
+    Ticket.Priority.LOW: 30,
+    Ticket.Priority.MEDIUM: 45,
+    Ticket.Priority.HIGH: 20,
+    Ticket.Priority.URGENT: 5,
+}
+
+SUBJECTS = ('Принтер', 'Ноутбук', 'VPN', 'Почта', 'Пропуск', 'Монитор', 'Доступ к 1С',
+            'Телефон', 'Wi-Fi', 'Учетная запись', 'Кондиционер', 'Мебель')
+PROBLEMS = ('не работает', 'нужна замена', 'требуется настройка', 'нет доступа',
+            'медленно работает', 'выдает ошибку', 'нужно установить', 'сломан')
+WORDS = ('после', 'обновления', 'в', 'кабинете', 'срочно', 'отдел', 'просьба', 'проверить',
+         'с', 'утра', 'снова', 'ошибка', 'при', 'входе', 'перезагрузка', 'не', 'помогает')
+DEPARTMENTS = ('Бухгалтерия', 'Продажи', 'Склад', 'ИТ', 'Кадры', 'Юристы', 'Логистика')
+
+USER_COLUMNS = ('password', 'is_superuser', 'username', 'first_name', 'last_name', 'email',
+                'is_staff', 'is_active', 'date_joined', 'role', 'phone', 'department')
+TICKET_COLUMNS = ('title', 'description', 'status', 'priority', 'requester_id', 'executor_id',
+                  'created_at', 'updated_at', 'completed_at', 'due_at', 'version')
+
+FINISHED_STATUSES = (Ticket.Status.COMPLETED, Ticket.Status.CLOSED)
+
+# Заявки генерируются блоками с собственным генератором случайных чисел:
+# результат не зависит от числа процессов
+CHUNK_SIZE = 100000
+
+
+def copy_rows(table, columns, rows):
+    """
+    Потоковая загрузка через COPY FROM STDIN (psycopg 3)
+    """
+    qn = connection.ops.quote_name
+    sql = f'COPY {qn(table)} ({", ".join(map(qn, columns))}) FROM STDIN'
+    with connection.cursor() as cursor:
+        with cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def insert_rows(table, columns, rows, batch_size):
+    """
+    Запасной путь для остальных БД: пачки INSERT через executemany.
+    bulk_create не подходит — auto_now/auto_now_add перезаписали бы даты.
+    """
+    qn = connection.ops.quote_name
+    sql = (f'INSERT INTO {qn(table)} ({", ".join(map(qn, columns))}) '
+           f'VALUES ({", ".join(["%s"] * len(columns))})')
+    batch = []
+    with connection.cursor() as cursor:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+def ticket_rows(seed, chunk, size, requesters, executors, days, now):
+    """
+    Строки заявок одного блока в порядке TICKET_COLUMNS
+    """
+    rng = random.Random(f'{seed}:{chunk}')
+    statuses = list(STATUS_WEIGHTS)
+    status_weights = list(STATUS_WEIGHTS.values())
+    priorities = list(PRIORITY_WEIGHTS)
+    priority_weights = list(PRIORITY_WEIGHTS.values())
+    span = days * 86400
+
+    for _ in range(size):
+        # Открытые заявки чаще бывают свежими
+        status = rng.choices(statuses, status_weights)[0]
+        if status in FINISHED_STATUSES:
+            age = rng.random() * span
+        else:
+            age = rng.random() ** 3 * span
+        created_at = now - timedelta(seconds=age)
+
+        executor_id = None
+        if status != Ticket.Status.NEW and executors:
+            executor_id = rng.choice(executors)
+
+        completed_at = None
+        updated_at = created_at + timedelta(seconds=rng.random() * min(age, 86400))
+        if status in FINISHED_STATUSES:
+            completed_at = created_at + timedelta(
+                seconds=min(rng.expovariate(1 / 86400), age)
+            )
+            updated_at = max(updated_at, completed_at)
+
+        priority = rng.choices(priorities, priority_weights)[0]
+        # Срок SLA — как у заявки, сохраненной через модель (Ticket.stamp_due при создании)
+        minutes = settings.SLA_POLICIES.get(priority)
+        due_at = created_at + timedelta(minutes=minutes) if minutes else None
+
+        yield (
+            f'{rng.choice(SUBJECTS)}: {rng.choice(PROBLEMS)}',
+            ' '.join(rng.choices(WORDS, k=rng.randint(5, 40))),
+            status,
+            priority,
+            rng.choice(requesters),
+            executor_id,
+            created_at,
+            updated_at,
+            completed_at,
+            due_at,
+            1,
+        )
+
+
+def load_ticket_chunk(args):
+    """
+    Загрузка одного блока заявок
+    """
+    chunk, size, generator_args, use_copy, batch_size = args
+    rows = ticket_rows(generator_args[0], chunk, size, *generator_args[1:])
+    if use_copy:
+        copy_rows(Ticket._meta.db_table, TICKET_COLUMNS, rows)
+    else:
+        insert_rows(Ticket._meta.db_table, TICKET_COLUMNS, rows, batch_size)
+    return size
+
+
+def load_ticket_chunk_in_worker(args):
+    """
+    Загрузка блока в отдельном процессе со своим соединением
+    """
+    try:
+        return load_ticket_chunk(args)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет БД синтетическими пользователями и заявками. '
+        'В PostgreSQL данные загружаются через COPY в несколько процессов, '
+        'в остальных БД — пачками INSERT.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100,
+                            help='Пользователей на каждую роль, по умолчанию 100')
+        parser.add_argument('--tickets', type=int, default=10000,
+                            help='Число заявок, по умолчанию 10000')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько последних дней распределить даты создания')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Начальное значение генератора для воспроизводимости')
+        parser.add_argument('--prefix', default='seed',
+                            help='Префикс логинов создаваемых пользователей')
+        parser.add_argument('--password', default='password',
+                            help='Пароль всех создаваемых пользователей')
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Число параллельных процессов загрузки (только PostgreSQL)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Размер пачки INSERT для БД без COPY')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Пользователи с префиксом "{prefix}" уже есть, укажите другой --prefix'
+            )
+
+        use_copy = connection.vendor == 'postgresql'
+        chunks = -(-options['tickets'] // CHUNK_SIZE)
+        workers = max(1, min(options['workers'], chunks)) if use_copy else 1
+        if workers == 1:
+            # Вся загрузка — одна транзакция: при ошибке в БД ничего не остается
+            with transaction.atomic():
+                self.load(options, use_copy, workers)
+        else:
+            # Процессы загрузки работают со своими соединениями и видят только
+            # зафиксированных пользователей, поэтому одной транзакции здесь нет:
+            # при ошибке загруженное удаляется
+            try:
+                self.load(options, use_copy, workers)
+            except BaseException:
+                self.stderr.write('Ошибка загрузки, удаляю созданные строки')
+                self.remove_loaded(prefix)
+                raise
+
+        if use_copy:
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {User._meta.db_table}')
+                cursor.execute(f'ANALYZE {Ticket._meta.db_table}')
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def load(self, options, use_copy, workers):
+        prefix = options['prefix']
+        now = timezone.now()
+        batch_size = options['batch_size']
+
+        started = time.monotonic()
+        rows = self.user_rows(options, now)
+        if use_copy:
+            copy_rows(User._meta.db_table, USER_COLUMNS, rows)
+        else:
+            insert_rows(User._meta.db_table, USER_COLUMNS, rows, batch_size)
+        users = {role: [] for role in User.Role.values}
+        for user_id, role in (User.objects.filter(username__startswith=f'{prefix}_')
+                              .order_by('id').values_list('id', 'role')):
+            users[role].append(user_id)
+        self.stdout.write(
+            f'Пользователи: {sum(map(len, users.values()))} за {time.monotonic() - started:.1f} с'
+        )
+        if not users[User.Role.REQUESTER]:
+            raise CommandError('Для заявок нужен хотя бы один заявитель (--users > 0)')
+
+        started = time.monotonic()
+        if partitioning.is_supported():
+            partitioning.ensure_partitions(
+                Ticket._meta.db_table, now - timedelta(days=options['days']),
+                options['days'] // 28 + 2 + partitioning.MONTHS_AHEAD
+            )
+
+        generator_args = (options['seed'], users[User.Role.REQUESTER],
+                          users[User.Role.EXECUTOR], options['days'], now)
+        total = options['tickets']
+        tasks = [
+            (chunk, min(CHUNK_SIZE, total - offset), generator_args, use_copy, batch_size)
+            for chunk, offset in enumerate(range(0, total, CHUNK_SIZE))
+        ]
+        if workers > 1:
+            # Дочерние процессы не должны разделять открытое соединение родителя
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                results = pool.imap_unordered(load_ticket_chunk_in_worker, tasks)
+                self.report_progress(results, total, started)
+        else:
+            self.report_progress(map(load_ticket_chunk, tasks), total, started)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Заявки: {total} за {elapsed:.1f} с ({total / max(elapsed, 0.001):.0f} строк/с, '
+            f'процессов: {workers})'
+        )
+
+    @staticmethod
+    def remove_loaded(prefix):
+        """
+        Удаляет созданных пользователей и их заявки
+        """
+        users = User.objects.filter(username__startswith=f'{prefix}_')
+        Ticket.objects.filter(requester__in=users.values('id')).delete()
+        users.delete()
+
+    def report_progress(self, results, total, started):
+        loaded = 0
+        for count in results:
+            loaded += count
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'  {loaded}/{total} ({loaded / max(elapsed, 0.001):.0f} строк/с)')
+
+    def user_rows(self, options, now):
+        rng = random.Random(options['seed'])
+        password = make_password(options['password'])
+        for role in User.Role.values:
+            for index in range(options['users']):
+                username = f'{options["prefix"]}_{role.lower()}_{index}'
+                yield (
+                    password, False, username,
+                    f'Имя{index}', f'Фамилия{index}', f'{username}@example.com',
+                    False, True,
+                    now - timedelta(days=rng.randint(options['days'], options['days'] * 2)),
+                    role,
+                    f'+7{rng.randint(9000000000, 9999999999)}',
+                    rng.choice(DEPARTMENTS),
+                )
@@ -0,0 +1,86 @@
+# Generated by Django 5.0 on 2026-10-19 10:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+from apps.tickets import partitioning
+
+
+TABLE = 'tickets_ticketevent'
+
+
+def create_event_table(apps, schema_editor):
+    TicketEvent = apps.get_model('tickets', 'TicketEvent')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.create_model(TicketEvent)
+        return
+
+    # Ключ секционирования обязан входить в первичный ключ
+    schema_editor.execute(
+        f'''
+        CREATE TABLE "{TABLE}" (
+            "id" bigint GENERATED BY DEFAULT AS IDENTITY,
+            "ticket_id" bigint NOT NULL,
+            "actor_id" bigint NULL,
+            "kind" varchar(20) NOT NULL,
+            "from_status" varchar(20) NOT NULL,
+            "to_status" varchar(20) NOT NULL,
+            "from_executor_id" bigint NULL,
+            "to_executor_id" bigint NULL,
+            "comment" text NOT NULL,
+            "created_at" timestamp with time zone NOT NULL,
+            PRIMARY KEY ("id", "created_at")
+        ) PARTITION BY RANGE ("created_at")
+        '''
+    )
+    for index in TicketEvent._meta.indexes:
+        schema_editor.add_index(TicketEvent, index)
+    partitioning.create_default_partition(schema_editor, TABLE)
+    partitioning.ensure_partitions(
+        TABLE, timezone.now(), 4, using=schema_editor.connection.alias
+    )
+
+
+def drop_event_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('tickets', 'TicketEvent'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Таблица создается вручную (секционированная), здесь только состояние модели
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='TicketEvent',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('kind', models.CharField(choices=[('CREATED', 'Создана'), ('STATUS_CHANGED', 'Смена статуса'), ('EXECUTOR_CHANGED', 'Смена исполнителя'), ('COMMENTED', 'Комментарий')], max_length=20, verbose_name='Тип события')),
+                        ('from_status', models.CharField(blank=True, max_length=20, verbose_name='Предыдущий статус')),
+                        ('to_status', models.CharField(blank=True, max_length=20, verbose_name='Новый статус')),
+                        ('from_executor_id', models.BigIntegerField(blank=True, null=True, verbose_name='Предыдущий исполнитель')),
+                        ('to_executor_id', models.BigIntegerField(blank=True, null=True, verbose_name='Новый исполнитель')),
+                        ('comment', models.TextField(blank=True, verbose_name='Комментарий')),
+                        ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата события')),
+                        ('actor', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                        ('ticket', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='tickets.ticket', verbose_name='Заявка')),
+                    ],
+                    options={
+                        'verbose_name': 'Событие заявки',
+                        'verbose_name_plural': 'События заявок',
+                        'ordering': ['-created_at', '-id'],
+                        'indexes': [models.Index(fields=['ticket', '-created_at', '-id'], name='tickets_event_history_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_event_table, drop_event_table),
+    ]
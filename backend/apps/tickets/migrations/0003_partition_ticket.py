@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-19 10:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.tickets import partitioning
+
+
+def partition_ticket_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    partitioning.convert_to_partitioned(schema_editor, 'tickets_ticket')
+
+
+def unpartition_ticket_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    partitioning.convert_to_plain(schema_editor, 'tickets_ticket')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_ticketevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # Перенос данных идет под эксклюзивной блокировкой таблицы:
+    # на больших объемах миграцию нужно выполнять в окно обслуживания
+    operations = [
+        migrations.RunPython(partition_ticket_table, unpartition_ticket_table),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['-created_at'], name='tickets_created_at_idx'),
+        ),
+    ]
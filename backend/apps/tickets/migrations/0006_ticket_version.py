@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-19 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticket_filter_indexes'),
+    ]
+
+    # Столбец с постоянным DEFAULT в PostgreSQL 11+ добавляется без перезаписи
+    # таблицы и ее секций
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Увеличивается при каждом сохранении; используется для If-Match и ETag', verbose_name='Версия'),
+        ),
+    ]
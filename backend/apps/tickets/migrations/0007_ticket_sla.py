@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-19 11:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_ticket_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Checkpoint',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Обработка')),
+                ('position', models.JSONField(blank=True, default=dict, verbose_name='Позиция')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Позиция обработки',
+                'verbose_name_plural': 'Позиции обработки',
+            },
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='due_at',
+            field=models.DateTimeField(blank=True, help_text='По SLA_POLICIES для приоритета: от создания или последнего назначения', null=True, verbose_name='Срок выполнения'),
+        ),
+        migrations.AlterField(
+            model_name='ticketevent',
+            name='kind',
+            field=models.CharField(choices=[('CREATED', 'Создана'), ('STATUS_CHANGED', 'Смена статуса'), ('EXECUTOR_CHANGED', 'Смена исполнителя'), ('COMMENTED', 'Комментарий'), ('SLA_BREACHED', 'Нарушен срок SLA')], max_length=20, verbose_name='Тип события'),
+        ),
+        # Частичный индекс строится по открытым заявкам; на секционированной таблице
+        # CONCURRENTLY недоступен, на больших объемах — в окно обслуживания
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('status__in', ('NEW', 'ASSIGNED', 'IN_PROGRESS'))), fields=['due_at', 'id'], name='tickets_open_due_idx'),
+        ),
+    ]
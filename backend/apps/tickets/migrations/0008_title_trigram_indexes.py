@@ -0,0 +1,49 @@
+# Generated by Django 5.0 on 2026-10-19 12:05
+
+from django.db import migrations
+
+# title__icontains в PostgreSQL — UPPER("title"::text) LIKE UPPER('%...%'): индекс строится
+# по этому же выражению, иначе планировщик его не использует
+INDEXES = (
+    ('tickets_ticket', 'tickets_title_trgm_idx'),
+    ('tickets_archivedticket', 'tickets_archived_title_trgm_idx'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            # Сервер собран без contrib: поиск работает, но последовательным сканированием.
+            # После установки расширения: migrate tickets 0007 && migrate tickets
+            return
+    qn = schema_editor.quote_name
+    # Нужны права на создание расширения (или расширение, заранее созданное администратором БД)
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, name in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {qn(name)} ON {qn(table)} '
+            f'USING gin (UPPER(title::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, name in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_ticket_sla'),
+    ]
+
+    # Индекс на секционированной таблице строится без CONCURRENTLY и создается во всех
+    # секциях, в том числе будущих; на больших объемах — в окно обслуживания
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
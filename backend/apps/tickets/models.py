@@ -1,8 +1,22 @@
 """
-Модель заявки
+Модели заявок и их истории
 """
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
+from django.utils import timezone
+
+
+# Статусы, в которых заявка еще должна быть выполнена в срок SLA
+OPEN_STATUSES = ('NEW', 'ASSIGNED', 'IN_PROGRESS')
+
+
+class VersionConflict(Exception):
+    """
+    Заявку изменил другой запрос после того, как ее прочитали
+    """
 
 
 class Ticket(models.Model):
@@ -69,11 +83,264 @@ class Ticket(models.Model):
         blank=True,
         verbose_name='Дата выполнения'
     )
+    due_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Срок выполнения',
+        help_text='По SLA_POLICIES для приоритета: от создания или последнего назначения'
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='Версия',
+        help_text='Увеличивается при каждом сохранении; используется для If-Match и ETag'
+    )
     
     class Meta:
         verbose_name = 'Заявка'
         verbose_name_plural = 'Заявки'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='tickets_created_at_idx'),
+            # Фильтры списков с сортировкой по дате создания
+            models.Index(fields=['status', '-created_at'], name='tickets_status_created_idx'),
+            models.Index(fields=['requester', '-created_at'], name='tickets_requester_created_idx'),
+            models.Index(fields=['executor', '-created_at'], name='tickets_executor_created_idx'),
+            # Сортировки и диапазоны по датам изменения и выполнения
+            models.Index(fields=['-updated_at'], name='tickets_updated_at_idx'),
+            models.Index(fields=['-completed_at'], name='tickets_completed_at_idx'),
+            # Сканер нарушений SLA: только открытые заявки по сроку
+            models.Index(
+                fields=['due_at', 'id'],
+                condition=Q(status__in=OPEN_STATUSES),
+                name='tickets_open_due_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"#{self.pk} - {self.title} ({self.get_status_display()})"
+
+    def stamp_due(self, now=None):
+        """
+        Срок выполнения по SLA для текущего приоритета, считая от now
+        """
+        minutes = settings.SLA_POLICIES.get(self.priority)
+        self.due_at = (now or timezone.now()) + timedelta(minutes=minutes) if minutes else None
+
+    def save(self, *args, **kwargs):
+        """
+        Сохранение существующей заявки — один условный UPDATE ... WHERE version = <версия
+        экземпляра>, который увеличивает версию. Если строку уже изменил другой запрос,
+        выбрасывается VersionConflict, а экземпляр остается с прежней версией.
+        """
+        if self._state.adding:
+            if self.due_at is None:
+                self.stamp_due()
+            return super().save(*args, **kwargs)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        self._expected_version = self.version
+        self.version += 1
+        try:
+            super().save(*args, **kwargs)
+        except BaseException:
+            self.version = self._expected_version
+            raise
+        finally:
+            del self._expected_version
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if not super()._do_update(base_qs.filter(version=expected), using, pk_val, values,
+                                  update_fields, forced_update):
+            # Без исключения Django попытался бы вставить строку заново
+            raise VersionConflict(f'Заявка #{pk_val} изменена (ожидалась версия {expected})')
+        return True
+
+
+class TicketEvent(models.Model):
+    """
+    Событие истории заявки (журнал только на добавление).
+
+    Таблица секционирована по месяцам created_at, поэтому внешние ключи
+    не создаются в БД: старые секции можно отсоединять без каскадов.
+    """
+
+    class Kind(models.TextChoices):
+        CREATED = 'CREATED', 'Создана'
+        STATUS_CHANGED = 'STATUS_CHANGED', 'Смена статуса'
+        EXECUTOR_CHANGED = 'EXECUTOR_CHANGED', 'Смена исполнителя'
+        COMMENTED = 'COMMENTED', 'Комментарий'
+        SLA_BREACHED = 'SLA_BREACHED', 'Нарушен срок SLA'
+
+    ticket = models.ForeignKey(
+        Ticket,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='events',
+        verbose_name='Заявка'
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+',
+        null=True,
+        blank=True,
+        verbose_name='Автор'
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=Kind.choices,
+        verbose_name='Тип события'
+    )
+    from_status = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Предыдущий статус'
+    )
+    to_status = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Новый статус'
+    )
+    from_executor_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Предыдущий исполнитель'
+    )
+    to_executor_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Новый исполнитель'
+    )
+    comment = models.TextField(
+        blank=True,
+        verbose_name='Комментарий'
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата события'
+    )
+
+    class Meta:
+        verbose_name = 'Событие заявки'
+        verbose_name_plural = 'События заявок'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(
+                fields=['ticket', '-created_at', '-id'],
+                name='tickets_event_history_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.ticket_id} {self.get_kind_display()}"
+
+
+class ArchivedTicket(models.Model):
+    """
+    Архивная копия завершенной заявки.
+
+    Старые закрытые и выполненные заявки переносятся сюда командой archive_tickets,
+    чтобы основная таблица и ее индексы оставались небольшими. Идентификатор
+    сохраняется прежним.
+    """
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name='ID'
+    )
+    title = models.CharField(
+        max_length=200,
+        verbose_name='Заголовок'
+    )
+    description = models.TextField(
+        verbose_name='Описание'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Ticket.Status.choices,
+        verbose_name='Статус'
+    )
+    priority = models.CharField(
+        max_length=20,
+        choices=Ticket.Priority.choices,
+        verbose_name='Приоритет'
+    )
+    requester = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Заявитель'
+    )
+    executor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        verbose_name='Исполнитель'
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата создания'
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата обновления'
+    )
+    completed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата выполнения'
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата архивации'
+    )
+
+    # Поля, копируемые из Ticket при архивации
+    COPIED_FIELDS = ('id', 'title', 'description', 'status', 'priority', 'requester_id',
+                     'executor_id', 'created_at', 'updated_at', 'completed_at')
+
+    class Meta:
+        verbose_name = 'Архивная заявка'
+        verbose_name_plural = 'Архив заявок'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"#{self.pk} - {self.title} ({self.get_status_display()}, архив)"
+
+    @classmethod
+    def from_ticket(cls, ticket):
+        return cls(**{name: getattr(ticket, name) for name in cls.COPIED_FIELDS})
+
+
+class Checkpoint(models.Model):
+    """
+    Позиция фоновой обработки (high-water mark): следующий запуск
+    продолжает с нее, а не просматривает данные заново
+    """
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name='Обработка'
+    )
+    position = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Позиция'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления'
+    )
+
+    class Meta:
+        verbose_name = 'Позиция обработки'
+        verbose_name_plural = 'Позиции обработки'
+
+    def __str__(self):
+        return self.name
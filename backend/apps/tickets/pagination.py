@@ -0,0 +1,144 @@
+"""
+Пагинация для заявок
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class TicketEventCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация истории заявки: стоимость страницы не зависит от ее номера
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+
+def estimate_count(queryset):
+    """
+    Оценка числа строк по статистике PostgreSQL, без чтения таблицы.
+    Без фильтров — pg_class.reltuples таблицы (для секционированной — сумма по секциям),
+    с фильтрами — оценка строк из EXPLAIN. Для других БД — None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct and not query.combinator:
+            table = queryset.model._meta.db_table
+            cursor.execute(
+                """
+                SELECT COALESCE(
+                    (SELECT SUM(GREATEST(child.reltuples, 0)) FROM pg_inherits
+                     JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                     WHERE pg_inherits.inhparent = %s::regclass),
+                    (SELECT GREATEST(reltuples, 0) FROM pg_class WHERE oid = %s::regclass)
+                )
+                """,
+                [table, table],
+            )
+            return int(cursor.fetchone()[0])
+
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+def exact_count(queryset):
+    """
+    COUNT(*) с кэшированием на PAGINATION_COUNT_CACHE_SECONDS
+    """
+    sql, params = queryset.query.sql_with_params()
+    key = 'count:' + hashlib.sha256(f'{queryset.db}:{sql}:{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_SECONDS)
+    return count
+
+
+class EstimatedCountPage(Page):
+    def has_next(self):
+        if self.paginator.count_exact:
+            return super().has_next()
+        # Число страниц по оценке неточное: следующая есть, если текущая заполнена
+        return len(self.object_list) >= self.paginator.per_page
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator с точным числом строк только для небольших выборок.
+    Выше PAGINATION_EXACT_COUNT_THRESHOLD используется оценка планировщика,
+    и номера страниц за ее пределами не отклоняются.
+    """
+    count_exact = True
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate >= settings.PAGINATION_EXACT_COUNT_THRESHOLD:
+            self.count_exact = False
+            return estimate
+        return exact_count(self.object_list)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.count_exact or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_exact:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+    def _get_page(self, *args, **kwargs):
+        return EstimatedCountPage(*args, **kwargs)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    Постраничный вывод без COUNT(*) по большим таблицам.
+    В ответе count_exact: false, если count — оценка.
+    """
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_exact': self.page.paginator.count_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'] = {
+            'count': response_schema['properties']['count'],
+            'count_exact': {
+                'type': 'boolean',
+                'description': 'false — count является оценкой по статистике БД',
+            },
+            **{name: value for name, value in response_schema['properties'].items()
+               if name != 'count'},
+        }
+        return response_schema
@@ -0,0 +1,263 @@
+"""
+Помесячное секционирование таблиц PostgreSQL по дате создания
+"""
+from datetime import date
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+
+# Таблицы, секционированные по диапазону created_at (по месяцам)
+PARTITIONED_TABLES = (
+    'tickets_ticket',
+    'tickets_ticketevent',
+)
+
+# Сколько месяцев вперед создаются секции при миграции таблицы
+MONTHS_AHEAD = 3
+
+
+def is_supported(using='default'):
+    """
+    Секционирование доступно только в PostgreSQL
+    """
+    return connections[using].vendor == 'postgresql'
+
+
+def month_start(value):
+    """
+    Первое число месяца для даты/времени
+    """
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    """
+    Сдвиг первого числа месяца на указанное число месяцев
+    """
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def create_default_partition(schema_editor, table):
+    """
+    Секция по умолчанию: страхует вставку, если секция месяца еще не создана
+    """
+    qn = schema_editor.quote_name
+    schema_editor.execute(
+        f'CREATE TABLE IF NOT EXISTS {qn(default_partition_name(table))} '
+        f'PARTITION OF {qn(table)} DEFAULT'
+    )
+
+
+def ensure_partitions(table, start, months, using='default', column='created_at'):
+    """
+    Создает недостающие месячные секции начиная с месяца start.
+    Строки месяца, уже попавшие в секцию по умолчанию, переносятся в новую секцию.
+    Возвращает пары (имя созданной секции, сколько строк перенесено).
+    """
+    existing = {name for name, _ in list_partitions(table, using=using)}
+    created = []
+    month = month_start(start)
+    for _ in range(months):
+        name = partition_name(table, month)
+        if name not in existing:
+            created.append((name, create_partition(table, name, month, using, column)))
+        month = add_months(month, 1)
+    return created
+
+
+def create_partition(table, name, month, using='default', column='created_at'):
+    """
+    Создает секцию месяца. PostgreSQL не создает секцию, если строки ее диапазона
+    уже лежат в секции по умолчанию. Тогда секция по умолчанию отсоединяется,
+    строки месяца переносятся из нее в новую секцию, и она присоединяется обратно.
+    Все это идет в одной транзакции, вставки в таблицу на это время ждут.
+    Возвращает число перенесенных строк.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    default = default_partition_name(table)
+    bounds = [f'{month:%Y-%m-%d} 00:00:00+00', f'{add_months(month, 1):%Y-%m-%d} 00:00:00+00']
+    in_range = f'{qn(column)} >= %s AND {qn(column)} < %s'
+    create = f'CREATE TABLE {qn(name)} PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)'
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if not _has_default(cursor, default):
+            cursor.execute(create, bounds)
+            return 0
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {qn(default)} WHERE {in_range})', bounds)
+        if not cursor.fetchone()[0]:
+            cursor.execute(create, bounds)
+            return 0
+
+        cursor.execute(f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(default)}')
+        cursor.execute(create, bounds)
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {qn(default)} WHERE {in_range} RETURNING *) '
+            f'INSERT INTO {qn(name)} SELECT * FROM moved',
+            bounds,
+        )
+        moved = cursor.rowcount
+        cursor.execute(f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(default)} DEFAULT')
+    return moved
+
+
+def default_rows(table, using='default', column='created_at'):
+    """
+    Месяцы, строки которых лежат в секции по умолчанию: пары (первое число месяца,
+    число строк). Такие строки значат, что секции создаются недостаточно заранее.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    default = default_partition_name(table)
+    with connection.cursor() as cursor:
+        if not _has_default(cursor, default):
+            return []
+        cursor.execute(
+            f"SELECT date_trunc('month', {qn(column)} AT TIME ZONE 'UTC')::date, COUNT(*) "
+            f'FROM {qn(default)} GROUP BY 1 ORDER BY 1'
+        )
+        return cursor.fetchall()
+
+
+def _has_default(cursor, default):
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [default])
+    return cursor.fetchone()[0]
+
+
+def list_partitions(table, using='default'):
+    """
+    Список секций таблицы: пары (имя, первое число месяца или None для DEFAULT)
+    """
+    prefix = f'{table}_p'
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            ORDER BY child.relname
+            """,
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        month = None
+        if name.startswith(prefix):
+            year, _, mon = name[len(prefix):].partition('_')
+            if year.isdigit() and mon.isdigit():
+                month = date(int(year), int(mon), 1)
+        partitions.append((name, month))
+    return partitions
+
+
+def detach_partition(table, name, using='default'):
+    """
+    Отсоединяет секцию: данные остаются в отдельной таблице, родитель их больше не видит
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}')
+
+
+def drop_table(name, using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(name)}')
+
+
+def months_between(start, end):
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def convert_to_partitioned(schema_editor, table, column='created_at'):
+    """
+    Пересоздает обычную таблицу как секционированную по месяцам column.
+    Первичный ключ становится (id, column), индексы и внешние ключи переносятся.
+    """
+    _rebuild(schema_editor, table, column, partitioned=True)
+
+
+def convert_to_plain(schema_editor, table, column='created_at'):
+    """
+    Обратное преобразование: секционированная таблица снова становится одной кучей
+    """
+    _rebuild(schema_editor, table, column, partitioned=False)
+
+
+def _rebuild(schema_editor, table, column, partitioned):
+    qn = schema_editor.quote_name
+    old = f'{table}_old'
+    pkey = f'{table}_pkey'
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s',
+            [table, pkey],
+        )
+        # Индексы секционированной таблицы выводятся как "ON ONLY", а нужны каскадные
+        index_sql = [row[0].replace(' ON ONLY ', ' ON ') for row in cursor.fetchall()]
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype <> 'p'
+            """,
+            [table],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence = cursor.fetchone()[0]
+
+    # Освобождаем имена таблицы, первичного ключа и последовательности
+    schema_editor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old)}')
+    schema_editor.execute(f'ALTER INDEX {qn(pkey)} RENAME TO {qn(old + "_pkey")}')
+    schema_editor.execute(f'ALTER SEQUENCE {sequence} RENAME TO {qn(old + "_id_seq")}')
+
+    partition_clause = f' PARTITION BY RANGE ({qn(column)})' if partitioned else ''
+    primary_key = f'{qn("id")}, {qn(column)}' if partitioned else qn('id')
+    schema_editor.execute(
+        f'CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS){partition_clause}'
+    )
+    schema_editor.execute(
+        f'ALTER TABLE {qn(table)} ALTER COLUMN {qn("id")} ADD GENERATED BY DEFAULT AS IDENTITY'
+    )
+    schema_editor.execute(f'ALTER TABLE {qn(table)} ADD PRIMARY KEY ({primary_key})')
+
+    if partitioned:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'SELECT MIN({qn(column)}) FROM {qn(old)}')
+            first = cursor.fetchone()[0]
+        current = month_start(timezone.now())
+        start = month_start(first) if first else current
+        create_default_partition(schema_editor, table)
+        ensure_partitions(
+            table, start, months_between(start, current) + MONTHS_AHEAD + 1,
+            using=schema_editor.connection.alias,
+        )
+
+    schema_editor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(old)}')
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+        f"COALESCE(MAX({qn('id')}), 1), MAX({qn('id')}) IS NOT NULL) FROM {qn(table)}",
+        [table],
+    )
+    schema_editor.execute(f'DROP TABLE {qn(old)}')
+
+    for sql in index_sql:
+        schema_editor.execute(sql)
+    for name, definition in constraints:
+        schema_editor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
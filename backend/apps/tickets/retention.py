@@ -0,0 +1,259 @@
+"""
+Очистка данных по сроку хранения: пачки по возрастанию id, каждая в своей короткой
+транзакции, с паузами между ними и позицией в Checkpoint для продолжения после остановки
+"""
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, transaction
+from django.db.models import CharField, F, Max, Q, Value
+from django.db.models.functions import Cast, Concat, Now
+from django.utils import timezone
+
+from apps.notifications.models import Notification
+
+from .models import ArchivedTicket, Checkpoint, Ticket, TicketEvent
+
+User = get_user_model()
+
+DELETE = 'delete'
+ANONYMIZE = 'anonymize'
+
+FINISHED_STATUSES = (Ticket.Status.COMPLETED, Ticket.Status.CLOSED)
+
+# Так начинается логин обезличенного пользователя
+ANONYMIZED_PREFIX = 'deleted-'
+
+# PostgreSQL: lock_not_available — истек lock_timeout
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+def is_lock_timeout(exc):
+    return getattr(exc.__cause__, 'sqlstate', None) == LOCK_NOT_AVAILABLE
+
+
+class BatchRunner:
+    """
+    Обходит queryset пачками по возрастанию pk и применяет handler к каждой пачке
+    в отдельной транзакции.
+
+    Чтобы не держать блокировки долго, транзакция ждет чужую блокировку не дольше
+    lock_timeout (после таймаута пачка повторяется уменьшенной), размер пачки
+    уменьшается вдвое, если она шла дольше target_seconds, и растет обратно до
+    batch_size, если вдвое быстрее. Между пачками — пауза sleep.
+    """
+    min_batch_size = 10
+    max_lock_retries = 5
+
+    def __init__(self, report, batch_size=500, sleep=0.1, target_seconds=0.5,
+                 lock_timeout=2.0, dry_run=False):
+        self.report = report
+        self.batch_size = batch_size
+        self.sleep = sleep
+        self.target_seconds = target_seconds
+        self.lock_timeout = lock_timeout
+        self.dry_run = dry_run
+
+    def run(self, label, queryset, handler, checkpoint=None, prepare=None):
+        """
+        handler(queryset пачки) -> число обработанных строк. Пачка выбирается вне
+        транзакции, а handler получает ее с теми же условиями отбора: строки,
+        которые за это время перестали им соответствовать, не затрагиваются.
+        prepare(ids) выполняется перед транзакцией пачки (например, своими пачками).
+
+        checkpoint — имя позиции в Checkpoint: она сохраняется в транзакции пачки,
+        а после обхода удаляется.
+        """
+        last_id = self.load(checkpoint)
+        if last_id:
+            self.report(f'{label}: продолжение после id {last_id}')
+        # Верхняя граница для отчета о ходе: по индексу первичного ключа, без обхода отбора
+        max_id = queryset.model.objects.aggregate(top=Max('pk'))['top'] or 0
+        size = self.batch_size
+        total = 0
+        failures = 0
+        started = time.monotonic()
+
+        while True:
+            ids = list(
+                queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:size]
+            )
+            if not ids:
+                break
+            if prepare is not None:
+                prepare(ids)
+
+            batch_started = time.monotonic()
+            try:
+                with transaction.atomic():
+                    self.set_lock_timeout()
+                    count = handler(queryset.filter(pk__in=ids))
+                    if checkpoint:
+                        self.save(checkpoint, ids[-1])
+                    if self.dry_run:
+                        transaction.set_rollback(True)
+            except OperationalError as exc:
+                failures += 1
+                if not is_lock_timeout(exc) or failures > self.max_lock_retries:
+                    raise
+                size = self.shrink(size)
+                self.report(f'{label}: таймаут блокировки, повтор пачкой {size}')
+                time.sleep(self.sleep * 2 ** failures)
+                continue
+            failures = 0
+            elapsed = time.monotonic() - batch_started
+
+            last_id = ids[-1]
+            total += count
+            rate = total / max(time.monotonic() - started, 1e-9)
+            self.report(f'{label}: {total} (id {last_id} из {max_id}), '
+                        f'{rate:.0f} строк/с, пачка {size}')
+
+            if elapsed > self.target_seconds:
+                size = self.shrink(size)
+            elif elapsed < self.target_seconds / 2:
+                size = min(self.batch_size, size * 2)
+            time.sleep(self.sleep)
+
+        if checkpoint and not self.dry_run:
+            Checkpoint.objects.filter(name=checkpoint).delete()
+        return total
+
+    def shrink(self, size):
+        # Вдвое, но не меньше min_batch_size (и не больше, чем было)
+        return max(min(size, self.min_batch_size), size // 2)
+
+    def set_lock_timeout(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT set_config(%s, %s, true)',
+                               ['lock_timeout', f'{int(self.lock_timeout * 1000)}ms'])
+
+    @staticmethod
+    def load(checkpoint):
+        if not checkpoint:
+            return 0
+        position = Checkpoint.objects.filter(name=checkpoint).values_list('position', flat=True).first()
+        return (position or {}).get('last_id', 0)
+
+    @staticmethod
+    def save(checkpoint, last_id):
+        Checkpoint.objects.update_or_create(name=checkpoint, defaults={'position': {'last_id': last_id}})
+
+
+def expired_tickets(model, cutoff):
+    """
+    Завершенные заявки (или архивные) без изменений с cutoff, еще не обезличенные
+    """
+    queryset = model.objects.filter(updated_at__lt=cutoff).exclude(description='')
+    if model is Ticket:
+        queryset = queryset.filter(status__in=FINISHED_STATUSES)
+    return queryset
+
+
+def purge_tickets(queryset, mode):
+    """
+    Удаляет заявки пачки вместе с историей и уведомлениями или обезличивает:
+    заголовок заменяется номером, описание и комментарии истории очищаются
+    """
+    ids = list(queryset.values_list('pk', flat=True))
+    if not ids:
+        return 0
+    Notification.objects.filter(ticket_id__in=ids).delete()
+    if mode == DELETE:
+        TicketEvent.objects.filter(ticket_id__in=ids).delete()
+        return queryset.model.objects.filter(pk__in=ids).delete()[1].get(queryset.model._meta.label, 0)
+
+    TicketEvent.objects.filter(ticket_id__in=ids).exclude(comment='').update(comment='')
+    changes = {
+        'title': Concat(Value('Заявка #'), Cast('id', CharField())),
+        'description': '',
+    }
+    if queryset.model is Ticket:
+        # Новые updated_at и версия: кэш фрагментов и ETag не отдадут старый текст
+        changes.update(updated_at=Now(), version=F('version') + 1)
+    return queryset.model.objects.filter(pk__in=ids).update(**changes)
+
+
+def expired_users(cutoff):
+    """
+    Отключенные учетные записи (не сотрудников) без входа с cutoff, еще не обезличенные
+    """
+    return (
+        User.objects
+        .filter(is_active=False, is_staff=False, is_superuser=False)
+        .filter(Q(last_login__lt=cutoff) | Q(last_login__isnull=True, date_joined__lt=cutoff))
+        .exclude(username__startswith=ANONYMIZED_PREFIX)
+    )
+
+
+def anonymize_users(queryset):
+    count = 0
+    for user in queryset:
+        user.username = f'{ANONYMIZED_PREFIX}{user.pk}'
+        user.first_name = user.last_name = user.email = ''
+        user.phone = user.department = None
+        user.set_unusable_password()
+        # save(), а не update(): сигнал сбрасывает кэш фрагментов с данными пользователя
+        user.save(update_fields=['username', 'first_name', 'last_name', 'email',
+                                 'phone', 'department', 'password'])
+        count += 1
+    return count
+
+
+class RetentionPurge:
+    """
+    Очистка по срокам хранения: заявки старше ticket_days и отключенные
+    пользователи старше user_days удаляются или обезличиваются (mode)
+    """
+
+    def __init__(self, runner, mode=ANONYMIZE, ticket_days=730, user_days=365):
+        self.runner = runner
+        self.mode = mode
+        now = timezone.now()
+        self.ticket_cutoff = now - timedelta(days=ticket_days)
+        self.user_cutoff = now - timedelta(days=user_days)
+
+    def reset(self):
+        Checkpoint.objects.filter(name__startswith=f'retention:{self.mode}:').delete()
+
+    def tickets(self):
+        return {
+            model._meta.model_name: self.runner.run(
+                f'{model._meta.verbose_name_plural} ({self.mode})',
+                expired_tickets(model, self.ticket_cutoff),
+                lambda queryset: purge_tickets(queryset, self.mode),
+                checkpoint=f'retention:{self.mode}:{model._meta.model_name}',
+            )
+            for model in (Ticket, ArchivedTicket)
+        }
+
+    def users(self):
+        if self.mode == ANONYMIZE:
+            return self.runner.run(
+                'пользователи (anonymize)', expired_users(self.user_cutoff), anonymize_users,
+                checkpoint='retention:anonymize:user',
+            )
+        return self.runner.run(
+            'пользователи (delete)', expired_users(self.user_cutoff),
+            lambda queryset: queryset.delete()[1].get(User._meta.label, 0),
+            checkpoint='retention:delete:user', prepare=self.detach_users,
+        )
+
+    def detach_users(self, user_ids):
+        """
+        Перед удалением пользователей их заявки удаляются, а ссылки на них как
+        на исполнителя обнуляются своими пачками: иначе CASCADE/SET_NULL сделали бы
+        это одной большой транзакцией
+        """
+        for model in (Ticket, ArchivedTicket):
+            name = model._meta.verbose_name_plural
+            self.runner.run(
+                f'  {name} пользователей', model.objects.filter(requester_id__in=user_ids),
+                lambda queryset: purge_tickets(queryset, DELETE),
+            )
+            self.runner.run(
+                f'  {name} с исполнителем из них', model.objects.filter(executor_id__in=user_ids),
+                lambda queryset: queryset.update(executor=None),
+            )
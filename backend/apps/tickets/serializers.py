@@ -1,11 +1,133 @@
 """
 Сериализаторы для заявок
 """
+import re
+
 from rest_framework import serializers
+from django.core.exceptions import FieldDoesNotExist
 from django.utils import timezone
-from .models import Ticket
+from .models import ArchivedTicket, Ticket, TicketEvent
 from apps.users.serializers import UserSerializer
 
+# Источник поля-подписи значения выбора: get_status_display
+DISPLAY_SOURCE = re.compile(r'get_(\w+)_display')
+
+
+def split_param(value):
+    """
+    Список из параметра запроса через запятую: "id, title" -> ['id', 'title']
+    """
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def model_column(model, source):
+    """
+    Поле модели, из которого читается значение поля сериализатора, или None
+    """
+    match = DISPLAY_SOURCE.fullmatch(source)
+    if match:
+        source = match.group(1)
+    try:
+        field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return None
+    return field.name if field.concrete else None
+
+
+class SparseFieldsMixin:
+    """
+    Выборочные поля (?fields=) и раскрытие связей (?expand=).
+
+    fields — имена полей; поле связи через точку (executor.username) раскрывает связь
+    только с этими полями. expand — связи, которые выводятся вложенным объектом целиком.
+    Если задан хотя бы один параметр, нераскрытые связи выводятся как id.
+    Без параметров вывод прежний: все поля, связи раскрыты.
+
+    normalized — связи всегда выводятся как id, а подписи значений (*_display) убираются:
+    пользователи и подписи отдаются один раз рядом со списком (см. side_loaded).
+    """
+    expandable_fields = ('requester', 'executor')
+
+    def __init__(self, *args, fields=None, expand=None, normalized=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Раскрытые связи: имя -> набор вложенных полей или None (все поля)
+        self.expanded = dict.fromkeys(self.expandable_fields)
+        # Связи, объекты которых выносятся из строк (только в режиме normalized)
+        self.side_loaded = {}
+        self.normalized = normalized
+        if fields is None and expand is None and not normalized:
+            return
+
+        expanded = dict.fromkeys(expand or ())
+        selected = None
+        if fields is not None:
+            selected = set(expanded)
+            for name in fields:
+                relation, _, nested = name.partition('.')
+                selected.add(relation)
+                if nested and expanded.get(relation, ()) is not None:
+                    expanded.setdefault(relation, set()).add(nested)
+        self.validate_sparse(selected, expanded)
+
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+        if normalized:
+            self.side_loaded = {
+                relation: expanded.get(relation)
+                for relation in self.expandable_fields if relation in self.fields
+            }
+            expanded = {}
+            for name in [name for name, field in self.fields.items()
+                         if DISPLAY_SOURCE.fullmatch(field.source)]:
+                self.fields.pop(name)
+        for relation in self.expandable_fields:
+            if relation not in self.fields:
+                continue
+            if relation not in expanded:
+                # Только id из внешнего ключа: без JOIN и без вложенного сериализатора
+                self.fields[relation] = serializers.PrimaryKeyRelatedField(read_only=True)
+            elif expanded[relation] is not None:
+                nested = self.fields[relation]
+                for name in set(nested.fields) - expanded[relation]:
+                    nested.fields.pop(name)
+        self.expanded = {
+            relation: nested for relation, nested in expanded.items() if relation in self.fields
+        }
+
+    def validate_sparse(self, selected, expanded):
+        unknown = sorted((selected or set()) - set(self.fields))
+        for relation, nested in expanded.items():
+            if relation not in self.expandable_fields:
+                unknown.append(relation)
+            elif nested:
+                available = set(self.fields[relation].fields)
+                unknown += sorted(f'{relation}.{name}' for name in nested - available)
+        if unknown:
+            raise serializers.ValidationError(
+                {'fields': f'Неизвестные поля: {", ".join(dict.fromkeys(unknown))}'}
+            )
+
+    def query_plan(self):
+        """
+        Колонки для only() и связи для select_related под выбранные поля
+        """
+        model = self.Meta.model
+        columns, related = {model._meta.pk.name}, []
+        for name, field in self.fields.items():
+            column = model_column(model, field.source)
+            if column is None:
+                continue
+            columns.add(column)
+            if name in self.expanded:
+                related.append(column)
+                nested_model = field.Meta.model
+                for nested in field.fields.values():
+                    nested_column = model_column(nested_model, nested.source)
+                    if nested_column:
+                        columns.add(f'{column}__{nested_column}')
+        return sorted(columns), related
+
 
 class TicketCreateSerializer(serializers.ModelSerializer):
     """
@@ -21,7 +143,7 @@ class TicketCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class TicketListSerializer(serializers.ModelSerializer):
+class TicketListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для списка заявок
     """
@@ -34,11 +156,11 @@ class TicketListSerializer(serializers.ModelSerializer):
         model = Ticket
         fields = ('id', 'title', 'description', 'status', 'status_display',
                   'priority', 'priority_display', 'requester', 'executor',
-                  'created_at', 'updated_at', 'completed_at')
-        read_only_fields = ('id', 'created_at', 'updated_at', 'completed_at')
+                  'created_at', 'updated_at', 'completed_at', 'due_at', 'version')
+        read_only_fields = ('id', 'created_at', 'updated_at', 'completed_at', 'due_at', 'version')
 
 
-class TicketDetailSerializer(serializers.ModelSerializer):
+class TicketDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для детального просмотра заявки
     """
@@ -50,7 +172,27 @@ class TicketDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = '__all__'
-        read_only_fields = ('id', 'requester', 'created_at', 'updated_at', 'completed_at')
+        read_only_fields = ('id', 'requester', 'created_at', 'updated_at', 'completed_at',
+                            'due_at', 'version')
+
+
+class ArchivedTicketSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Сериализатор архивной заявки (только чтение)
+    """
+    requester = UserSerializer(read_only=True)
+    executor = UserSerializer(read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    priority_display = serializers.CharField(source='get_priority_display', read_only=True)
+    archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedTicket
+        fields = '__all__'
+        read_only_fields = [field.name for field in ArchivedTicket._meta.fields]
+
+    def get_archived(self, obj) -> bool:
+        return True
 
 
 class TicketAssignSerializer(serializers.Serializer):
@@ -83,3 +225,116 @@ class TicketExecuteSerializer(serializers.Serializer):
         instance.completed_at = timezone.now()
         instance.save()
         return instance
+
+
+class TicketFilterSerializer(serializers.Serializer):
+    """
+    Параметры фильтрации и сортировки списков заявок (query string)
+    """
+    # Допустимые сортировки и индексы, на которые они опираются (проверка в checks.py)
+    ORDERING_INDEXES = {
+        '-created_at': 'tickets_created_at_idx',
+        'created_at': 'tickets_created_at_idx',
+        '-updated_at': 'tickets_updated_at_idx',
+        'updated_at': 'tickets_updated_at_idx',
+        '-completed_at': 'tickets_completed_at_idx',
+        'completed_at': 'tickets_completed_at_idx',
+    }
+    # Параметр -> условие в SQL
+    LOOKUPS = {
+        'status': 'status__in',
+        'priority': 'priority__in',
+        'requester': 'requester_id',
+        'created_after': 'created_at__gte',
+        'created_before': 'created_at__lt',
+        'completed_after': 'completed_at__gte',
+        'completed_before': 'completed_at__lt',
+    }
+    DATE_FORMATS = ['iso-8601', '%Y-%m-%d']
+
+    status = serializers.CharField(
+        required=False, help_text='Статусы через запятую, например `NEW,ASSIGNED`'
+    )
+    priority = serializers.CharField(
+        required=False, help_text='Приоритеты через запятую, например `HIGH,URGENT`'
+    )
+    executor = serializers.CharField(
+        required=False, help_text='ID исполнителя или `none` — заявки без исполнителя'
+    )
+    requester = serializers.IntegerField(required=False, min_value=1, help_text='ID заявителя')
+    created_after = serializers.DateTimeField(
+        required=False, input_formats=DATE_FORMATS, help_text='Созданы не раньше (дата или дата и время)'
+    )
+    created_before = serializers.DateTimeField(
+        required=False, input_formats=DATE_FORMATS, help_text='Созданы раньше (дата или дата и время)'
+    )
+    completed_after = serializers.DateTimeField(
+        required=False, input_formats=DATE_FORMATS, help_text='Выполнены не раньше'
+    )
+    completed_before = serializers.DateTimeField(
+        required=False, input_formats=DATE_FORMATS, help_text='Выполнены раньше'
+    )
+    ordering = serializers.ChoiceField(
+        choices=list(ORDERING_INDEXES), required=False,
+        help_text='Сортировка; по умолчанию `-created_at`'
+    )
+
+    def validate_status(self, value):
+        return self.validate_choices(value, Ticket.Status)
+
+    def validate_priority(self, value):
+        return self.validate_choices(value, Ticket.Priority)
+
+    def validate_executor(self, value):
+        if value.lower() == 'none':
+            return None
+        if not value.isdigit():
+            raise serializers.ValidationError('Ожидается ID исполнителя или none')
+        return int(value)
+
+    @staticmethod
+    def validate_choices(value, choices):
+        values = split_param(value)
+        unknown = [item for item in values if item not in choices.values]
+        if unknown or not values:
+            raise serializers.ValidationError(
+                f'Допустимые значения: {", ".join(choices.values)}'
+            )
+        return values
+
+    def validate(self, attrs):
+        for prefix in ('created', 'completed'):
+            after, before = attrs.get(f'{prefix}_after'), attrs.get(f'{prefix}_before')
+            if after and before and after >= before:
+                raise serializers.ValidationError(
+                    {f'{prefix}_before': f'Должно быть позже {prefix}_after'}
+                )
+        return attrs
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        filters = {lookup: data[name] for name, lookup in self.LOOKUPS.items() if name in data}
+        if 'executor' in data:
+            if data['executor'] is None:
+                filters['executor__isnull'] = True
+            else:
+                filters['executor_id'] = data['executor']
+        queryset = queryset.filter(**filters)
+        if 'ordering' in data:
+            queryset = queryset.order_by(data['ordering'])
+        return queryset
+
+
+class TicketEventSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор события истории заявки
+    """
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    actor_username = serializers.CharField(source='actor.username', read_only=True, allow_null=True)
+
+    class Meta:
+        model = TicketEvent
+        fields = ('id', 'kind', 'kind_display', 'actor', 'actor_username',
+                  'from_status', 'to_status', 'from_executor_id', 'to_executor_id',
+                  'comment', 'created_at')
+        read_only_fields = fields
@@ -0,0 +1,72 @@
+"""
+Поиск нарушений SLA от сохраненной позиции: каждый запуск просматривает только
+заявки, срок которых истек после прошлого запуска
+"""
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from apps.notifications import outbox
+
+from . import events
+from .models import OPEN_STATUSES, Checkpoint, Ticket, TicketEvent
+
+User = get_user_model()
+
+CHECKPOINT = 'sla_breaches'
+
+
+def breached_after(position, now):
+    """
+    Открытые заявки со сроком в (позиция, now] по возрастанию (due_at, id) —
+    диапазон частичного индекса tickets_open_due_idx
+    """
+    queryset = Ticket.objects.filter(status__in=OPEN_STATUSES, due_at__lte=now)
+    if position:
+        due_at = datetime.fromisoformat(position['due_at'])
+        queryset = queryset.filter(due_at__gte=due_at).exclude(due_at=due_at, id__lte=position['id'])
+    return queryset.order_by('due_at', 'id')
+
+
+def operator_emails():
+    return list(
+        User.objects.filter(role=User.Role.OPERATOR, is_active=True)
+        .exclude(email='').values_list('email', flat=True)
+    )
+
+
+@transaction.atomic
+def scan_batch(batch_size, now=None):
+    """
+    Одна пачка новых нарушений. События истории, уведомления и новая позиция
+    сохраняются в одной транзакции, поэтому каждое нарушение фиксируется ровно один раз;
+    параллельный сканер ждет на блокировке позиции. Возвращает найденные заявки.
+    """
+    now = now or timezone.now()
+    checkpoint, _ = Checkpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+    tickets = list(
+        breached_after(checkpoint.position, now)
+        .select_related('executor')
+        .only('id', 'title', 'status', 'priority', 'due_at', 'requester', 'executor__email')
+        [:batch_size]
+    )
+    if not tickets:
+        return tickets
+
+    with events.atomic():
+        for ticket in tickets:
+            events.record(
+                ticket, TicketEvent.Kind.SLA_BREACHED,
+                to_status=ticket.status,
+                to_executor_id=ticket.executor_id,
+            )
+
+    unassigned = any(ticket.executor_id is None for ticket in tickets)
+    outbox.tickets_breached(tickets, operator_emails() if unassigned else [])
+
+    last = tickets[-1]
+    checkpoint.position = {'due_at': last.due_at.isoformat(), 'id': last.pk}
+    checkpoint.save()
+    return tickets
@@ -0,0 +1,127 @@
+"""
+Тесты очистки по срокам хранения
+"""
+import threading
+import time
+import unittest
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from . import retention
+from .models import Ticket
+
+User = get_user_model()
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Нужны блокировки строк PostgreSQL')
+class RetentionConcurrencyTests(TransactionTestCase):
+    """
+    Пачка очистки идет своей транзакцией во втором соединении (потоке),
+    а тест в это время работает с теми же строками из основного
+    """
+    tickets = 40
+    # Чтение, которое ждало бы пачку, упало бы по этому таймауту
+    statement_timeout_ms = 1000
+
+    def setUp(self):
+        self.requester = User.objects.create_user(username='requester', password='password')
+        self.ids = [
+            Ticket.objects.create(
+                title=f'Заявка {index}', description='Описание',
+                requester=self.requester, status=Ticket.Status.CLOSED,
+            ).pk
+            for index in range(self.tickets)
+        ]
+        Ticket.objects.filter(pk__in=self.ids).update(
+            updated_at=timezone.now() - timedelta(days=1000)
+        )
+
+    def in_thread(self, target):
+        errors = []
+
+        def run():
+            try:
+                target()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread, errors
+
+    def set_statement_timeout(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT set_config(%s, %s, false)',
+                           ['statement_timeout', f'{self.statement_timeout_ms}ms'])
+
+    def test_reads_are_not_blocked_by_open_batch(self):
+        inside = threading.Event()
+        release = threading.Event()
+
+        def hold_batch_open(queryset):
+            count = retention.purge_tickets(queryset, retention.DELETE)
+            inside.set()
+            # Строки удалены, но транзакция пачки еще не зафиксирована
+            release.wait(10)
+            return count
+
+        runner = retention.BatchRunner(lambda message: None, batch_size=self.tickets, sleep=0)
+        thread, errors = self.in_thread(lambda: runner.run(
+            'tickets', retention.expired_tickets(Ticket, timezone.now() - timedelta(days=730)),
+            hold_batch_open,
+        ))
+        try:
+            self.assertTrue(inside.wait(10))
+            self.set_statement_timeout()
+
+            started = time.monotonic()
+            self.assertEqual(Ticket.objects.filter(pk__in=self.ids).count(), self.tickets)
+            self.assertEqual(len(list(Ticket.objects.filter(requester=self.requester))), self.tickets)
+            # Запись других заявок тоже не ждет пачку
+            other = Ticket.objects.create(title='Новая', description='Описание',
+                                          requester=self.requester)
+            other.title = 'Новая заявка'
+            other.save()
+            self.assertLess(time.monotonic() - started, self.statement_timeout_ms / 1000)
+        finally:
+            release.set()
+            thread.join(10)
+
+        self.assertEqual(errors, [])
+        self.assertFalse(Ticket.objects.filter(pk__in=self.ids).exists())
+
+    def test_batch_gives_up_on_held_lock_and_retries(self):
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_row_lock():
+            with transaction.atomic():
+                list(Ticket.objects.filter(pk=self.ids[0]).select_for_update())
+                locked.set()
+                release.wait(10)
+
+        thread, errors = self.in_thread(hold_row_lock)
+        self.assertTrue(locked.wait(10))
+        messages = []
+        runner = retention.BatchRunner(messages.append, batch_size=self.tickets, sleep=0.05,
+                                       lock_timeout=0.2)
+        # Блокировку снимают во время повторов: пачка дожидается ее, не зависая
+        threading.Timer(0.5, release.set).start()
+        try:
+            purged = runner.run(
+                'tickets', Ticket.objects.filter(pk__in=self.ids),
+                lambda queryset: retention.purge_tickets(queryset, retention.DELETE),
+            )
+        finally:
+            release.set()
+            thread.join(10)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(purged, self.tickets)
+        self.assertTrue(any('таймаут блокировки' in message for message in messages))
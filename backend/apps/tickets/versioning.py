@@ -0,0 +1,71 @@
+"""
+Оптимистичная блокировка заявок: версия в ETag, проверка через If-Match или поле version
+"""
+import re
+
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .serializers import TicketDetailSerializer
+
+HEADER = 'If-Match'
+FIELD = 'version'
+
+# "3" или W/"3"; слабый ETag сравнивается так же — версия одна на все представления
+ETAG_RE = re.compile(r'^(?:W/)?"(\d+)"$')
+
+PARAMETER = OpenApiParameter(
+    HEADER, str, location=OpenApiParameter.HEADER,
+    description='ETag заявки из предыдущего ответа (`"<version>"`). Если заявку '
+                'с тех пор изменили, возвращается 412 с ее текущим состоянием. Вместо '
+                'заголовка можно передать поле `version` в теле — тогда конфликт дает 409.',
+)
+
+
+def etag(ticket):
+    return f'"{ticket.version}"'
+
+
+def with_etag(response, ticket):
+    response['ETag'] = etag(ticket)
+    return response
+
+
+def expected_version(request):
+    """
+    Версия, с которой клиент начинал изменение: (версия или None, код ответа при конфликте).
+    If-Match: * и отсутствие версии не ограничивают изменение.
+    """
+    header = request.headers.get(HEADER)
+    if header is not None:
+        header = header.strip()
+        if header == '*':
+            return None, status.HTTP_412_PRECONDITION_FAILED
+        match = ETAG_RE.match(header)
+        if match is None:
+            raise ValidationError({HEADER: f'Ожидается ETag заявки, например "3", получено {header!r}'})
+        return int(match.group(1)), status.HTTP_412_PRECONDITION_FAILED
+
+    value = request.data.get(FIELD) if hasattr(request.data, 'get') else None
+    if value is None:
+        return None, status.HTTP_409_CONFLICT
+    if isinstance(value, bool) or not str(value).isdigit():
+        raise ValidationError({FIELD: 'Ожидается целое неотрицательное число'})
+    return int(value), status.HTTP_409_CONFLICT
+
+
+def conflict_response(current, status_code):
+    """
+    Ответ на конфликт версий с текущим состоянием заявки
+    """
+    response = Response(
+        {
+            'detail': 'Заявка изменена другим запросом. Повторите изменение '
+                      'на основе текущего состояния.',
+            'current': TicketDetailSerializer(current).data,
+        },
+        status=status_code,
+    )
+    return with_etag(response, current)
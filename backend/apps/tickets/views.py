@@ -2,24 +2,62 @@
 Представления для заявок
 """
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
-from rest_framework import viewsets, status
+from rest_framework import serializers, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.http import Http404
 
-from .models import Ticket
+from apps.notifications import outbox
+from config.instrumentation import timed
+from config.renderers import JSONFragments
+
+from . import events, fragments, idempotency, versioning
+from .models import ArchivedTicket, Ticket, TicketEvent, VersionConflict
+from .pagination import TicketEventCursorPagination
 from .serializers import (
     TicketCreateSerializer,
     TicketListSerializer,
     TicketDetailSerializer,
+    ArchivedTicketSerializer,
     TicketAssignSerializer,
-    TicketExecuteSerializer
+    TicketExecuteSerializer,
+    TicketEventSerializer,
+    TicketFilterSerializer,
+    model_column,
+    split_param
 )
 from apps.users.permissions import IsRequester, IsOperator, IsExecutor
+from apps.users.serializers import UserSerializer
 
 User = get_user_model()
 
+SPARSE_PARAMETERS = [
+    OpenApiParameter(
+        'fields', str,
+        description='Поля через запятую, например `id,title,status,executor.username`. '
+                    'Поле связи через точку раскрывает связь только с этими полями.'
+    ),
+    OpenApiParameter(
+        'expand', str,
+        description='Связи (`requester`, `executor`), выводимые вложенным объектом целиком. '
+                    'Если задан `fields` или `expand`, нераскрытые связи выводятся как id.'
+    ),
+]
+
+LIST_PARAMETERS = SPARSE_PARAMETERS + [
+    OpenApiParameter(
+        'normalized', bool,
+        description='Нормализованный ответ: в строках пользователи указаны по id, '
+                    'каждый пользователь один раз выводится в словаре `users`, '
+                    'подписи статусов, приоритетов и ролей — в словаре `choices`.'
+    ),
+    TicketFilterSerializer,
+]
+
 
 @extend_schema(tags=['Заявки'])
 class TicketViewSet(viewsets.ModelViewSet):
@@ -28,7 +66,111 @@ class TicketViewSet(viewsets.ModelViewSet):
     """
     queryset = Ticket.objects.all()
     permission_classes = [IsAuthenticated]
+    # Действия чтения с поддержкой ?fields= и ?expand=; списки — еще и ?normalized=
+    sparse_actions = ('list', 'retrieve', 'my_tickets', 'all_tickets', 'assigned_to_me')
+    list_actions = ('list', 'my_tickets', 'all_tickets', 'assigned_to_me')
+    # Стоимость действий для RoleRateThrottle: списки по всем заявкам дороже остальных
+    throttle_costs = {'all_tickets': 5, 'list': 3}
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.sparse_actions:
+            # В SQL попадают только колонки выбранных полей, JOIN — только раскрытые связи
+            columns, related = self.get_serializer().query_plan()
+            if related:
+                # select_related() без аргументов подтянул бы все связи
+                queryset = queryset.select_related(*related)
+            if self.action in self.list_actions and settings.TICKET_FRAGMENT_CACHE:
+                # updated_at входит в ключ фрагмента
+                columns.append('updated_at')
+            elif self.action == 'retrieve':
+                # Версия нужна для ETag
+                columns.append('version')
+            queryset = queryset.only(*columns)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.sparse_actions:
+            kwargs.update(self.sparse_options())
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        """
+        Фильтры и сортировка списков из параметров запроса (TicketFilterSerializer)
+        """
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.list_actions:
+            filters = TicketFilterSerializer(data=self.request.query_params)
+            filters.is_valid(raise_exception=True)
+            queryset = filters.filter_queryset(queryset)
+        return queryset
+
+    def sparse_options(self):
+        """
+        Параметры fields/expand из запроса для SparseFieldsMixin
+        """
+        params = self.request.query_params
+        options = {name: split_param(params[name]) for name in ('fields', 'expand') if name in params}
+        if self.action in self.list_actions:
+            options['normalized'] = params.get('normalized', '').lower() in ('1', 'true', 'yes')
+        return options
+
+    def list_response(self, queryset, paginate=True):
+        """
+        Ответ со списком заявок; в нормализованном виде рядом со строками
+        отдаются словари users и choices.
+
+        С TICKET_FRAGMENT_CACHE строки собираются из кэша отрендеренного JSON заявок
+        (fragments), сериализуются только промахи.
+        """
+        page = self.paginate_queryset(queryset) if paginate else None
+        tickets = list(queryset if page is None else page)
+        serializer = self.get_serializer(tickets, many=True)
+        with timed('serialize'):
+            if settings.TICKET_FRAGMENT_CACHE:
+                rows = JSONFragments(fragments.render(serializer.child, tickets))
+            else:
+                rows = serializer.data
+            extra = self.side_load(tickets, serializer.child) if serializer.child.normalized else None
+        if page is not None:
+            response = self.get_paginated_response(rows)
+            response.data.update(extra or {})
+            return response
+        if extra is not None:
+            return Response({'results': rows, **extra})
+        return Response(rows)
+
+    def side_load(self, tickets, serializer):
+        """
+        Пользователи из заявок списка (один запрос IN) и подписи значений выбора
+        """
+        ids = {
+            getattr(ticket, f'{relation}_id') for ticket in tickets
+            for relation in serializer.side_loaded
+        } - {None}
+        # Поля пользователей: объединение запрошенных через точку, по умолчанию все
+        nested = list(serializer.side_loaded.values())
+        wanted = None if None in nested else {'id'}.union(*nested)
+        users = UserSerializer(many=True)
+        names = [
+            name for name, field in users.child.fields.items()
+            if model_column(User, field.source) == name and (wanted is None or name in wanted)
+        ]
+        users.instance = list(User.objects.only(*names).in_bulk(ids).values())
+        for name in set(users.child.fields) - set(names):
+            users.child.fields.pop(name)
+
+        choices = {
+            name: dict(field.choices)
+            for source in (serializer, users.child)
+            for name, field in source.fields.items()
+            if isinstance(field, serializers.ChoiceField)
+        }
+        return {
+            'users': {user['id']: user for user in users.data},
+            'choices': choices,
+        }
+
     def get_serializer_class(self):
         if self.action == 'create':
             return TicketCreateSerializer
@@ -38,6 +180,8 @@ class TicketViewSet(viewsets.ModelViewSet):
             return TicketAssignSerializer
         elif self.action == 'execute':
             return TicketExecuteSerializer
+        elif self.action == 'history':
+            return TicketEventSerializer
         return TicketDetailSerializer
     
     def get_permissions(self):
@@ -61,32 +205,133 @@ class TicketViewSet(viewsets.ModelViewSet):
         
         return [permission() for permission in permission_classes]
 
+    def handle_exception(self, exc):
+        if isinstance(exc, VersionConflict):
+            # Условный UPDATE не изменил строку: заявку изменили между чтением и записью
+            current = get_object_or_404(
+                Ticket.objects.select_related('requester', 'executor'),
+                pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field],
+            )
+            return versioning.conflict_response(
+                current, getattr(self, 'conflict_status', status.HTTP_409_CONFLICT)
+            )
+        return super().handle_exception(exc)
+
+    def check_version(self, ticket):
+        """
+        Ответ о конфликте, если заявка уже не той версии, что прислал клиент
+        (If-Match или поле version), иначе None. Гонку после этой проверки
+        ловит условный UPDATE в Ticket.save().
+        """
+        expected, self.conflict_status = versioning.expected_version(self.request)
+        if expected is not None and expected != ticket.version:
+            return versioning.conflict_response(ticket, self.conflict_status)
+        return None
+
+    def get_archived_object(self):
+        """
+        Заявка из архива по pk из URL, если в основной таблице ее уже нет
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = ArchivedTicket.objects.select_related('requester', 'executor')
+        return get_object_or_404(queryset, pk=self.kwargs[lookup_url_kwarg])
+
+    def serialize(self, *args, **kwargs):
+        """
+        Данные сериализатора с замером времени сериализации (Server-Timing)
+        """
+        serializer = self.get_serializer(*args, **kwargs)
+        with timed('serialize'):
+            return serializer.data
+
+    def perform_create(self, serializer):
+        # Заявка, уведомление и событие истории сохраняются вместе или не сохраняются вовсе
+        with events.atomic():
+            ticket = serializer.save()
+            outbox.ticket_created(ticket)
+            events.record_created(ticket, self.request.user)
+
+    def perform_update(self, serializer):
+        before = events.snapshot(serializer.instance)
+        with events.atomic():
+            ticket = serializer.save()
+            events.record_changes(ticket, before, self.request.user)
+
     @extend_schema(
         summary="Создание заявки",
         description="Создание новой заявки. Доступно только для роли **Заявитель (REQUESTER)**.",
+        parameters=[idempotency.PARAMETER],
         responses={201: TicketDetailSerializer}
     )
+    @idempotency.idempotent
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
     @extend_schema(
         summary="Список заявок (Общий)",
         description="Возвращает список заявок (поведение зависит от роли, стандартный метод DRF).",
+        parameters=LIST_PARAMETERS,
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        return self.list_response(self.filter_queryset(self.get_queryset()))
 
     @extend_schema(
         summary="Детальная информация о заявке",
-        description="Получение полной информации о заявке по ID.",
+        description="Получение полной информации о заявке по ID. "
+                    "Заявки, перенесенные в архив, возвращаются с признаком `archived`.",
+        parameters=SPARSE_PARAMETERS,
         responses={200: TicketDetailSerializer}
     )
     def retrieve(self, request, *args, **kwargs):
-        return super().retrieve(request, *args, **kwargs)
+        try:
+            ticket = self.get_object()
+            return versioning.with_etag(Response(self.serialize(ticket)), ticket)
+        except Http404:
+            archived = self.get_archived_object()
+            return Response(ArchivedTicketSerializer(archived, **self.sparse_options()).data)
+
+    @extend_schema(
+        summary="Изменение заявки",
+        description="Изменение заявки с оптимистичной блокировкой: версия из `If-Match` "
+                    "(или поля `version` в теле) проверяется в том же UPDATE, что сохраняет "
+                    "заявку. Если заявку уже изменили, возвращается 412 (409 для `version`) "
+                    "с текущим состоянием в `current`. Новая версия — в заголовке `ETag`.",
+        parameters=[versioning.PARAMETER],
+        responses={
+            200: TicketDetailSerializer,
+            409: OpenApiResponse(description="Версия из поля version устарела"),
+            412: OpenApiResponse(description="Версия из If-Match устарела"),
+        }
+    )
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        ticket = self.get_object()
+        conflict = self.check_version(ticket)
+        if conflict is not None:
+            return conflict
+        serializer = self.get_serializer(ticket, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        # Экземпляр уже содержит новую версию и updated_at: повторного SELECT нет
+        return versioning.with_etag(Response(serializer.data), ticket)
+
+    @extend_schema(
+        summary="Частичное изменение заявки",
+        description="Как PUT, но с частью полей. Поддерживает `If-Match` и поле `version`.",
+        parameters=[versioning.PARAMETER],
+        responses={
+            200: TicketDetailSerializer,
+            409: OpenApiResponse(description="Версия из поля version устарела"),
+            412: OpenApiResponse(description="Версия из If-Match устарела"),
+        }
+    )
+    def partial_update(self, request, *args, **kwargs):
+        return super().partial_update(request, *args, **kwargs)
     
     @extend_schema(
         summary="Мои заявки",
         description="Список заявок, созданных текущим пользователем. Доступно только для роли **Заявитель (REQUESTER)**.",
+        parameters=LIST_PARAMETERS,
         responses={200: TicketListSerializer(many=True)}
     )
     @action(detail=False, methods=['get'], url_path='my-tickets')
@@ -94,13 +339,13 @@ class TicketViewSet(viewsets.ModelViewSet):
         """
         Просмотр заявок, созданных текущим пользователем (заявитель)
         """
-        tickets = Ticket.objects.filter(requester=request.user)
-        serializer = self.get_serializer(tickets, many=True)
-        return Response(serializer.data)
+        tickets = self.filter_queryset(self.get_queryset().filter(requester=request.user))
+        return self.list_response(tickets, paginate=False)
     
     @extend_schema(
         summary="Все заявки",
         description="Список абсолютно всех заявок в системе. Доступно только для роли **Оператор (OPERATOR)**.",
+        parameters=LIST_PARAMETERS,
         responses={200: TicketListSerializer(many=True)}
     )
     @action(detail=False, methods=['get'], url_path='all-tickets')
@@ -108,18 +353,13 @@ class TicketViewSet(viewsets.ModelViewSet):
         """
         Просмотр всех заявок (оператор)
         """
-        tickets = Ticket.objects.all()
-        page = self.paginate_queryset(tickets)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(tickets, many=True)
-        return Response(serializer.data)
+        tickets = self.filter_queryset(self.get_queryset())
+        return self.list_response(tickets)
     
     @extend_schema(
         summary="Назначенные мне",
         description="Список заявок, назначенных текущему исполнителю. Доступно только для роли **Исполнитель (EXECUTOR)**.",
+        parameters=LIST_PARAMETERS,
         responses={200: TicketListSerializer(many=True)}
     )
     @action(detail=False, methods=['get'], url_path='assigned-to-me')
@@ -127,50 +367,66 @@ class TicketViewSet(viewsets.ModelViewSet):
         """
         Просмотр заявок, назначенных текущему пользователю (исполнитель)
         """
-        tickets = Ticket.objects.filter(executor=request.user)
-        serializer = self.get_serializer(tickets, many=True)
-        return Response(serializer.data)
+        tickets = self.filter_queryset(self.get_queryset().filter(executor=request.user))
+        return self.list_response(tickets, paginate=False)
     
     @extend_schema(
         summary="Назначить исполнителя",
         description="Назначить исполнителя на заявку. Доступно только для роли **Оператор (OPERATOR)**.",
         request=TicketAssignSerializer,
+        parameters=[idempotency.PARAMETER, versioning.PARAMETER],
         responses={
             200: TicketDetailSerializer,
-            400: OpenApiResponse(description="Не указан ID исполнителя или исполнитель не найден")
+            400: OpenApiResponse(description="Не указан ID исполнителя или исполнитель не найден"),
+            409: OpenApiResponse(description="Версия из поля version устарела"),
+            412: OpenApiResponse(description="Версия из If-Match устарела"),
         }
     )
     @action(detail=True, methods=['post'])
+    @idempotency.idempotent
     def assign(self, request, pk=None):
         """
         Назначение заявки исполнителю (оператор)
         """
         ticket = self.get_object()
+        conflict = self.check_version(ticket)
+        if conflict is not None:
+            return conflict
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         executor_id = serializer.validated_data['executor_id']
         executor = User.objects.get(id=executor_id)
         
+        before = events.snapshot(ticket)
         ticket.executor = executor
         ticket.status = Ticket.Status.ASSIGNED
-        ticket.save()
+        # Срок SLA отсчитывается заново от назначения
+        ticket.stamp_due()
+        with events.atomic():
+            ticket.save()
+            outbox.ticket_assigned(ticket)
+            events.record_changes(ticket, before, request.user)
         
-        return Response(
+        return versioning.with_etag(Response(
             TicketDetailSerializer(ticket).data,
             status=status.HTTP_200_OK
-        )
+        ), ticket)
     
     @extend_schema(
         summary="Выполнить заявку",
         description="Завершить выполнение заявки, добавив комментарий. Доступно только для роли **Исполнитель (EXECUTOR)**.",
         request=TicketExecuteSerializer,
+        parameters=[idempotency.PARAMETER, versioning.PARAMETER],
         responses={
             200: TicketDetailSerializer,
-            403: OpenApiResponse(description="Заявка не назначена этому исполнителю")
+            403: OpenApiResponse(description="Заявка не назначена этому исполнителю"),
+            409: OpenApiResponse(description="Версия из поля version устарела"),
+            412: OpenApiResponse(description="Версия из If-Match устарела"),
         }
     )
     @action(detail=True, methods=['post'])
+    @idempotency.idempotent
     def execute(self, request, pk=None):
         """
         Выполнение заявки (исполнитель)
@@ -184,12 +440,42 @@ class TicketViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        conflict = self.check_version(ticket)
+        if conflict is not None:
+            return conflict
         serializer = self.get_serializer(ticket, data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        before = events.snapshot(ticket)
+        with events.atomic():
+            serializer.save()
+            outbox.ticket_completed(ticket, serializer.validated_data.get('comment', ''))
+            events.record_changes(
+                ticket, before, request.user,
+                comment=serializer.validated_data.get('comment', '')
+            )
         
-        return Response(
+        return versioning.with_etag(Response(
             TicketDetailSerializer(ticket).data,
             status=status.HTTP_200_OK
-        )
+        ), ticket)
+
+    @extend_schema(
+        summary="История заявки",
+        description="Смены статуса, исполнителя и комментарии по заявке, от новых к старым. "
+                    "Постраничный вывод по курсору (`cursor`), размер страницы — `page_size`.",
+        responses={200: TicketEventSerializer(many=True)}
+    )
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """
+        История изменений заявки
+        """
+        try:
+            ticket_id = self.get_object().pk
+        except Http404:
+            ticket_id = self.get_archived_object().pk
+        queryset = TicketEvent.objects.filter(ticket_id=ticket_id).select_related('actor')
+        paginator = TicketEventCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(self.serialize(page, many=True))
 
@@ -3,8 +3,15 @@
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from apps.tickets.pagination import EstimatedCountPaginator
 from .models import User
 
+# Роль, которой ограничен выбор в автодополнении поля заявки
+AUTOCOMPLETE_ROLES = {
+    'requester': User.Role.REQUESTER,
+    'executor': User.Role.EXECUTOR,
+}
+
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -14,6 +21,8 @@ class UserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'role', 'first_name', 'last_name', 'is_staff')
     list_filter = ('role', 'is_staff', 'is_active')
     search_fields = ('username', 'email', 'first_name', 'last_name')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     
     fieldsets = BaseUserAdmin.fieldsets + (
         ('Дополнительная информация', {
@@ -26,3 +35,11 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('role', 'phone', 'department')
         }),
     )
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        # Автодополнение заявителя/исполнителя в карточке заявки: только подходящая роль
+        role = AUTOCOMPLETE_ROLES.get(request.GET.get('field_name'))
+        if role and request.GET.get('model_name') in ('ticket', 'archivedticket'):
+            queryset = queryset.filter(role=role)
+        return queryset, may_have_duplicates
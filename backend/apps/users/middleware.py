@@ -0,0 +1,25 @@
+"""
+Middleware приложения пользователей
+"""
+import math
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Добавляет к ответам API заголовки RateLimit-Limit, RateLimit-Remaining,
+    RateLimit-Reset и RateLimit-Policy по результату RoleRateThrottle
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            limit, remaining, reset, window = rate_limit
+            response['RateLimit-Limit'] = str(limit)
+            response['RateLimit-Remaining'] = str(remaining)
+            response['RateLimit-Reset'] = str(math.ceil(reset))
+            response['RateLimit-Policy'] = f'{limit};w={window}'
+        return response
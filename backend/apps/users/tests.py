@@ -0,0 +1,65 @@
+"""
+Тесты ограничения частоты запросов
+"""
+import threading
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from .throttling import CacheCounters, LocalCounters, SlidingWindow
+
+
+class ConcurrentWindowTests(SimpleTestCase):
+    """
+    Параллельные запросы к одному ключу пропускаются ровно в пределах квоты:
+    сначала атомарно прибавляется стоимость, потом проверяется лимит
+    """
+    threads = 16
+    requests_per_thread = 50
+    limit = 100
+    window = 60
+    # Середина корзины: прошлая корзина пуста, окно не сдвигается во время теста
+    now = 1_000_030.0
+
+    def hit_concurrently(self, counters, cost=1):
+        window = SlidingWindow(self.limit, self.window)
+        barrier = threading.Barrier(self.threads)
+        allowed = []
+        errors = []
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.requests_per_thread):
+                    result, _, _ = window.hit(counters, 'throttle:user:1', cost, self.now)
+                    allowed.append(result)
+            except Exception as exc:
+                errors.append(exc)
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+        return allowed
+
+    def assert_exact_quota(self, counters, cost=1):
+        allowed = self.hit_concurrently(counters, cost)
+        self.assertEqual(len(allowed), self.threads * self.requests_per_thread)
+        self.assertEqual(allowed.count(True), self.limit // cost)
+        # Отклоненные запросы вернули свою стоимость: в счетчике ровно пропущенные
+        bucket = int(self.now // self.window)
+        self.assertEqual(counters.get(f'throttle:user:1:{bucket}'), self.limit // cost * cost)
+
+    def test_cache_counters(self):
+        self.assert_exact_quota(CacheCounters(LocMemCache('throttling-tests', {})))
+
+    def test_cache_counters_weighted_cost(self):
+        self.assert_exact_quota(CacheCounters(LocMemCache('throttling-tests-cost', {})), cost=3)
+
+    def test_local_counters(self):
+        self.assert_exact_quota(LocalCounters())
+
+    def test_local_counters_weighted_cost(self):
+        self.assert_exact_quota(LocalCounters(), cost=3)
@@ -0,0 +1,160 @@
+"""
+Ограничение частоты запросов по ролям: скользящее окно на счетчиках в кэше
+"""
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+# После ошибки кэша счетчики столько секунд ведутся в памяти процесса
+CACHE_RETRY_SECONDS = 5
+
+
+class CacheCounters:
+    """
+    Счетчики в настроенном кэше. incr атомарен в Redis и LocMemCache,
+    поэтому параллельные запросы получают разные значения.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def incr(self, key, delta, timeout):
+        try:
+            return self.backend.incr(key, delta)
+        except ValueError:
+            # Ключа еще нет: создает его только один из параллельных запросов
+            if self.backend.add(key, delta, timeout):
+                return delta
+            return self.backend.incr(key, delta)
+
+    def get(self, key):
+        return self.backend.get(key, 0)
+
+
+class LocalCounters:
+    """
+    Счетчики в памяти процесса — запасной вариант, когда кэш недоступен.
+    Квота при этом считается отдельно в каждом процессе.
+    """
+    max_keys = 100000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def incr(self, key, delta, timeout):
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._values.get(key, (0, 0))
+            if expires <= now:
+                value, expires = 0, now + timeout
+            value += delta
+            self._values[key] = (value, expires)
+            if len(self._values) > self.max_keys:
+                self._values = {k: v for k, v in self._values.items() if v[1] > now}
+            return value
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._values.get(key, (0, 0))
+        return value if expires > time.monotonic() else 0
+
+
+class SlidingWindow:
+    """
+    Счетчик скользящего окна: время делится на корзины длиной в окно (window секунд),
+    использование = счетчик текущей корзины + доля прошлой, еще попадающая в окно.
+
+    Стоимость сначала прибавляется (атомарно), и только потом проверяется лимит;
+    при превышении она вычитается обратно. Так параллельные запросы не могут
+    вместе пройти сверх квоты.
+    """
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+
+    def hit(self, counters, key, cost, now):
+        """
+        (разрешен ли запрос, остаток квоты, через сколько секунд повторить или сброс окна)
+        """
+        bucket, offset = divmod(now, self.window)
+        current_key = f'{key}:{int(bucket)}'
+        timeout = self.window * 2
+        current = counters.incr(current_key, cost, timeout)
+        previous = counters.get(f'{key}:{int(bucket) - 1}')
+        weight = 1 - offset / self.window
+        used = previous * weight + current
+        if used <= self.limit:
+            return True, int(self.limit - used), self.window - offset
+
+        current = counters.incr(current_key, -cost, timeout)
+        return False, 0, self.retry_after(previous, current, cost, offset)
+
+    def retry_after(self, previous, current, cost, offset):
+        if current + cost <= self.limit:
+            # Хватит, когда доля прошлой корзины уменьшится
+            fraction = 1 - (self.limit - current - cost) / previous
+            return max(fraction * self.window - offset, 0)
+        # Ждем следующей корзины, в которой текущая станет прошлой
+        fraction = max(1 - (self.limit - cost) / current, 0) if current else 0
+        return self.window - offset + fraction * self.window
+
+
+class RoleRateThrottle(BaseThrottle):
+    """
+    Квота на пользователя по его роли (THROTTLE_ROLE_LIMITS) и на IP для анонимов
+    (THROTTLE_ANON_LIMIT) за THROTTLE_WINDOW секунд.
+
+    Действие стоит столько единиц, сколько указано в throttle_costs представления
+    (ключ — action ViewSet или HTTP-метод), по умолчанию 1. Данные для заголовков
+    RateLimit-* сохраняются в request.rate_limit.
+    """
+    cache_counters = CacheCounters(cache)
+    local_counters = LocalCounters()
+    cache_failed_until = 0.0
+
+    def allow_request(self, request, view):
+        user = request.user
+        if user and user.is_authenticated:
+            key = f'throttle:user:{user.pk}'
+            limits = settings.THROTTLE_ROLE_LIMITS
+            limit = limits.get(user.role, limits[user.Role.REQUESTER])
+        else:
+            key = f'throttle:anon:{self.get_ident(request)}'
+            limit = settings.THROTTLE_ANON_LIMIT
+
+        window = SlidingWindow(limit, settings.THROTTLE_WINDOW)
+        allowed, remaining, seconds = self.hit(window, key, self.get_cost(request, view))
+        self.seconds = seconds
+        # Заголовки добавляет RateLimitHeadersMiddleware к ответу Django
+        request._request.rate_limit = (limit, remaining, seconds, window.window)
+        return allowed
+
+    def hit(self, window, key, cost):
+        now = time.time()
+        if now >= RoleRateThrottle.cache_failed_until:
+            try:
+                return window.hit(self.cache_counters, key, cost, now)
+            except Exception:
+                logger.warning('Кэш недоступен, лимиты запросов считаются в памяти процесса',
+                               exc_info=True)
+                RoleRateThrottle.cache_failed_until = now + CACHE_RETRY_SECONDS
+        return window.hit(self.local_counters, key, cost, now)
+
+    @staticmethod
+    def get_cost(request, view):
+        costs = getattr(view, 'throttle_costs', {})
+        action = getattr(view, 'action', None) or request.method.lower()
+        return costs.get(action, 1)
+
+    def wait(self):
+        return math.ceil(self.seconds)
+
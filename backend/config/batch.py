@@ -0,0 +1,296 @@
+"""
+Пакетные запросы: несколько вызовов API в одном HTTP-запросе с одной аутентификацией
+"""
+import contextvars
+import io
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, transaction
+from django.urls import Resolver404, resolve
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.tickets import idempotency
+
+from . import db_router
+from .middleware import SAFE_METHODS, ReplicaRoutingMiddleware
+from .renderers import FragmentJSONRenderer, JSONFragments
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Заголовки исходного запроса, которые получают подзапросы; остальные
+# (Idempotency-Key, If-Match и т.п.) задаются для каждого подзапроса отдельно
+INHERITED_HEADERS = (
+    'HTTP_HOST', 'HTTP_USER_AGENT', 'HTTP_ACCEPT_LANGUAGE',
+    'HTTP_X_FORWARDED_FOR', 'HTTP_X_FORWARDED_PROTO', 'HTTP_X_REQUEST_ID',
+)
+
+# Заголовки ответа подзапроса, которые попадают в результат
+RESPONSE_HEADERS = ('ETag', 'Location', 'Retry-After', 'Idempotent-Replayed')
+
+renderer = FragmentJSONRenderer()
+
+
+class BatchItemSerializer(serializers.Serializer):
+    id = serializers.CharField(max_length=64, required=False,
+                               help_text='Метка подзапроса, возвращается в результате')
+    method = serializers.ChoiceField(choices=METHODS, default='GET')
+    path = serializers.RegexField(r'^/', max_length=2000,
+                                  help_text='Путь API с параметрами: /api/tickets/my-tickets/?page=2')
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(max_length=1000),
+                                   required=False, default=dict)
+
+    def validate_headers(self, value):
+        for name in value:
+            if not name.replace('-', '').isalnum():
+                raise serializers.ValidationError(f'Недопустимое имя заголовка: {name!r}')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    atomic = serializers.BooleanField(
+        default=False,
+        help_text='Выполнить подзапросы по порядку в одной транзакции; первая ошибка '
+                  'откатывает все изменения, оставшиеся подзапросы не выполняются (424)',
+    )
+    parallel = serializers.BooleanField(
+        default=False,
+        help_text='Выполнять подряд идущие GET-подзапросы параллельно (без atomic). '
+                  'Выигрыш есть, когда чтения ждут БД; сериализация из-за GIL не ускоряется',
+    )
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'Не больше {settings.BATCH_MAX_ITEMS} подзапросов в пакете'
+            )
+        return value
+
+
+def build_request(request, item):
+    """
+    HttpRequest подзапроса. Пользователь передается уже аутентифицированным,
+    токен повторно не проверяется.
+    """
+    url = urlsplit(item['path'])
+    body = b'' if item.get('body') is None else json.dumps(item['body']).encode()
+    environ = {
+        key: value for key, value in request.META.items()
+        if key in INHERITED_HEADERS or not (key.startswith('HTTP_') or key.startswith('CONTENT_'))
+    }
+    environ.update({
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': url.path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': url.query,
+        'HTTP_ACCEPT': 'application/json',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    for name, value in item['headers'].items():
+        key = name.upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[f'HTTP_{key}'] = value
+
+    sub_request = WSGIRequest(environ)
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def resolve_item(item):
+    """
+    Представление подзапроса. Разрешены только представления DRF (кроме самого пакета)
+    """
+    try:
+        match = resolve(urlsplit(item['path']).path)
+    except Resolver404:
+        return None
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None or not issubclass(view_class, APIView) or issubclass(view_class, BatchView):
+        return None
+    return match
+
+
+def item_result(item, status_code, content=None, content_type='', headers=None):
+    """
+    Результат подзапроса: готовый JSON {"id", "status", "headers", "body"}.
+    Тело JSON-ответа вставляется как есть, без повторного разбора.
+    """
+    head = {'status': status_code, 'headers': headers or {}}
+    if 'id' in item:
+        head = {'id': item['id'], **head}
+    if not content:
+        body = b'null'
+    elif 'json' in content_type:
+        body = content
+    else:
+        body = renderer.render_fragment(content.decode(errors='replace'))
+    return renderer.render_fragment(head)[:-1] + b',"body":' + body + b'}'
+
+
+def error_result(item, status_code, detail):
+    content = renderer.render_fragment({'detail': detail})
+    return item_result(item, status_code, content, 'application/json')
+
+
+def run_item(request, item):
+    """
+    Выполняет один подзапрос. Возвращает (код ответа, результат)
+    """
+    match = resolve_item(item)
+    if match is None:
+        return 404, error_result(item, 404, f'Подзапрос к {item["path"]} не поддерживается')
+
+    sub_request = build_request(request, item)
+    sub_request.resolver_match = match
+    try:
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    except Exception:
+        logger.exception('Ошибка подзапроса пакета %s %s', item['method'], item['path'])
+        return 500, error_result(item, 500, 'Внутренняя ошибка сервера')
+
+    rate_limit = getattr(sub_request, 'rate_limit', None)
+    if rate_limit is not None:
+        request._request.rate_limit = min(
+            rate_limit, getattr(request._request, 'rate_limit', rate_limit),
+            key=lambda value: value[1],
+        )
+    headers = {name: response[name] for name in RESPONSE_HEADERS if response.has_header(name)}
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    return response.status_code, item_result(
+        item, response.status_code, content, response.get('Content-Type', ''), headers,
+    )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """
+    Общий для процесса пул потоков параллельных чтений: число потоков (и их
+    соединений с БД) не растет с числом одновременных пакетов
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(settings.BATCH_MAX_WORKERS,
+                                               thread_name_prefix='batch')
+    return _executor
+
+
+def run_in_thread(context, request, item):
+    """
+    Подзапрос в потоке пула с контекстом исходного запроса (логи, реплики, замеры).
+    Соединения потока с БД после него обрабатываются как в конце запроса
+    (CONN_MAX_AGE, пул соединений)
+    """
+    try:
+        return context.run(run_item, request, item)
+    finally:
+        close_old_connections()
+
+
+@extend_schema(
+    summary="Пакетный запрос",
+    description="Выполняет до `BATCH_MAX_ITEMS` запросов к API за один вызов с одной "
+                "аутентификацией. Результаты возвращаются в порядке подзапросов: код ответа, "
+                "заголовки (ETag, Location, Retry-After, Idempotent-Replayed) и тело. "
+                "С `parallel` подряд идущие GET выполняются параллельно в пуле потоков, "
+                "изменяющие запросы — по порядку. С `atomic` все подзапросы выполняются "
+                "последовательно в одной транзакции. Каждый подзапрос расходует "
+                "свою квоту частоты запросов.",
+    request=BatchSerializer,
+    responses={
+        200: OpenApiResponse(description="Результаты подзапросов: "
+                                         "`{\"results\": [...], \"rolled_back\": false}`"),
+        400: OpenApiResponse(description="Ошибка валидации пакета"),
+    }
+)
+class BatchView(APIView):
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        batch = serializer.validated_data
+        items = batch['requests']
+
+        if batch['atomic']:
+            results, rolled_back = self.run_atomic(request, items)
+            return Response({'results': JSONFragments(results), 'rolled_back': rolled_back})
+
+        # Пакет из одних чтений читает из реплик, как обычные GET
+        # (POST-запрос пакета ReplicaRoutingMiddleware считает изменяющим)
+        read_only = all(item['method'] in SAFE_METHODS for item in items)
+        token = None
+        if read_only and settings.DATABASE_REPLICAS:
+            pinned = cache.get(ReplicaRoutingMiddleware.get_pin_key(request))
+            token = db_router.allow_replica_reads(not pinned)
+            request._request.replica_read_only = True
+        try:
+            results = self.run_items(request, items, batch['parallel'])
+        finally:
+            if token is not None:
+                db_router.reset_replica_reads(token)
+        return Response({'results': JSONFragments(results), 'rolled_back': False})
+
+    def run_items(self, request, items, parallel):
+        """
+        Изменяющие подзапросы выполняются по очереди, а группы подряд идущих
+        чтений между ними — параллельно в пуле потоков
+        """
+        results = [None] * len(items)
+        group = []
+        for index, item in enumerate(items + [None]):
+            if item is not None and parallel and item['method'] in SAFE_METHODS:
+                group.append(index)
+                continue
+            if len(group) > 1:
+                futures = {
+                    position: executor().submit(
+                        run_in_thread, contextvars.copy_context(), request, items[position],
+                    )
+                    for position in group
+                }
+                for position, future in futures.items():
+                    results[position] = future.result()[1]
+            elif group:
+                results[group[0]] = run_item(request, items[group[0]])[1]
+            group = []
+            if item is not None:
+                results[index] = run_item(request, item)[1]
+        return results
+
+    def run_atomic(self, request, items):
+        results = []
+        with idempotency.held_until_transaction_end(), transaction.atomic():
+            for index, item in enumerate(items):
+                status_code, result = run_item(request, item)
+                results.append(result)
+                if status_code >= 400:
+                    transaction.set_rollback(True)
+                    results.extend(
+                        error_result(skipped, status.HTTP_424_FAILED_DEPENDENCY,
+                                     f'Не выполнен: подзапрос {index} завершился ошибкой')
+                        for skipped in items[index + 1:]
+                    )
+                    return results, True
+        return results, False
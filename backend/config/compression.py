@@ -0,0 +1,172 @@
+"""
+Сжатие ответов: brotli и zstd (если установлены пакеты) и gzip из стандартной библиотеки
+"""
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipEncoder:
+    name = 'gzip'
+    # Уровень для ответов на лету и для кэшируемых вариантов (сжимаются один раз)
+    level = 6
+    cached_level = 9
+
+    def compress(self, data, cached=False):
+        return gzip.compress(data, compresslevel=self.cached_level if cached else self.level, mtime=0)
+
+    def stream(self):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return StreamCompressor(
+            lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush,
+        )
+
+
+class BrotliEncoder:
+    name = 'br'
+    level = 4
+    cached_level = 11
+
+    def compress(self, data, cached=False):
+        return brotli.compress(data, quality=self.cached_level if cached else self.level)
+
+    def stream(self):
+        compressor = brotli.Compressor(quality=self.level)
+        return StreamCompressor(
+            lambda chunk: compressor.process(chunk) + compressor.flush(),
+            compressor.finish,
+        )
+
+
+class ZstdEncoder:
+    name = 'zstd'
+    level = 3
+    cached_level = 19
+
+    def compress(self, data, cached=False):
+        level = self.cached_level if cached else self.level
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    def stream(self):
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        return StreamCompressor(
+            lambda chunk: compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush,
+        )
+
+
+class StreamCompressor:
+    """
+    Сжатие по частям: каждая часть сбрасывается сразу, чтобы клиент не ждал конца потока
+    """
+    __slots__ = ('write', 'finish')
+
+    def __init__(self, write, finish):
+        self.write = write
+        self.finish = finish
+
+
+def available_encoders(names):
+    """
+    Кодировки из names (в порядке предпочтения сервера), для которых есть библиотеки
+    """
+    encoders = {'gzip': GzipEncoder}
+    if brotli is not None:
+        encoders['br'] = BrotliEncoder
+    if zstandard is not None:
+        encoders['zstd'] = ZstdEncoder
+    return [encoders[name]() for name in names if name in encoders]
+
+
+def parse_accept_encoding(header):
+    """
+    Accept-Encoding -> {кодировка: q}
+    """
+    accepted = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def negotiate(header, encoders):
+    """
+    Кодировка для ответа: первая из encoders, которую клиент принимает с q > 0.
+    При равных q решает порядок предпочтения сервера.
+    """
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoder in encoders:
+        q = accepted.get(encoder.name, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoder, q
+    return best
+
+
+def stream(encoder, content):
+    compressor = encoder.stream()
+    for chunk in content:
+        if chunk:
+            yield compressor.write(chunk)
+    yield compressor.finish()
+
+
+async def astream(encoder, content):
+    compressor = encoder.stream()
+    async for chunk in content:
+        if chunk:
+            yield compressor.write(chunk)
+    yield compressor.finish()
+
+
+class VariantCache:
+    """
+    LRU сжатых вариантов в памяти процесса: ключ — кодировка и хэш исходного тела
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get_or_compress(self, encoder, body):
+        key = (encoder.name, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            compressed = self._items.get(key)
+            if compressed is not None:
+                self._items.move_to_end(key)
+                return compressed
+        compressed = encoder.compress(body, cached=True)
+        with self._lock:
+            self._items[key] = compressed
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return compressed
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
@@ -0,0 +1,115 @@
+"""
+PostgreSQL-бэкенд с пулом соединений psycopg_pool внутри процесса.
+
+Соединение берется из пула при первом обращении к БД и возвращается в пул,
+когда Django закрывает его (в конце запроса при CONN_MAX_AGE = 0).
+Параметры пула задаются в OPTIONS['pool']:
+
+    'OPTIONS': {
+        'pool': {
+            'min_size': 2,        # соединений держится открытыми всегда
+            'max_size': 10,       # максимум соединений на процесс
+            'timeout': 5,         # ожидание свободного соединения, сек
+            'max_idle': 300,      # закрывать простаивающие дольше, сек
+            'max_lifetime': 1800, # пересоздавать соединения старше, сек
+        },
+    }
+
+При CONN_HEALTH_CHECKS = True соединение проверяется перед выдачей из пула.
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+from psycopg import IsolationLevel
+from psycopg_pool import ConnectionPool
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_stats():
+    """
+    Метрики всех пулов процесса: {(алиас, имя БД): статистика psycopg_pool}
+    """
+    return {key: pool.get_stats() for key, pool in list(_pools.items())}
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        if self.alias == NO_DB_ALIAS:
+            return None
+
+        # Ключ включает имя БД: тесты переключают NAME на тестовую базу
+        key = (self.alias, self.settings_dict['NAME'])
+        pool = _pools.get(key)
+        if pool is not None:
+            return pool
+
+        with _pools_lock:
+            if key not in _pools:
+                if self.settings_dict['CONN_MAX_AGE'] != 0:
+                    raise ImproperlyConfigured(
+                        'Пул соединений несовместим с постоянными соединениями: '
+                        'установите CONN_MAX_AGE = 0'
+                    )
+                options = dict(self.settings_dict['OPTIONS'].get('pool') or {})
+                check = self.settings_dict['CONN_HEALTH_CHECKS']
+                pool = ConnectionPool(
+                    kwargs=self.get_connection_params(),
+                    min_size=options.pop('min_size', 2),
+                    max_size=options.pop('max_size', None),
+                    check=ConnectionPool.check_connection if check else None,
+                    name=self.alias,
+                    open=False,
+                    **options
+                )
+                pool.open()
+                _pools[key] = pool
+        return _pools[key]
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = IsolationLevel(
+                options.get('isolation_level', IsolationLevel.READ_COMMITTED)
+            )
+        except ValueError:
+            raise ImproperlyConfigured(
+                f"Invalid transaction isolation level {options['isolation_level']} "
+                f"specified. Use one of the psycopg.IsolationLevel values."
+            )
+        connection = pool.getconn()
+        connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        pool = self.pool if self.connection is not None else None
+        if pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Пул откатывает незавершенную транзакцию и вернет соединение следующему запросу.
+            # Пул тот же, из которого взято соединение: NAME меняется (тесты) только
+            # после закрытия соединения
+            pool.putconn(self.connection)
+            self.connection = None
@@ -0,0 +1,101 @@
+"""
+Маршрутизация запросов к БД: запись и чтение после записи — в основную БД,
+безопасные чтения — в реплики с учетом их отставания.
+"""
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+PRIMARY = 'default'
+
+# Разрешено ли текущему запросу читать из реплик (выставляет ReplicaRoutingMiddleware)
+_replica_reads = ContextVar('replica_reads', default=False)
+
+_lag_lock = threading.Lock()
+_lag_cache = {}
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def allow_replica_reads(allowed):
+    """
+    Включает чтение из реплик для текущего контекста. Возвращает токен для reset_replica_reads
+    """
+    return _replica_reads.set(allowed)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+def replica_lag(alias):
+    """
+    Отставание реплики в секундах (кэшируется на REPLICA_LAG_CHECK_INTERVAL).
+    Недоступная реплика считается бесконечно отстающей.
+    """
+    now = time.monotonic()
+    cached = _lag_cache.get(alias)
+    if cached and now - cached[1] < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return cached[0]
+
+    with _lag_lock:
+        cached = _lag_cache.get(alias)
+        if cached and now - cached[1] < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return cached[0]
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            lag = 0.0
+        else:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(LAG_SQL)
+                    lag = float(cursor.fetchone()[0])
+            except DatabaseError:
+                lag = float('inf')
+        _lag_cache[alias] = (lag, now)
+    return lag
+
+
+def choose_replica():
+    """
+    Случайная реплика с допустимым отставанием, иначе основная БД
+    """
+    candidates = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if replica_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+    ]
+    return random.choice(candidates) if candidates else PRIMARY
+
+
+class PrimaryReplicaRouter:
+    """
+    Роутер БД. Вне HTTP-запросов (команды, фоновые задачи) все идет в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and settings.DATABASE_REPLICAS:
+            return choose_replica()
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # После записи остаток запроса читает из основной БД
+        _replica_reads.set(False)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
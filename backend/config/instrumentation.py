@@ -0,0 +1,227 @@
+"""
+Замеры производительности запросов: время БД, сериализации, рендеринга,
+сжатия и гистограммы задержек в формате Prometheus
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+
+_current = ContextVar('request_timings', default=None)
+
+# Границы корзин гистограмм, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PHASES = ('db', 'serialize', 'render', 'compress')
+
+
+class RequestTimings:
+    """
+    Накопленные за запрос замеры (секунды)
+    """
+    __slots__ = ('queries', 'phases', 'render_started')
+
+    def __init__(self):
+        self.queries = 0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.render_started = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """
+        Обертка для connection.execute_wrapper: считает запросы и их время
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.phases['db'] += time.perf_counter() - started
+
+    def server_timing(self, total):
+        parts = [f'db;dur={self.phases["db"] * 1000:.1f};desc="{self.queries} queries"']
+        parts += [
+            f'{phase};dur={self.phases[phase] * 1000:.1f}'
+            for phase in PHASES[1:] if self.phases[phase]
+        ]
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def start():
+    """
+    Начинает замеры для текущего запроса. Возвращает (замеры, токен для finish)
+    """
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+class timed:
+    """
+    Добавляет время блока к фазе текущего запроса; вне замеряемого запроса ничего не делает.
+    Класс, а не @contextmanager: без генератора на каждый блок.
+    """
+    __slots__ = ('phase', 'timings', 'started')
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.phases[self.phase] += time.perf_counter() - self.started
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        # Первая граница >= value (le в Prometheus); за последней — корзина +Inf
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Гистограммы по (представление, действие) в памяти процесса
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, view, action, total, timings):
+        with self._lock:
+            series = self._series.get((view, action))
+            if series is None:
+                series = self._series[(view, action)] = {
+                    'total': Histogram(),
+                    **{phase: Histogram() for phase in PHASES},
+                    'queries': 0,
+                }
+            series['total'].observe(total)
+            for phase in PHASES:
+                series[phase].observe(timings.phases[phase])
+            series['queries'] += timings.queries
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """
+        Текстовый формат Prometheus (exposition format 0.0.4)
+        """
+        with self._lock:
+            series = {
+                key: {
+                    name: (value if name == 'queries' else (list(value.counts), value.sum))
+                    for name, value in data.items()
+                }
+                for key, data in self._series.items()
+            }
+
+        lines = [
+            '# HELP desk_request_duration_seconds Request latency by view and action',
+            '# TYPE desk_request_duration_seconds histogram',
+        ]
+        for (view, action), data in sorted(series.items()):
+            lines += _histogram_lines(
+                'desk_request_duration_seconds', f'view="{view}",action="{action}"',
+                *data['total']
+            )
+        lines += [
+            '# HELP desk_request_phase_seconds Time spent per request phase',
+            '# TYPE desk_request_phase_seconds histogram',
+        ]
+        for (view, action), data in sorted(series.items()):
+            for phase in PHASES:
+                lines += _histogram_lines(
+                    'desk_request_phase_seconds',
+                    f'view="{view}",action="{action}",phase="{phase}"',
+                    *data[phase]
+                )
+        lines += [
+            '# HELP desk_db_queries_total Database queries executed',
+            '# TYPE desk_db_queries_total counter',
+        ]
+        for (view, action), data in sorted(series.items()):
+            lines.append(
+                f'desk_db_queries_total{{view="{view}",action="{action}"}} {data["queries"]}'
+            )
+        lines += _pool_lines()
+        lines += _log_queue_lines()
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name, labels, counts, total):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKETS, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    cumulative += counts[-1]
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+    lines.append(f'{name}_sum{{{labels}}} {total:.6f}')
+    lines.append(f'{name}_count{{{labels}}} {cumulative}')
+    return lines
+
+
+def _pool_lines():
+    """
+    Состояние пулов соединений, если используется config.db_backends.postgresql_pool
+    """
+    try:
+        from config.db_backends.postgresql_pool.base import pool_stats
+    except ImportError:
+        return []
+
+    stats = sorted(pool_stats().items())
+    if not stats:
+        return []
+
+    lines = []
+    for gauge in ('pool_size', 'pool_available', 'requests_waiting'):
+        lines.append(f'# TYPE desk_db_{gauge} gauge')
+        for (alias, _), values in stats:
+            lines.append(f'desk_db_{gauge}{{alias="{alias}"}} {values.get(gauge, 0)}')
+    return lines
+
+
+def _log_queue_lines():
+    """
+    Записи, отброшенные переполненными очередями логов (config.logging)
+    """
+    from config.logging import queue_handlers
+
+    if not queue_handlers:
+        return []
+    lines = [
+        '# HELP desk_log_records_dropped_total Log records dropped because the queue was full',
+        '# TYPE desk_log_records_dropped_total counter',
+    ]
+    for handler in queue_handlers:
+        lines.append(f'desk_log_records_dropped_total{{handler="{handler.name}"}} {handler.dropped}')
+    return lines
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,224 @@
+"""
+Логирование без блокировки запроса: записи уходят в очередь, а файлы, консоль
+и письма администраторам обрабатывает фоновый поток. Формат — JSON с контекстом запроса.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.log import AdminEmailHandler
+
+
+# Контекст текущего запроса: id, объект запроса, представление, время начала
+_request_context = ContextVar('log_request_context', default=None)
+
+# Поля контекста, которые добавляются к каждой записи
+CONTEXT_FIELDS = ('request_id', 'user_id', 'view', 'elapsed_ms')
+
+# Созданные обработчики-очереди: число отброшенных записей выводится в /metrics
+queue_handlers = []
+
+
+def bind_request(request_id, request):
+    """
+    Начинает контекст запроса для логов
+    """
+    _request_context.set({
+        'request_id': request_id,
+        'request': request,
+        'view': None,
+        'started': time.perf_counter(),
+    })
+
+
+def clear_request(**kwargs):
+    """
+    Завершает контекст запроса; подключается к сигналу request_finished
+    """
+    _request_context.set(None)
+
+
+def set_view(view):
+    context = _request_context.get()
+    if context is not None:
+        context['view'] = view
+
+
+def request_fields():
+    """
+    Поля контекста для записи; вычисляются в потоке запроса
+    """
+    context = _request_context.get()
+    if context is None:
+        return dict.fromkeys(CONTEXT_FIELDS)
+    return {
+        'request_id': context['request_id'],
+        'user_id': _user_id(context['request']),
+        'view': context['view'],
+        'elapsed_ms': round((time.perf_counter() - context['started']) * 1000, 1),
+    }
+
+
+def _user_id(request):
+    # DRF после аутентификации записывает пользователя в исходный HttpRequest.
+    # Ленивого пользователя из сессии не вычисляем, чтобы лог не делал запросов к БД.
+    user = request.__dict__.get('user')
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        return None
+    return user.pk if user.is_authenticated else None
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    QueueHandler для одного процесса: в потоке запроса только добавляет контекст
+    к копии записи и кладет ее в очередь. exc_info и request сохраняются — они нужны
+    AdminEmailHandler в фоновом потоке. Если очередь переполнена, запись отбрасывается;
+    сколько отброшено, сообщает предупреждение, которое ставится в очередь первым,
+    когда в ней снова есть место, и метрика desk_log_records_dropped_total.
+    """
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+        self._unreported = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Копия, как в QueueHandler.prepare: одна запись попадает в несколько очередей,
+        # и фоновые потоки не должны менять общий объект
+        record = copy.copy(record)
+        record.__dict__.update(request_fields())
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self._unreported:
+            self.report_dropped()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+                self._unreported += 1
+
+    def report_dropped(self):
+        with self._dropped_lock:
+            count, self._unreported = self._unreported, 0
+        record = logging.makeLogRecord({
+            'name': __name__,
+            'levelno': logging.WARNING,
+            'levelname': logging.getLevelName(logging.WARNING),
+            'msg': f'Очередь логов была переполнена, отброшено записей: {count}',
+        })
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self._unreported += count
+
+
+def queue_handler(handlers, maxsize=10000):
+    """
+    Фабрика для LOGGING ('()': 'config.logging.queue_handler'): записи из очереди
+    передаются в handlers фоновым QueueListener.
+
+    handlers — ссылки вида 'cfg://handlers.file'. dictConfig настраивает обработчики
+    в алфавитном порядке, поэтому имя обработчика-очереди должно идти после имен целей.
+    """
+    # ConvertingList разрешает ссылки cfg:// только при обращении по индексу
+    targets = [handlers[index] for index in range(len(handlers))]
+    for target in targets:
+        if not isinstance(target, logging.Handler):
+            raise ValueError(f'Обработчик {target!r} еще не настроен: имя очереди должно '
+                             f'быть после имен целевых обработчиков по алфавиту')
+
+    handler = ContextQueueHandler(queue.Queue(maxsize))
+    queue_handlers.append(handler)
+    handler.listener = QueueListener(handler.queue, *targets, respect_handler_level=True)
+    handler.listener.start()
+    atexit.register(handler.listener.stop)
+    return handler
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Одна запись — одна строка JSON с полями контекста запроса
+    """
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.thread,
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        status_code = getattr(record, 'status_code', None)
+        if status_code is not None:
+            data['status_code'] = status_code
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class ThrottledAdminEmailHandler(AdminEmailHandler):
+    """
+    AdminEmailHandler с защитой от лавины писем: одинаковая ошибка (логгер, место,
+    тип исключения) отправляется не чаще раза в dedup_seconds, всего — не больше
+    max_per_minute писем в минуту. Число пропущенных повторов дописывается
+    в следующее письмо о той же ошибке.
+    """
+
+    def __init__(self, dedup_seconds=300, max_per_minute=10, **kwargs):
+        super().__init__(**kwargs)
+        self.dedup_seconds = dedup_seconds
+        self.max_per_minute = max_per_minute
+        self._lock = threading.Lock()
+        self._last_sent = {}
+        self._suppressed = {}
+        self._sent_times = deque()
+
+    @staticmethod
+    def signature(record):
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else ''
+        return record.name, record.pathname, record.lineno, exc_type
+
+    def emit(self, record):
+        key = self.signature(record)
+        now = time.monotonic()
+        with self._lock:
+            while self._sent_times and now - self._sent_times[0] >= 60:
+                self._sent_times.popleft()
+            last = self._last_sent.get(key)
+            if (last is not None and now - last < self.dedup_seconds) or \
+                    len(self._sent_times) >= self.max_per_minute:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return
+            self._last_sent[key] = now
+            self._sent_times.append(now)
+            suppressed = self._suppressed.pop(key, 0)
+            if len(self._last_sent) > 1000:
+                self._last_sent = {
+                    signature: sent for signature, sent in self._last_sent.items()
+                    if now - sent < self.dedup_seconds
+                }
+
+        if suppressed:
+            record = copy.copy(record)
+            record.msg = f'{record.msg} (не отправлено повторов: {suppressed})'
+        super().emit(record)
@@ -0,0 +1,217 @@
+"""
+Middleware проекта
+"""
+import hashlib
+import random
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import compression, db_router, instrumentation, logging as log_context
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Типы содержимого, которые имеет смысл сжимать
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/vnd.oai.openapi', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+)
+
+# Допустимый id запроса от прокси/балансировщика
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestContextMiddleware:
+    """
+    Контекст запроса для логов: id (из X-Request-ID или новый), пользователь,
+    представление и время от начала запроса. Id возвращается в заголовке X-Request-ID.
+
+    Контекст очищается по request_finished, а не при выходе из middleware:
+    ответы 4xx Django логирует уже после всей цепочки middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        request_finished.connect(log_context.clear_request, dispatch_uid='log_context.clear_request')
+
+    def __call__(self, request):
+        request_id = request.META.get('HTTP_X_REQUEST_ID', '')
+        if not REQUEST_ID_RE.match(request_id):
+            request_id = uuid.uuid4().hex
+        log_context.bind_request(request_id, request)
+        response = self.get_response(request)
+        response['X-Request-ID'] = request_id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view, action = PerformanceMiddleware.get_view_action(request, request.resolver_match)
+        log_context.set_view(f'{view}.{action}')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Направляет чтения безопасных запросов в реплики.
+
+    После успешного изменяющего запроса клиент на REPLICA_STICKY_SECONDS
+    закрепляется за основной БД, чтобы сразу видеть свои изменения.
+    Клиент определяется по заголовку Authorization, а без него — по IP.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        pin_key = self.get_pin_key(request)
+        is_safe = request.method in SAFE_METHODS
+        token = db_router.allow_replica_reads(is_safe and not cache.get(pin_key))
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.reset_replica_reads(token)
+
+        # Пакетный запрос из одних чтений (config.batch) не закрепляет клиента
+        read_only = getattr(request, 'replica_read_only', False)
+        if not is_safe and not read_only and response.status_code < 400:
+            cache.set(pin_key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    @staticmethod
+    def get_pin_key(request):
+        identity = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+        return 'db:pin:' + hashlib.sha256(identity.encode()).hexdigest()
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет запросы: число и время SQL-запросов, время сериализации, рендеринга
+    и общее время. Результат отдается в заголовке Server-Timing и копится
+    в гистограммах для /metrics.
+
+    Замеряется доля METRICS_SAMPLE_RATE запросов, остальные проходят без накладных расходов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.METRICS_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        timings, token = instrumentation.start()
+        # Обертка добавляется в execute_wrappers напрямую, как это делает
+        # connection.execute_wrapper(), но без контекстного менеджера на каждое соединение
+        wrapper = timings.execute_wrapper
+        databases = connections.all()
+        for connection in databases:
+            connection.execute_wrappers.append(wrapper)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - started
+            for connection in databases:
+                connection.execute_wrappers.remove(wrapper)
+            instrumentation.finish(token)
+
+        match = request.resolver_match
+        if match is None:
+            return response
+        response['Server-Timing'] = timings.server_timing(total)
+        view, action = self.get_view_action(request, match)
+        instrumentation.registry.observe(view, action, total, timings)
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после выхода из представления
+        timings = instrumentation.current()
+        if timings is not None:
+            timings.render_started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: timings.add('render', time.perf_counter() - timings.render_started)
+            )
+        return response
+
+    @staticmethod
+    def get_view_action(request, match):
+        view_class = getattr(match.func, 'cls', None)
+        view = view_class.__name__ if view_class else match.view_name
+        actions = getattr(match.func, 'actions', None) or {}
+        return view, actions.get(request.method.lower(), request.method.lower())
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы в кодировке, согласованной по Accept-Encoding: brotli, zstd или gzip
+    (порядок и набор — COMPRESSION_ENCODINGS, недоступные библиотеки пропускаются).
+
+    Тела меньше COMPRESSION_MIN_SIZE отдаются как есть, потоковые ответы сжимаются
+    по частям. Сжатые варианты кэшируемых ответов (пути из COMPRESSION_CACHE_PATHS
+    или Cache-Control: public/max-age) сжимаются один раз с максимальным уровнем
+    и хранятся в памяти процесса.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encoders = compression.available_encoders(settings.COMPRESSION_ENCODINGS)
+        self.cache = compression.VariantCache(settings.COMPRESSION_CACHE_SIZE)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding') or not self.is_compressible(response):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoder = compression.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encoders)
+        if encoder is None:
+            return response
+
+        if response.streaming:
+            # Сжатие идет при отдаче потока, уже после выхода из middleware
+            stream = compression.astream if response.is_async else compression.stream
+            response.streaming_content = stream(encoder, response.streaming_content)
+            del response['Content-Length']
+        else:
+            with instrumentation.timed('compress'):
+                if self.is_cacheable(request, response):
+                    compressed = self.cache.get_or_compress(encoder, response.content)
+                else:
+                    compressed = encoder.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # Сжатое тело уже не совпадает побайтно с исходным
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoder.name
+        return response
+
+    @staticmethod
+    def is_compressible(response):
+        content_type = response.get('Content-Type', '').lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def is_cacheable(request, response):
+        if request.path in settings.COMPRESSION_CACHE_PATHS:
+            return True
+        cache_control = response.get('Cache-Control', '').lower()
+        return (
+            ('public' in cache_control or 'max-age' in cache_control)
+            and 'private' not in cache_control and 'no-store' not in cache_control
+        )
@@ -0,0 +1,52 @@
+"""
+JSON-рендерер, вставляющий готовые фрагменты JSON без повторной сериализации
+"""
+import uuid
+
+from rest_framework.renderers import JSONRenderer
+
+
+class JSONFragments(list):
+    """
+    Элементы JSON-массива, уже отрендеренные в bytes. Может быть всем ответом
+    или значением верхнего уровня словаря ответа (например, results страницы).
+    """
+
+
+class FragmentJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer, который склеивает JSONFragments в массив как есть.
+    Остальные данные рендерятся как в JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, JSONFragments):
+            return self.join(data)
+        if not isinstance(data, dict) or not any(
+            isinstance(value, JSONFragments) for value in data.values()
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Фрагменты заменяются уникальными строками, которые после рендеринга
+        # остального ответа подменяются склеенными массивами
+        data = dict(data)
+        placeholders = {}
+        for key, value in data.items():
+            if isinstance(value, JSONFragments):
+                placeholder = f'\x00{uuid.uuid4().hex}'
+                placeholders[super().render(placeholder)] = value
+                data[key] = placeholder
+        body = super().render(data, accepted_media_type, renderer_context)
+        for placeholder, fragments in placeholders.items():
+            body = body.replace(placeholder, self.join(fragments), 1)
+        return body
+
+    def render_fragment(self, data):
+        """
+        Компактный JSON одного элемента для хранения во фрагментах
+        """
+        return super().render(data)
+
+    @staticmethod
+    def join(fragments):
+        return b'[' + b','.join(fragments) + b']'
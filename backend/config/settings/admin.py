@@ -0,0 +1,8 @@
+"""
+Admin production profile (config.wsgi_admin): админка и документация API.
+
+Набор приложений и middleware — как в production; маршруты API обслуживает профиль api.
+"""
+from .production import *
+
+ROOT_URLCONF = 'config.urls_admin'
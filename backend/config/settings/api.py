@@ -0,0 +1,32 @@
+"""
+API-only production profile (config.wsgi_api).
+
+JWT-запросам к API не нужны админка, сессии, сообщения, шаблоны и CSRF:
+приложения и middleware для них не загружаются, drf-spectacular импортируется
+только при запросе схемы. Админку и документацию обслуживает профиль admin.
+"""
+from .production import *
+
+# Приложения и middleware, которые в этом профиле не нужны
+ADMIN_ONLY_APPS = (
+    'jazzmin',
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'drf_spectacular',
+)
+ADMIN_ONLY_MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_ONLY_APPS]
+MIDDLEWARE = [item for item in MIDDLEWARE if item not in ADMIN_ONLY_MIDDLEWARE]
+ROOT_URLCONF = 'config.urls_api'
+
+# Ответы только JSON, страницы ошибок Django рендерятся без загрузчиков шаблонов
+TEMPLATES = []
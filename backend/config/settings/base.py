@@ -4,7 +4,7 @@ Common settings shared across all environments.
 """
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -30,17 +30,24 @@ INSTALLED_APPS = [
     # Local apps
     'apps.users',
     'apps.tickets',
+    'apps.notifications',
+    'apps.perf',
 ]
 
 MIDDLEWARE = [
+    'config.middleware.RequestContextMiddleware',
+    'config.middleware.PerformanceMiddleware',
+    'config.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'config.middleware.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.users.middleware.RateLimitHeadersMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -65,16 +72,61 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': config('DB_NAME'),
-        'USER': config('DB_USER'),
-        'PASSWORD': config('DB_PASSWORD'),
-        'HOST': config('DB_HOST'),
-        'PORT': config('DB_PORT', default='5432'),
+# DB_ENGINE=sqlite3 — локальная БД в файле, например для бенчмарков без PostgreSQL
+DB_ENGINE = config('DB_ENGINE', default='postgresql')
+
+if DB_ENGINE == 'sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME'),
+            'USER': config('DB_USER'),
+            'PASSWORD': config('DB_PASSWORD'),
+            'HOST': config('DB_HOST'),
+            'PORT': config('DB_PORT', default='5432'),
+        }
+    }
+
+# Read-only реплики: DB_REPLICA_HOSTS=host1,host2:5433 создает алиасы replica_1, replica_2.
+# Для локальной проверки можно указать тот же хост, что и у основной БД.
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    host, _, port = replica_host.partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default'].get('PORT', ''),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['config.db_router.PrimaryReplicaRouter']
+
+# Сколько секунд после записи клиент читает только из основной БД
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+# Реплика с большим отставанием (в секундах) исключается из чтения
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=2.0, cast=float)
+REPLICA_LAG_CHECK_INTERVAL = config('REPLICA_LAG_CHECK_INTERVAL', default=5, cast=int)
+
+
+# Instrumentation: доля замеряемых запросов (0..1) и токен для /metrics
+METRICS_SAMPLE_RATE = config('METRICS_SAMPLE_RATE', default=1.0, cast=float)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Сжатие ответов: кодировки в порядке предпочтения (br и zstd — если установлены brotli/zstandard),
+# минимальный размер тела в байтах и LRU сжатых вариантов кэшируемых ответов
+COMPRESSION_ENCODINGS = config('COMPRESSION_ENCODINGS', default='br,zstd,gzip', cast=Csv())
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_CACHE_SIZE = config('COMPRESSION_CACHE_SIZE', default=32, cast=int)
+COMPRESSION_CACHE_PATHS = ['/api/schema/']
 
 
 # Password validation
@@ -127,13 +179,71 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.tickets.pagination.EstimatedCountPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'config.renderers.FragmentJSONRenderer',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'apps.users.throttling.RoleRateThrottle',
     ),
 }
 
+# Ограничение частоты запросов: единиц стоимости за THROTTLE_WINDOW секунд
+# на пользователя по его роли и на IP для анонимных запросов (вход, регистрация).
+# Счетчики — в кэше (CACHES), при его недоступности — в памяти процесса
+THROTTLE_WINDOW = config('THROTTLE_WINDOW', default=60, cast=int)
+THROTTLE_ROLE_LIMITS = {
+    'REQUESTER': config('THROTTLE_LIMIT_REQUESTER', default=120, cast=int),
+    'OPERATOR': config('THROTTLE_LIMIT_OPERATOR', default=600, cast=int),
+    'EXECUTOR': config('THROTTLE_LIMIT_EXECUTOR', default=300, cast=int),
+}
+THROTTLE_ANON_LIMIT = config('THROTTLE_ANON_LIMIT', default=30, cast=int)
+
+# Пагинация: выше порога число строк оценивается по статистике PostgreSQL,
+# точные подсчеты кэшируются на короткое время
+PAGINATION_EXACT_COUNT_THRESHOLD = config('PAGINATION_EXACT_COUNT_THRESHOLD', default=10000, cast=int)
+PAGINATION_COUNT_CACHE_SECONDS = config('PAGINATION_COUNT_CACHE_SECONDS', default=30, cast=int)
+
+# Кэш отрендеренного JSON заявок для списков и время его жизни (сек)
+TICKET_FRAGMENT_CACHE = config('TICKET_FRAGMENT_CACHE', default=True, cast=bool)
+TICKET_FRAGMENT_TTL = config('TICKET_FRAGMENT_TTL', default=3600, cast=int)
+
+# Idempotency-Key: сколько хранится ответ (сек) и сколько повтор ждет
+# выполняющийся запрос с тем же ключом, прежде чем получить 409
+IDEMPOTENCY_TTL = config('IDEMPOTENCY_TTL', default=86400, cast=int)
+IDEMPOTENCY_LOCK_WAIT = config('IDEMPOTENCY_LOCK_WAIT', default=5.0, cast=float)
+
+# SLA: срок выполнения заявки по приоритету, минут от создания или назначения
+# исполнителя. Нарушения находит manage.py scan_sla_breaches
+SLA_POLICIES = {
+    'URGENT': config('SLA_URGENT_MINUTES', default=60, cast=int),
+    'HIGH': config('SLA_HIGH_MINUTES', default=240, cast=int),
+    'MEDIUM': config('SLA_MEDIUM_MINUTES', default=1440, cast=int),
+    'LOW': config('SLA_LOW_MINUTES', default=4320, cast=int),
+}
+
+# Сроки хранения (manage.py purge_retention): завершенные заявки — по дате
+# последнего изменения, отключенные пользователи — по дате последнего входа, дней
+RETENTION_TICKET_DAYS = config('RETENTION_TICKET_DAYS', default=730, cast=int)
+RETENTION_USER_DAYS = config('RETENTION_USER_DAYS', default=365, cast=int)
+
+# Пакетные запросы (/api/batch/): максимум подзапросов в пакете и потоков
+# для параллельных чтений
+BATCH_MAX_ITEMS = config('BATCH_MAX_ITEMS', default=20, cast=int)
+BATCH_MAX_WORKERS = config('BATCH_MAX_WORKERS', default=4, cast=int)
+
+# Уведомления (outbox): webhooks через запятую, окно объединения в сводку (сек),
+# число попыток и экспоненциальная задержка между ними (сек)
+NOTIFICATION_WEBHOOK_URLS = config('NOTIFICATION_WEBHOOK_URLS', default='', cast=Csv())
+NOTIFICATION_DIGEST_WINDOW = config('NOTIFICATION_DIGEST_WINDOW', default=30, cast=int)
+NOTIFICATION_MAX_ATTEMPTS = config('NOTIFICATION_MAX_ATTEMPTS', default=8, cast=int)
+NOTIFICATION_RETRY_BASE_DELAY = 30
+NOTIFICATION_RETRY_MAX_DELAY = 3600
+NOTIFICATION_WEBHOOK_TIMEOUT = 10
+# На сколько секунд воркер забирает пачку; должно хватать на отправку всей пачки
+NOTIFICATION_CLAIM_SECONDS = config('NOTIFICATION_CLAIM_SECONDS', default=600, cast=int)
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -19,7 +19,7 @@ INSTALLED_APPS += [
 
 # Add BrowsableAPIRenderer for development
 REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
-    'rest_framework.renderers.JSONRenderer',
+    'config.renderers.FragmentJSONRenderer',
     'rest_framework.renderers.BrowsableAPIRenderer',
 )
 
@@ -25,11 +25,28 @@ CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', cast=Csv())
 CORS_ALLOW_CREDENTIALS = True
 
-# Database connection pooling and optimization
-DATABASES['default']['CONN_MAX_AGE'] = 600
-DATABASES['default']['OPTIONS'] = {
-    'connect_timeout': 10,
-}
+# Database connection pooling and optimization.
+# DB_POOL=True включает пул соединений внутри процесса: соединение занято только
+# на время запроса, и число соединений к PostgreSQL ограничено DB_POOL_MAX_SIZE
+# на процесс, а не числом потоков.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+for database in DATABASES.values():
+    database['OPTIONS'] = {
+        'connect_timeout': 10,
+    }
+    if DB_POOL:
+        database['ENGINE'] = 'config.db_backends.postgresql_pool'
+        database['CONN_MAX_AGE'] = 0
+        database['CONN_HEALTH_CHECKS'] = True
+        database['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=5.0, cast=float),
+            'max_idle': config('DB_POOL_MAX_IDLE', default=300.0, cast=float),
+            'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800.0, cast=float),
+        }
+    else:
+        database['CONN_MAX_AGE'] = 600
 
 # Email backend for production
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -40,19 +57,24 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@deskservice.com')
 
-# Logging configuration for production
+# Logging configuration for production.
+# Поток запроса только кладет запись в очередь (LOG_QUEUE_SIZE, при переполнении
+# записи отбрасываются); в файл, консоль и почту пишут фоновые потоки.
+# Консоль и файл — JSON с request_id, user_id, view и elapsed_ms.
+# Письма администраторам: одна и та же ошибка не чаще раза в ADMIN_EMAIL_DEDUP_SECONDS,
+# всего не больше ADMIN_EMAIL_RATE_LIMIT писем в минуту.
+LOG_QUEUE_SIZE = config('LOG_QUEUE_SIZE', default=10000, cast=int)
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
+        'json': {
+            '()': 'config.logging.JsonFormatter',
+        },
         'verbose': {
             'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
             'style': '{',
         },
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
-        },
     },
     'filters': {
         'require_debug_false': {
@@ -62,7 +84,7 @@ LOGGING = {
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'formatter': 'json',
         },
         'file': {
             'level': 'ERROR',
@@ -70,32 +92,52 @@ LOGGING = {
             'filename': BASE_DIR / 'logs' / 'django.log',
             'maxBytes': 1024 * 1024 * 15,  # 15MB
             'backupCount': 10,
-            'formatter': 'verbose',
+            'formatter': 'json',
         },
         'mail_admins': {
             'level': 'ERROR',
-            'class': 'django.utils.log.AdminEmailHandler',
+            '()': 'config.logging.ThrottledAdminEmailHandler',
+            'dedup_seconds': config('ADMIN_EMAIL_DEDUP_SECONDS', default=300, cast=int),
+            'max_per_minute': config('ADMIN_EMAIL_RATE_LIMIT', default=10, cast=int),
             'filters': ['require_debug_false'],
             'formatter': 'verbose',
         },
+        # Обработчики-очереди, к которым подключены логгеры. Письма идут через
+        # отдельную очередь, чтобы медленный SMTP не задерживал запись в файл
+        'queue': {
+            '()': 'config.logging.queue_handler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
+            'maxsize': LOG_QUEUE_SIZE,
+        },
+        'queue_mail': {
+            'level': 'ERROR',
+            '()': 'config.logging.queue_handler',
+            'handlers': ['cfg://handlers.mail_admins'],
+            'maxsize': LOG_QUEUE_SIZE,
+        },
     },
     'root': {
-        'handlers': ['console', 'file'],
+        'handlers': ['queue'],
         'level': 'INFO',
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file', 'mail_admins'],
+            'handlers': ['queue', 'queue_mail'],
             'level': 'INFO',
             'propagate': False,
         },
         'django.request': {
-            'handlers': ['console', 'file', 'mail_admins'],
+            'handlers': ['queue', 'queue_mail'],
             'level': 'ERROR',
             'propagate': False,
         },
+        'config': {
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
         'apps': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
@@ -113,9 +155,6 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
         'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
-        'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-        },
         'KEY_PREFIX': 'desk_service',
         'TIMEOUT': 300,
     }
@@ -0,0 +1,147 @@
+"""
+Тесты маршрутизации чтений в реплики
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import db_router
+from .middleware import ReplicaRoutingMiddleware
+
+User = get_user_model()
+
+REPLICA = 'replica'
+
+# Реплика для тестов — зеркало основной БД (TEST MIRROR): отдельное соединение
+# к той же тестовой БД, поэтому видно, какое соединение выполнило запрос.
+# Алиас добавляется до создания тестовых БД, если DB_REPLICA_HOSTS не задан.
+if REPLICA not in connections.settings:
+    connections.settings[REPLICA] = {
+        **connections.settings[db_router.PRIMARY],
+        'TEST': {**connections.settings[db_router.PRIMARY]['TEST'], 'MIRROR': db_router.PRIMARY},
+    }
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_MAX_LAG_SECONDS=2.0,
+                   REPLICA_LAG_CHECK_INTERVAL=60, REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {db_router.PRIMARY, REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        db_router._lag_cache.clear()
+        self.requester = User.objects.create_user(
+            username='requester', password='password', role=User.Role.REQUESTER
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def capture(self):
+        primary = CaptureQueriesContext(connections[db_router.PRIMARY])
+        replica = CaptureQueriesContext(connections[REPLICA])
+        return primary, replica
+
+    def request(self, client, method, path, **kwargs):
+        """
+        Выполняет запрос и возвращает (ответ, запросы к основной БД, запросы к реплике)
+        """
+        primary, replica = self.capture()
+        with primary, replica:
+            response = getattr(client, method)(path, format='json', **kwargs)
+        return response, primary.captured_queries, replica.captured_queries
+
+    def test_safe_reads_go_to_replica(self):
+        response, primary, replica = self.request(
+            self.client_for(self.requester), 'get', '/api/tickets/'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, [])
+        self.assertTrue(any('tickets_ticket' in query['sql'] for query in replica))
+
+    def test_write_and_reads_after_it_go_to_primary(self):
+        reads = []
+
+        def view(request):
+            # GET, который что-то меняет (например, last_login): чтение до записи —
+            # из реплики, запись и все чтения после нее — из основной БД
+            reads.append(User.objects.filter(pk=self.requester.pk).db)
+            list(User.objects.filter(pk=self.requester.pk))
+            User.objects.filter(pk=self.requester.pk).update(department='Отдел')
+            reads.append(User.objects.filter(pk=self.requester.pk).db)
+            reads.append(User.objects.get(pk=self.requester.pk).department)
+            return HttpResponse()
+
+        # Отставание уже проверено: на реплике остаются только чтения представления
+        db_router.replica_lag(REPLICA)
+        primary, replica = self.capture()
+        with primary, replica:
+            ReplicaRoutingMiddleware(view)(RequestFactory().get('/api/tickets/'))
+
+        self.assertEqual(reads, [REPLICA, db_router.PRIMARY, 'Отдел'])
+        self.assertEqual(len(replica.captured_queries), 1)
+        self.assertTrue(primary.captured_queries[0]['sql'].startswith('UPDATE'))
+        self.assertEqual(len(primary.captured_queries), 2)
+
+    def test_post_goes_to_primary(self):
+        response, primary, replica = self.request(
+            self.client_for(self.requester), 'post', '/api/tickets/',
+            data={'title': 'Заявка', 'description': 'Описание'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(replica, [])
+        self.assertTrue(any(query['sql'].startswith('INSERT') for query in primary))
+
+    def test_client_is_pinned_to_primary_after_write(self):
+        client = self.client_for(self.requester)
+        other = self.client_for(User.objects.create_user(
+            username='other', password='password', role=User.Role.REQUESTER
+        ))
+        response, _, _ = self.request(client, 'post', '/api/tickets/',
+                                      data={'title': 'Заявка', 'description': 'Описание'})
+        self.assertEqual(response.status_code, 201)
+
+        # Следующие чтения этого клиента видят его запись: они идут в основную БД
+        for _ in range(2):
+            response, primary, replica = self.request(client, 'get', '/api/tickets/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(replica, [])
+            self.assertEqual(response.json()['count'], 1)
+        # Другой клиент по-прежнему читает из реплики
+        response, primary, replica = self.request(other, 'get', '/api/tickets/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, [])
+        self.assertNotEqual(replica, [])
+
+        # После REPLICA_STICKY_SECONDS ключ закрепления истекает
+        cache.clear()
+        response, primary, replica = self.request(client, 'get', '/api/tickets/')
+        self.assertEqual(primary, [])
+        self.assertNotEqual(replica, [])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch.object(db_router, 'LAG_SQL', 'SELECT 10.0'):
+            response, primary, replica = self.request(
+                self.client_for(self.requester), 'get', '/api/tickets/'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('tickets_ticket' in query['sql'] for query in primary))
+        # На реплике был только запрос отставания
+        self.assertEqual([query['sql'] for query in replica], ['SELECT 10.0'])
+        self.assertEqual(db_router.replica_lag(REPLICA), 10.0)
+
+    def test_replica_within_lag_is_used(self):
+        with mock.patch.object(db_router, 'LAG_SQL', 'SELECT 1.5'):
+            self.assertEqual(db_router.choose_replica(), REPLICA)
+        db_router._lag_cache.clear()
+        with mock.patch.object(db_router, 'LAG_SQL', 'SELECT 2.5'):
+            self.assertEqual(db_router.choose_replica(), db_router.PRIMARY)
@@ -9,15 +9,22 @@ from drf_spectacular.views import (
     SpectacularRedocView
 )
 
+from . import views
+from .batch import BatchView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     
     # API endpoints
     path('api/auth/', include('apps.users.urls')),
     path('api/tickets/', include('apps.tickets.urls')),
+    path('api/batch/', BatchView.as_view(), name='batch'),
     
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+
+    # Prometheus
+    path('metrics', views.metrics, name='metrics'),
 ]
@@ -0,0 +1,20 @@
+"""
+URL configuration for the API-only profile (config.settings.api).
+"""
+from django.urls import path, include
+
+from . import views
+from .batch import BatchView
+
+urlpatterns = [
+    # API endpoints
+    path('api/auth/', include('apps.users.urls')),
+    path('api/tickets/', include('apps.tickets.urls')),
+    path('api/batch/', BatchView.as_view(), name='batch'),
+
+    # Схема OpenAPI (drf-spectacular загружается при первом запросе)
+    path('api/schema/', views.schema, name='schema'),
+
+    # Prometheus
+    path('metrics', views.metrics, name='metrics'),
+]
@@ -0,0 +1,41 @@
+"""
+Служебные представления проекта
+"""
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from . import instrumentation
+
+
+def metrics(request):
+    """
+    Метрики процесса в текстовом формате Prometheus.
+    Требуется заголовок Authorization: Bearer <METRICS_TOKEN>. Без токена в настройках
+    метрики открыты только при DEBUG, в production эндпоинт закрыт.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        instrumentation.registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+_schema_view = None
+
+
+def schema(request, *args, **kwargs):
+    """
+    Схема OpenAPI с отложенным импортом drf-spectacular (профиль api):
+    генератор схемы не загружается в процессы, которые ее не отдают
+    """
+    global _schema_view
+    if _schema_view is None:
+        from drf_spectacular.views import SpectacularAPIView
+        _schema_view = SpectacularAPIView.as_view()
+    return _schema_view(request, *args, **kwargs)
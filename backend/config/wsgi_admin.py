@@ -0,0 +1,11 @@
+"""
+WSGI entry point for the admin profile (config.settings.admin).
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.admin')
+
+application = get_wsgi_application()
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for the api profile (config.settings.api).
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.api')
+
+application = get_wsgi_application()